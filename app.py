@@ -1,8 +1,26 @@
 import streamlit as st
+import pandas as pd
 import requests
-import json
+import time
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import re
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.async_apify_extractor import extract_username
+from core.batch_runner import BatchLeadRunner, load_leads, iter_leads
+from core.groq_scorer import GroqLeadScorer, valid_verdict
+from core.llm_backends import make_backend
+from core.metrics import get_default_metrics, trace_lead
+from core.lead_record import LeadRecord
+from core.pre_scorer import RulePreScorer
+from core.profile_cache import ProfileCache
+from core.prompt_builder import PromptBuilder
+from core.rate_limiter import get_default_scheduler
+from core.scoring_service import ScoringServiceClient
+from core.score_cache import ScoreCache, payload_fingerprint
+from core.single_flight import SingleFlight
 
 # =========================
 # PAGE CONFIG
@@ -258,54 +276,147 @@ hr{
 # =========================
 APIFY_API_KEY = st.secrets.get("APIFY", "")
 GROQ_API_KEY = st.secrets.get("GROQ_API_KEY", "")
+# optional: score against another OpenAI-compatible server (e.g. the load-test mock)
+LLM_BASE_URL = st.secrets.get("LLM_BASE_URL", "")
+# optional: run single-lead extraction/scoring as jobs on scoring_server.py
+SCORING_SERVICE_URL = st.secrets.get("SCORING_SERVICE_URL", "")
 
-if not APIFY_API_KEY or not GROQ_API_KEY:
+if not APIFY_API_KEY or not (GROQ_API_KEY or LLM_BASE_URL):
     st.error("Missing API keys. Please add APIFY_API_KEY and GROQ_API_KEY in Streamlit secrets.")
     st.stop()
 
 
+# =========================
+# CACHE
+# =========================
+@st.cache_resource
+def get_profile_cache():
+    # shared by every session in this process; survives URL changes and reruns
+    return ProfileCache(st.secrets.get("LEAD_CACHE_PATH", "lead_cache.sqlite3"))
+
+
+@st.cache_resource
+def get_score_cache():
+    return ScoreCache()
+
+
+@st.cache_resource
+def get_pre_scorer():
+    return RulePreScorer()
+
+
+PROFILE_CACHE = get_profile_cache()
+SCORE_CACHE = get_score_cache()
+# clear-cut HOT/COLD leads are classified locally, without a Groq call
+PRE_SCORER = get_pre_scorer()
+# process-wide, so concurrent sessions share the Groq / Apify budgets
+SCHEDULER = get_default_scheduler()
+# stage timings, HTTP round-trips/bytes, compute units and LLM tokens
+METRICS = get_default_metrics()
+
+
+@st.cache_resource
+def get_llm_backend():
+    return make_backend(
+        GROQ_API_KEY, base_url=LLM_BASE_URL or None, model=st.secrets.get("LLM_MODEL"), scheduler=SCHEDULER
+    )
+
+
+# the single-lead scorer below and the batch runner send chat calls through this
+LLM_BACKEND = get_llm_backend()
+
+
+@st.cache_resource
+def get_single_flight():
+    return SingleFlight()
+
+
+# identical in-flight fetches/scores from any session share one call
+FLIGHTS = get_single_flight()
+
+
+@st.cache_resource
+def get_batch_runner():
+    return BatchLeadRunner(
+        # FRESHNESS_PROBE: re-use stale cached profiles whose newest post is unchanged
+        LinkedInAPIExtractor(
+            APIFY_API_KEY, cache=PROFILE_CACHE, freshness_probe=bool(st.secrets.get("FRESHNESS_PROBE"))
+        ),
+        GroqLeadScorer(cache=SCORE_CACHE, pre_scorer=PRE_SCORER, backend=LLM_BACKEND),
+    )
+
+
 # =========================
 # HELPERS
 # =========================
-def extract_username(linkedin_url: str):
-    if not linkedin_url:
-        return None
-    url = linkedin_url.strip().lower()
-    url = url.replace("https://", "").replace("http://", "").replace("www.", "")
-    if "linkedin.com/in/" not in url:
-        return None
-    username = url.split("linkedin.com/in/")[1].split("/")[0].split("?")[0]
-    return username.strip() if username else None
+def timed_post(provider: str, endpoint: str, **kwargs):
+    start = time.perf_counter()
+    resp = requests.post(endpoint, **kwargs)
+    METRICS.record_http(
+        provider, resp.status_code, len(resp.request.body or b""), len(resp.content), time.perf_counter() - start
+    )
+    return resp
 
 
 def fetch_linkedin_profile(linkedin_url: str):
     username = extract_username(linkedin_url)
     if not username:
         return None
+    # keyed like the extractor's own flights, so "Foo" and "foo" share one actor run
+    return FLIGHTS.do(("profile", username.lower()), lambda: _fetch_linkedin_profile(username))
+
+
+def _fetch_linkedin_profile(username: str):
+    cached = PROFILE_CACHE.get_profile(username)
+    METRICS.incr("cache_total", cache="profile", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
 
     endpoint = "https://api.apify.com/v2/acts/apimaestro~linkedin-profile-detail/run-sync-get-dataset-items"
     params = {"token": APIFY_API_KEY}
     payload = {"username": username, "includeEmail": False}
 
-    resp = requests.post(endpoint, params=params, json=payload, timeout=90)
+    with METRICS.timer("apify.profile_actor"):
+        resp = SCHEDULER.call(
+            "apify", lambda: timed_post("apify", endpoint, params=params, json=payload, timeout=90)
+        )
     if resp.status_code not in (200, 201):
         return None
 
     data = resp.json()
     if isinstance(data, list) and len(data) > 0:
-        return data[0]
+        data = data[0]
     if isinstance(data, dict):
+        PROFILE_CACHE.set_profile(username, data)
         return data
     return None
 
 
 def fetch_recent_posts(linkedin_url: str, limit: int = 2):
+    username = extract_username(linkedin_url)
+    if not username:
+        return _fetch_recent_posts(linkedin_url, username, limit)
+    return FLIGHTS.do(
+        ("posts", username.lower(), limit), lambda: _fetch_recent_posts(linkedin_url, username, limit)
+    )
+
+
+def _fetch_recent_posts(linkedin_url: str, username, limit: int):
+    if username:
+        cached = PROFILE_CACHE.get_posts(username)
+        METRICS.incr("cache_total", cache="posts", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached[:limit]
+
     endpoint = "https://api.apify.com/v2/acts/apimaestro~linkedin-batch-profile-posts-scraper/run-sync-get-dataset-items"
     params = {"token": APIFY_API_KEY}
     payload = {"includeEmail": False, "usernames": [linkedin_url.strip()]}
 
     try:
-        resp = requests.post(endpoint, params=params, json=payload, timeout=90)
+        with METRICS.timer("apify.posts_actor"):
+            resp = SCHEDULER.call(
+                "apify", lambda: timed_post("apify", endpoint, params=params, json=payload, timeout=90)
+            )
         if resp.status_code not in (200, 201):
             return []
 
@@ -319,8 +430,10 @@ def fetch_recent_posts(linkedin_url: str, limit: int = 2):
             except Exception:
                 return 0
 
-        data = sorted(data, key=get_ts, reverse=True)
-        return data[:limit]
+        data = sorted(data, key=get_ts, reverse=True)[:limit]
+        if username:
+            PROFILE_CACHE.set_posts(username, data)
+        return data
     except Exception:
         return []
 
@@ -338,23 +451,23 @@ def compute_activity_days(posts: list):
         return None
 
 
-def groq_score_lead(payload: dict):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    model = "llama-3.1-8b-instant"
+# bump whenever the prompt below changes so cached scores are invalidated
+SCORING_PROMPT_VERSION = "v2"
 
-    prompt = f"""
+# split once around {payload}; the payload is inserted as compact JSON
+SCORING_PROMPT = PromptBuilder("""
 You are a Predictive Lead Scoring Engine for ANY sector.
 
 Classify the prospect into one:
 HOT, WARM, COOL, COLD
 
 Return JSON only:
-{{
+{
   "priority": "HOT|WARM|COOL|COLD",
   "score": 0-100,
   "confidence": 0-100,
   "reasons": ["...", "...", "..."]
-}}
+}
 
 Rules:
 - Missing activity should be neutral, not negative.
@@ -362,50 +475,42 @@ Rules:
 - If company info is strong but activity missing, still can be WARM/HOT.
 
 Prospect Payload:
-{json.dumps(payload, indent=2)}
-"""
-
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    body = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are a lead scoring engine. Output JSON only."},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0.2,
-    }
-
-    resp = requests.post(url, headers=headers, json=body, timeout=60)
-
-    if resp.status_code != 200:
-        raise RuntimeError(f"Groq API error {resp.status_code}: {resp.text[:500]}")
-
-    raw = resp.json()["choices"][0]["message"]["content"].strip()
-
-    # ---- DEBUG SAFE PRINT (optional) ----
-    # st.write("RAW RESPONSE:", raw)
-
-    # 1) If response contains ```json ... ``` remove codeblock
-    raw = raw.replace("```json", "").replace("```", "").strip()
-
-    # 2) Extract first JSON object using regex
-    match = re.search(r"\{.*\}", raw, re.DOTALL)
-    if not match:
-        raise ValueError(f"Groq did not return JSON. Raw output:\n{raw[:500]}")
-
-    json_text = match.group(0).strip()
-
-    # 3) Parse JSON safely
-    data = json.loads(json_text)
-
-    # 4) Validate required fields
-    if "priority" not in data:
-        raise ValueError(f"Invalid JSON format: {data}")
+{payload}
+""")
+
+
+def groq_score_lead(payload: dict, use_cache: bool = True, pre_score: bool = True):
+    if pre_score:
+        ruled = PRE_SCORER.classify(payload)
+        if ruled is not None:
+            return ruled
+
+    cache_key = payload_fingerprint(payload, LLM_BACKEND.model, SCORING_PROMPT_VERSION)
+    if not use_cache:
+        return _groq_score_lead(payload, cache_key)
+
+    cached = SCORE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    return FLIGHTS.do(cache_key, lambda: _groq_score_lead(payload, cache_key))
+
+
+def _groq_score_lead(payload: dict, cache_key: str):
+    prompt, est_tokens = SCORING_PROMPT.build(payload)
+
+    messages = [
+        {"role": "system", "content": "You are a lead scoring engine. Output JSON only."},
+        {"role": "user", "content": prompt},
+    ]
+    # streamed; stops reading once a complete priority/score/confidence/reasons object is in
+    data = LLM_BACKEND.complete_json(
+        messages,
+        timeout=60,
+        cost_tokens=est_tokens + 300,
+        accept=lambda obj: valid_verdict(obj, require_score=True),
+    )
 
+    SCORE_CACHE.set(cache_key, data)
     return data
 
 
@@ -423,12 +528,8 @@ def badge(priority: str):
     return f"""<span class="badge {cls}"><i class="fa-solid {icon}"></i> {p}</span>"""
 
 
-def get_basic(profile_data: dict):
-    basic = profile_data.get("basic_info", {})
-    name = basic.get("fullname", "N/A")
-    headline = basic.get("headline", "N/A")
-    location = basic.get("location", {}).get("full", "N/A")
-    return name, headline, location
+def get_basic(record: LeadRecord):
+    return record.fullname or "N/A", record.headline or "N/A", record.location or "N/A"
 
 
 # =========================
@@ -452,6 +553,16 @@ if "result" not in st.session_state:
 if "debug_payload" not in st.session_state:
     st.session_state.debug_payload = None
 
+# per-lead timing/cost breakdown: {"extract": trace dict, "score": trace dict}
+if "timings" not in st.session_state:
+    st.session_state.timings = {}
+
+# one service client per session; the tenant keeps analysts' queues fair
+if SCORING_SERVICE_URL and "service_client" not in st.session_state:
+    st.session_state.service_client = ScoringServiceClient(
+        SCORING_SERVICE_URL, tenant=st.secrets.get("SCORING_TENANT") or f"session-{uuid.uuid4().hex[:8]}"
+    )
+
 
 # =========================
 # HEADER (CUSTOM)
@@ -513,6 +624,7 @@ if linkedin_url and linkedin_url.strip() != st.session_state.prev_url:
     st.session_state.activity_days = None
     st.session_state.result = None
     st.session_state.debug_payload = None
+    st.session_state.timings = {}
 
 btn1, btn2, btn3 = st.columns([1, 1, 1], gap="medium")
 
@@ -523,22 +635,50 @@ with btn2:
 with btn3:
     debug_btn = st.button("Show Debug Payload")
 
+use_score_cache = st.checkbox("Reuse cached score for identical inputs", value=True)
+use_pre_score = st.checkbox("Classify clear-cut leads locally (skip Groq)", value=True)
+
 if extract_btn:
     if not linkedin_url:
         st.warning("Please enter LinkedIn URL.")
     else:
-        with st.spinner("Extracting profile..."):
-            profile = fetch_linkedin_profile(linkedin_url)
-
-        with st.spinner("Extracting recent posts..."):
-            posts = fetch_recent_posts(linkedin_url, limit=2)
-            activity_days = compute_activity_days(posts)
+        record = None
+        if SCORING_SERVICE_URL:
+            # the service's workers run the actors; this session only polls for the result
+            try:
+                with st.spinner("Extraction queued on the scoring service..."):
+                    job = st.session_state.service_client.run("extract", linkedin_url=linkedin_url.strip())
+                record = LeadRecord.from_dict(job["record"])
+                activity_days = record.activity_days
+                st.session_state.timings = {"extract": job["timings"]}
+            except Exception as e:
+                st.warning(f"Scoring service: {e}")
+                activity_days = None
+        else:
+            # profile and posts actors are independent, run them side by side
+            with st.spinner("Extracting profile and recent posts..."), trace_lead() as trace:
+                # each worker runs in a copy of this context so it records into trace
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    profile_future = pool.submit(
+                        contextvars.copy_context().run, fetch_linkedin_profile, linkedin_url
+                    )
+                    posts_future = pool.submit(contextvars.copy_context().run, fetch_recent_posts, linkedin_url, 2)
+                    profile = profile_future.result()
+                    posts = posts_future.result()
+                activity_days = compute_activity_days(posts)
+            st.session_state.timings = {"extract": trace.to_dict()}
+
+            # keep only the compact record in the session, not the raw actor blob
+            if profile:
+                record = LeadRecord.from_apify(
+                    profile, posts=posts, username=(extract_username(linkedin_url) or "").lower(), activity_days=activity_days
+                )
 
-        st.session_state.profile_data = profile
-        st.session_state.posts = posts
+        st.session_state.profile_data = record
+        st.session_state.posts = list(record.recent_posts) if record else []
         st.session_state.activity_days = activity_days
 
-        if profile:
+        if record:
             st.success("Extraction completed successfully.")
         else:
             st.error("Extraction failed. Check URL or Apify response.")
@@ -564,8 +704,16 @@ if score_btn:
         st.session_state.debug_payload = payload
 
         try:
-            with st.spinner("Scoring lead..."):
-                res = groq_score_lead(payload)
+            if SCORING_SERVICE_URL:
+                with st.spinner("Scoring queued on the scoring service..."):
+                    res = st.session_state.service_client.run(
+                        "score", payload=payload, use_cache=use_score_cache, pre_score=use_pre_score
+                    )
+                st.session_state.timings["score"] = res.pop("timings", {})
+            else:
+                with st.spinner("Scoring lead..."), trace_lead() as trace:
+                    res = groq_score_lead(payload, use_cache=use_score_cache, pre_score=use_pre_score)
+                st.session_state.timings["score"] = trace.to_dict()
             st.session_state.result = res
             st.success("Scoring completed successfully.")
         except Exception as e:
@@ -574,6 +722,8 @@ if score_btn:
 if debug_btn and st.session_state.debug_payload:
     with st.expander("Debug Payload Sent to Groq", expanded=True):
         st.json(st.session_state.debug_payload)
+        _, est_tokens = SCORING_PROMPT.build(st.session_state.debug_payload)
+        st.caption(f"Estimated prompt tokens: {est_tokens}")
 
 
 # =========================
@@ -659,11 +809,16 @@ with out2:
             unsafe_allow_html=True,
         )
 
+        if res.get("source") == "rules":
+            explained_by = "Decided locally by the rule pre-scorer; Groq was not called."
+        else:
+            explained_by = "Generated dynamically by Groq based on extracted + manual inputs."
+
         st.markdown(
-            """
+            f"""
             <div class="card">
               <div class="card-title"><i class="fa-solid fa-circle-info"></i> Why this prediction?</div>
-              <div class="card-sub">Generated dynamically by Groq based on extracted + manual inputs.</div>
+              <div class="card-sub">{explained_by}</div>
             </div>
             """,
             unsafe_allow_html=True,
@@ -681,5 +836,113 @@ with out2:
                 )
         else:
             st.info("No reasons returned.")
+
+        pre_stats = PRE_SCORER.stats()
+        st.caption(
+            f"Pre-scorer: {pre_stats['HOT'] + pre_stats['COLD']}/{pre_stats['seen']} leads decided locally "
+            f"({pre_stats['hit_rate']:.0%} hit rate)"
+        )
     else:
         st.info("No scoring result yet. Generate score after extraction.")
+
+if st.session_state.timings:
+    with st.expander("Timing & cost breakdown", expanded=False):
+        stage_rows = []
+        totals = {"http": 0, "sent": 0, "received": 0, "cu": 0.0, "usd": 0.0, "prompt": 0, "completion": 0}
+        for phase, trace in st.session_state.timings.items():
+            stage_rows.append({"phase": phase, "stage": "total (wall)", "ms": round(trace["total_s"] * 1000, 1), "calls": 1})
+            for stage, t in trace["stages"].items():
+                stage_rows.append(
+                    {"phase": phase, "stage": stage, "ms": round(t["seconds"] * 1000, 1), "calls": t["calls"]}
+                )
+            for name, value in trace["counters"].items():
+                if name.startswith("http_requests_total"):
+                    totals["http"] += value
+                elif name.startswith("http_bytes_total") and "direction=sent" in name:
+                    totals["sent"] += value
+                elif name.startswith("http_bytes_total"):
+                    totals["received"] += value
+                elif name.startswith("apify_compute_units_total"):
+                    totals["cu"] += value
+                elif name.startswith("apify_usage_usd_total"):
+                    totals["usd"] += value
+                elif name.startswith("llm_tokens_total") and "kind=prompt" in name:
+                    totals["prompt"] += value
+                elif name.startswith("llm_tokens_total"):
+                    totals["completion"] += value
+
+        st.dataframe(pd.DataFrame(stage_rows), use_container_width=True, hide_index=True)
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("HTTP round-trips", int(totals["http"]))
+        m2.metric("KB sent / received", f"{totals['sent'] / 1024:.1f} / {totals['received'] / 1024:.1f}")
+        # run-sync actor calls return no run object, so CUs only show for async runs
+        m3.metric("Apify CUs", f"{totals['cu']:.4f}" if totals["cu"] else "n/a")
+        m4.metric("LLM tokens (prompt / completion)", f"{int(totals['prompt'])} / {int(totals['completion'])}")
+        st.caption("Stages overlap: profile and posts actors run concurrently, so stage times can exceed wall time.")
+
+
+# =========================
+# BATCH PANEL
+# =========================
+BATCH_COLUMNS = ["row", "username", "status", "priority", "score", "confidence", "activity_days", "error"]
+
+st.markdown(
+    """
+<div class="card">
+  <div class="card-title"><i class="fa-solid fa-list-check"></i> Batch Scoring</div>
+  <div class="card-sub">Upload a CSV/Parquet with a linkedin_url column (+ optional company_name, company_size, annual_revenue, industry). Results stream in as each lead finishes.</div>
+</div>
+""",
+    unsafe_allow_html=True,
+)
+
+if "batch_results" not in st.session_state:
+    st.session_state.batch_results = []
+
+batch_file = st.file_uploader("Lead list", type=["csv", "parquet"])
+batch_btn = st.button("Score List")
+
+if batch_btn:
+    if not batch_file:
+        st.warning("Please upload a lead list.")
+    else:
+        try:
+            leads_df = load_leads(batch_file)
+        except ValueError as e:
+            st.error(str(e))
+            leads_df = None
+
+        if leads_df is not None:
+            total = len(leads_df)
+            bar = st.progress(0.0)
+            status_line = st.empty()
+            table = st.empty()
+            rows = []
+            start = time.time()
+
+            for res in get_batch_runner().stream(iter_leads(leads_df)):
+                rows.append({k: res.get(k) for k in BATCH_COLUMNS})
+                if len(rows) % 10 == 0 or len(rows) == total:
+                    rate = len(rows) / max(time.time() - start, 1e-9)
+                    bar.progress(min(1.0, len(rows) / max(total, 1)))
+                    status_line.caption(f"{len(rows)}/{total} leads · {rate:.2f} rows/sec")
+                    # newest first, capped so the table stays cheap to redraw
+                    table.dataframe(pd.DataFrame(rows[::-1][:500], columns=BATCH_COLUMNS), use_container_width=True)
+
+            st.session_state.batch_results = rows
+            st.success(f"Scored {len(rows)} leads in {time.time() - start:.1f}s.")
+
+if st.session_state.batch_results:
+    results_df = pd.DataFrame(st.session_state.batch_results, columns=BATCH_COLUMNS).sort_values("row")
+    st.download_button(
+        "Download Results (CSV)",
+        results_df.to_csv(index=False).encode("utf-8"),
+        file_name="lead_scores.csv",
+        mime="text/csv",
+    )
+    st.download_button(
+        "Download Metrics (Prometheus)",
+        METRICS.to_prometheus().encode("utf-8"),
+        file_name="lead_metrics.prom",
+        mime="text/plain",
+    )
@@ -0,0 +1,279 @@
+import argparse
+import os
+import shutil
+import sys
+from functools import partial
+from typing import Optional
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.apify_replay import RecordingTransport, ReplayTransport
+from core.batch_runner import BatchLeadRunner, load_leads, iter_leads
+from core.groq_scorer import GroqLeadScorer
+from core.job_store import JobStore
+from core.lead_state import LeadStateStore
+from core.llm_backends import make_backend
+from core.metrics import get_default_metrics
+from core.pre_scorer import RulePreScorer
+from core.profile_cache import ProfileCache
+from core.rate_limiter import get_default_scheduler
+from core.score_cache import ScoreCache
+from core.sharded_runner import ShardedBatchRunner
+
+
+def make_transport(args):
+    if args.record_apify:
+        return RecordingTransport(args.record_apify)
+    if args.replay_apify:
+        return ReplayTransport(args.replay_apify)
+    return None
+
+
+def build_runner(args, shard: Optional[int] = None, shards: int = 1, transport=None) -> BatchLeadRunner:
+    """
+    Extractor, scorer and runner for the parsed command line. For one of
+    `shards` worker processes, provider limits are divided between the
+    processes and the profile cache and lead state are the shard's own files.
+    """
+    apify_key = os.environ.get("APIFY_API_KEY", "")
+    groq_key = os.environ.get("GROQ_API_KEY", "")
+
+    scheduler = get_default_scheduler()
+    scheduler.register(
+        "groq", requests_per_sec=args.groq_rpm / 60 / shards, burst=max(1.0, args.groq_rpm / shards),
+        tokens_per_min=args.groq_tpm / shards,
+    )
+    if shards > 1:
+        scheduler.register("apify", requests_per_sec=200 / shards, burst=200 / shards)
+        scheduler.provider("apify_runs").set_max_concurrency(max(1, 25 // shards))
+
+    if args.llm_base_url:
+        scheduler.register("llm", requests_per_sec=args.llm_rps / shards, burst=args.llm_rps / shards)
+    backend = make_backend(
+        groq_key, base_url=args.llm_base_url, model=args.llm_model, scheduler=scheduler,
+        stream=not args.no_stream,
+    )
+
+    if transport is None:
+        transport = make_transport(args)
+
+    cache = None
+    if not args.no_cache:
+        root, ext = os.path.splitext(args.cache)
+        # stable sharding sends a username to the same shard every run, so its cache stays warm
+        cache = ProfileCache(
+            args.cache if shard is None else f"{root}.shard{shard}{ext}",
+            profile_max_age=int(args.profile_max_age_days * 86400),
+        )
+
+    state_store = None
+    if args.state_db:
+        root, ext = os.path.splitext(args.state_db)
+        state_store = LeadStateStore(
+            args.state_db if shard is None else f"{root}.shard{shard}{ext}",
+            refresh_after_s=args.refresh_after_days * 86400,
+        )
+
+    pre_scorer = RulePreScorer(
+        hot_min_seniority=args.hot_min_seniority,
+        hot_min_employees=args.hot_min_employees,
+        hot_min_revenue=args.hot_min_revenue,
+        hot_max_activity_days=args.hot_max_activity_days,
+        enabled=not args.no_pre_score,
+    )
+
+    return BatchLeadRunner(
+        LinkedInAPIExtractor(
+            apify_key, cache=cache, base_url=args.apify_base_url, transport=transport, run_share=1 / shards,
+            freshness_probe=args.freshness_probe,
+        ),
+        GroqLeadScorer(
+            groq_key,
+            cache=None if args.no_score_cache else ScoreCache(),
+            token_budget=args.token_budget,
+            pre_scorer=pre_scorer,
+            backend=backend,
+        ),
+        concurrency=args.concurrency,
+        posts_batch_size=args.posts_batch_size,
+        score_batch_size=args.score_batch_size,
+        spill_dir=args.spill_dir,
+        state_store=state_store,
+    )
+
+
+def run_sharded(args, df, total: int) -> int:
+    runner = ShardedBatchRunner(partial(build_runner, args, shards=args.processes), processes=args.processes)
+
+    def progress(stats):
+        print(
+            f"\r{stats['rows']}/{total} rows  ok={stats['ok']} failed={stats['failed']} "
+            f"local={stats['pre_scored']} carried={stats['carried']}  {stats['rows_per_sec']:.2f} rows/sec  "
+            f"({args.processes} processes)",
+            end="",
+            file=sys.stderr,
+        )
+
+    stats = runner.run(
+        iter_leads(df, url_column=args.url_column),
+        args.output,
+        progress=progress,
+        job_db=args.job_db,
+        job_id=args.job_id,
+    )
+    print(file=sys.stderr)
+    print(
+        f"Done: {stats['rows']} rows in {stats['elapsed_s']:.1f}s "
+        f"({stats['rows_per_sec']:.2f} rows/sec), {stats['failed']} failed",
+        file=sys.stderr,
+    )
+    if args.export:
+        # the merged output already holds one line per lead, in row order
+        shutil.copyfile(args.output, args.export)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet list of LinkedIn leads.")
+    parser.add_argument("input", help="CSV or Parquet file with a LinkedIn URL column + company columns")
+    parser.add_argument("output", help="JSONL file results are appended to, or - for stdout")
+    parser.add_argument("--url-column", default="linkedin_url")
+    parser.add_argument("--concurrency", type=int, default=8, help="leads in flight per process")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="shard the list by username across this many worker processes; "
+                             "provider limits are split between them and the output is rewritten in row order")
+    parser.add_argument("--posts-batch-size", type=int, default=50,
+                        help="usernames packed into one posts-actor run")
+    parser.add_argument("--score-batch-size", type=int, default=10,
+                        help="prospects packed into one LLM request")
+    parser.add_argument("--groq-rpm", type=float, default=30,
+                        help="Groq requests/minute ceiling for your plan")
+    parser.add_argument("--groq-tpm", type=float, default=6000,
+                        help="initial Groq tokens/minute (updated from response headers)")
+    parser.add_argument("--apify-base-url", default="https://api.apify.com/v2",
+                        help="Apify API root, e.g. the load-test fake server")
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument("--record-apify", metavar="FIXTURE",
+                        help="record every Apify response to this JSON fixture")
+    replay.add_argument("--replay-apify", metavar="FIXTURE",
+                        help="serve Apify calls from a recorded fixture, no network")
+    parser.add_argument("--llm-base-url",
+                        help="OpenAI-compatible endpoint to score with instead of Groq, e.g. the load-test mock")
+    parser.add_argument("--llm-model", help="model name sent to the LLM backend")
+    parser.add_argument("--llm-rps", type=float, default=1000,
+                        help="with --llm-base-url: client-side requests/sec ceiling")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="wait for whole completions instead of streaming and stopping at the first verdict")
+    parser.add_argument("--token-budget", type=int, default=600,
+                        help="estimated prompt tokens allowed per lead; long posts are trimmed to fit")
+    parser.add_argument("--spill-dir", help="keep raw Apify JSON per lead (gzipped) in this directory")
+    parser.add_argument("--job-id", help="checkpoint progress under this id; re-run with the same id to resume")
+    parser.add_argument("--job-db", default="lead_jobs.sqlite3", help="SQLite job store path")
+    parser.add_argument("--export", help="with --job-id: write one final JSONL line per lead here when done")
+    parser.add_argument("--cache", default="lead_cache.sqlite3",
+                        help="SQLite profile/posts cache path")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--freshness-probe", action="store_true",
+                        help="when a cached profile is stale, re-use it if the lead's newest post is unchanged "
+                             "instead of re-running the profile actor")
+    parser.add_argument("--profile-max-age-days", type=float, default=90,
+                        help="with --freshness-probe: always re-run the profile actor past this age")
+    parser.add_argument("--state-db",
+                        help="incremental mode: remember each lead's inputs and result here, and on later runs "
+                             "only re-extract/re-score leads that changed")
+    parser.add_argument("--refresh-after-days", type=float, default=7,
+                        help="with --state-db: re-extract a lead whose CRM fields and newest post did not change "
+                             "after this long")
+    parser.add_argument("--no-score-cache", action="store_true",
+                        help="always call the LLM, even for identical payloads")
+    parser.add_argument("--no-pre-score", action="store_true",
+                        help="send every lead to the LLM, even clear-cut HOT/COLD ones")
+    parser.add_argument("--hot-min-seniority", type=int, default=4,
+                        help="pre-scorer: minimum seniority level (1-5) for a local HOT")
+    parser.add_argument("--hot-min-employees", type=int, default=1000,
+                        help="pre-scorer: company size for a local HOT")
+    parser.add_argument("--hot-min-revenue", type=float, default=100e6,
+                        help="pre-scorer: annual revenue (USD) for a local HOT")
+    parser.add_argument("--hot-max-activity-days", type=int, default=30,
+                        help="pre-scorer: a local HOT must have posted within this many days")
+    parser.add_argument("--metrics-out", help="write stage timings and counters here (Prometheus text format)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    apify_key = os.environ.get("APIFY_API_KEY", "")
+    groq_key = os.environ.get("GROQ_API_KEY", "")
+    if not (apify_key or args.replay_apify) or not (groq_key or args.llm_base_url):
+        print("Missing API keys. Set APIFY_API_KEY and GROQ_API_KEY.", file=sys.stderr)
+        return 2
+    if args.processes > 1 and (args.record_apify or args.metrics_out):
+        print("--record-apify and --metrics-out need a single process.", file=sys.stderr)
+        return 2
+    if args.processes > 1 and args.output == "-":
+        print("--processes needs an output file.", file=sys.stderr)
+        return 2
+
+    df = load_leads(args.input, url_column=args.url_column)
+    total = len(df)
+
+    if args.processes > 1:
+        return run_sharded(args, df, total)
+
+    transport = make_transport(args)
+    runner = build_runner(args, transport=transport)
+    cache = runner.extractor.cache
+    scheduler = get_default_scheduler()
+    backend = runner.scorer.backend
+    pre_scorer = runner.scorer.pre_scorer
+
+    def progress(stats):
+        queues = scheduler.metrics()
+        print(
+            f"\r{stats['rows']}/{total} rows  ok={stats['ok']} failed={stats['failed']} "
+            f"local={stats['pre_scored']} carried={stats['carried']}  "
+            f"{stats['rows_per_sec']:.2f} rows/sec  "
+            f"queued llm={queues[backend.provider]['queue_depth']} apify={queues['apify_runs']['queue_depth']}",
+            end="",
+            file=sys.stderr,
+        )
+
+    job_store = JobStore(args.job_db) if args.job_id else None
+
+    stats = runner.run(
+        iter_leads(df, url_column=args.url_column),
+        args.output,
+        progress=progress,
+        job_store=job_store,
+        job_id=args.job_id,
+    )
+    print(file=sys.stderr)
+    print(
+        f"Done: {stats['rows']} rows in {stats['elapsed_s']:.1f}s "
+        f"({stats['rows_per_sec']:.2f} rows/sec), {stats['failed']} failed",
+        file=sys.stderr,
+    )
+    if cache:
+        print(f"Cache: {cache.stats()}", file=sys.stderr)
+    if runner.state_store is not None:
+        print(f"Lead state: {runner.state_store.stats()}", file=sys.stderr)
+    if isinstance(transport, RecordingTransport):
+        transport.save()
+        print(f"Recorded Apify responses to {args.record_apify}", file=sys.stderr)
+    elif isinstance(transport, ReplayTransport):
+        print(f"Replay: {transport.stats}", file=sys.stderr)
+    print(f"Pre-scorer: {pre_scorer.stats()}", file=sys.stderr)
+    print(f"Rate limits: {scheduler.metrics()}", file=sys.stderr)
+    if args.metrics_out:
+        with open(args.metrics_out, "w", encoding="utf-8") as f:
+            f.write(get_default_metrics().to_prometheus())
+        print(f"Metrics written to {args.metrics_out}", file=sys.stderr)
+    if job_store:
+        print(f"Job {args.job_id}: {job_store.progress(args.job_id)}", file=sys.stderr)
+        if args.export:
+            job_store.export_results(args.job_id, args.export)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
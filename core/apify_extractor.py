@@ -1,143 +1,122 @@
-import requests
-import time
-from datetime import datetime
 from typing import Optional, Dict, List
 
+import httpx
+
+from core.async_apify_extractor import AsyncLinkedInAPIExtractor
+from core.lead_record import LeadRecord
+from core.loop_runner import BackgroundLoop, get_background_loop
+from core.metrics import MetricsRegistry
+from core.profile_cache import ProfileCache
+from core.rate_limiter import RateLimitScheduler
+
 
 class LinkedInAPIExtractor:
-    def __init__(self, api_key: str):
+    """
+    Blocking API over AsyncLinkedInAPIExtractor. Every call is run on a shared
+    background event loop, so all threads using this instance share one pool
+    of keep-alive connections to Apify.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int = 200,
+        loop: Optional[BackgroundLoop] = None,
+        async_extractor: Optional[AsyncLinkedInAPIExtractor] = None,
+        cache: Optional[ProfileCache] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        base_url: str = "https://api.apify.com/v2",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        run_share: float = 1.0,
+        freshness_probe: bool = False,
+    ):
         self.api_key = api_key
-        self.base_url = "https://api.apify.com/v2"
-        self.profile_actor_id = "apimaestro~linkedin-profile-detail"
-        self.posts_actor_id = "apimaestro~linkedin-batch-profile-posts-scraper"
+        self._loop = loop or get_background_loop()
+        self._async = async_extractor or AsyncLinkedInAPIExtractor(
+            api_key,
+            max_connections=max_connections,
+            cache=cache,
+            scheduler=scheduler,
+            base_url=base_url,
+            transport=transport,
+            metrics=metrics,
+            run_share=run_share,
+            freshness_probe=freshness_probe,
+        )
+
+    @property
+    def cache(self) -> Optional[ProfileCache]:
+        return self._async.cache
+
+    @property
+    def base_url(self) -> str:
+        return self._async.base_url
+
+    @property
+    def profile_actor_id(self) -> str:
+        return self._async.profile_actor_id
+
+    @property
+    def posts_actor_id(self) -> str:
+        return self._async.posts_actor_id
+
+    def close(self):
+        self._loop.run(self._async.aclose())
 
     def _extract_username(self, linkedin_url: str) -> Optional[str]:
-        if not linkedin_url:
-            return None
-
-        url = linkedin_url.strip()
-        if "linkedin.com/in/" in url:
-            username = url.split("linkedin.com/in/")[1].split("/")[0].split("?")[0]
-            return username.strip()
-        return None
+        return self._async._extract_username(linkedin_url)
 
     def _start_profile_actor(self, username: str) -> Optional[Dict]:
-        endpoint = f"{self.base_url}/acts/{self.profile_actor_id}/runs"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        payload = {"username": username, "includeEmail": False}
-
-        resp = requests.post(endpoint, headers=headers, json=payload, timeout=30)
-        if resp.status_code == 201:
-            data = resp.json()["data"]
-            return {"run_id": data["id"], "dataset_id": data["defaultDatasetId"]}
-        return None
-
-    def _wait_for_run(self, run_id: str, timeout: int = 180) -> bool:
-        start = time.time()
-        endpoint = f"{self.base_url}/actor-runs/{run_id}"
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-
-        while time.time() - start < timeout:
-            r = requests.get(endpoint, headers=headers, timeout=15)
-            if r.status_code == 200:
-                status = r.json()["data"]["status"]
-                if status == "SUCCEEDED":
-                    return True
-                if status in ("FAILED", "TIMED_OUT", "ABORTED"):
-                    return False
-            time.sleep(3)
-
-        return False
+        return self._loop.run(self._async._start_profile_actor(username))
 
-    def _fetch_dataset_items(self, dataset_id: str) -> Optional[List[Dict]]:
-        endpoint = f"{self.base_url}/datasets/{dataset_id}/items"
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        r = requests.get(endpoint, headers=headers, timeout=30)
+    def _wait_for_run(self, run_id: str, timeout: int = 180, actor_id: Optional[str] = None) -> bool:
+        return self._loop.run(self._async._wait_for_run(run_id, timeout, actor_id))
 
-        if r.status_code == 200:
-            items = r.json()
-            if isinstance(items, list):
-                return items
-        return None
+    def _fetch_dataset_items(self, dataset_id: str) -> Optional[List[Dict]]:
+        return self._loop.run(self._async._fetch_dataset_items(dataset_id))
 
     def _run_profile_actor(self, username: str) -> Optional[Dict]:
-        run_info = self._start_profile_actor(username)
-        if not run_info:
-            return None
-
-        ok = self._wait_for_run(run_info["run_id"])
-        if not ok:
-            return None
-
-        items = self._fetch_dataset_items(run_info["dataset_id"])
-        if not items:
-            return None
-
-        if isinstance(items, list) and len(items) > 0 and isinstance(items[0], dict):
-            return items[0]
-        return None
+        return self._loop.run(self._async._run_profile_actor(username))
 
     def extract_recent_posts(self, profile_url: str, limit: int = 2) -> List[Dict]:
-        try:
-            endpoint = (
-                f"{self.base_url}/acts/{self.posts_actor_id}/run-sync-get-dataset-items"
-                f"?token={self.api_key}"
-            )
-
-            payload = {"includeEmail": False, "usernames": [profile_url.strip()]}
-            headers = {"Content-Type": "application/json"}
-
-            response = requests.post(endpoint, json=payload, headers=headers, timeout=90)
-            if response.status_code not in (200, 201):
-                return []
-
-            data = response.json()
-            if not isinstance(data, list):
-                return []
-
-            def get_ts(post: Dict) -> int:
-                try:
-                    return int(post.get("posted_at", {}).get("timestamp", 0))
-                except Exception:
-                    return 0
-
-            data = sorted(data, key=get_ts, reverse=True)
-            return data[:limit]
-
-        except Exception:
-            return []
+        return self._loop.run(self._async.extract_recent_posts(profile_url, limit))
+
+    def extract_recent_posts_bulk(
+        self, profile_urls: List[str], limit: int = 2, batch_size: int = 50
+    ) -> Dict[str, Dict]:
+        """
+        Fetches posts for many profiles with one posts-actor run per batch_size
+        usernames, then splits the dataset back out per profile.
+
+        Returns {username: {"recent_posts": [...], "activity_days": int|None}}
+        keyed by the lower-cased username. Profiles from a batch whose actor
+        run failed are left out, so callers can fall back to
+        extract_recent_posts() for them. If a batch's dataset has posts that
+        name no owner, its profiles are fetched one by one instead.
+        """
+        return self._loop.run(self._async.extract_recent_posts_bulk(profile_urls, limit, batch_size))
 
     def compute_activity_days_from_posts(self, posts: List[Dict]) -> Optional[int]:
-        if not posts:
-            return None
-
-        ts = posts[0].get("posted_at", {}).get("timestamp")
-        if not ts:
-            return None
-
-        try:
-            post_dt = datetime.fromtimestamp(int(ts) / 1000)
-            days = (datetime.now() - post_dt).days
-            return max(0, int(days))
-        except Exception:
-            return None
-
-    def extract_profile(self, linkedin_url: str) -> Optional[Dict]:
-        username = self._extract_username(linkedin_url)
-        if not username:
-            return None
-
-        profile_data = self._run_profile_actor(username)
-        if not profile_data:
-            return None
-
-        posts = self.extract_recent_posts(linkedin_url, limit=2)
-        activity_days = self.compute_activity_days_from_posts(posts)
-
-        profile_data["recent_posts"] = posts
-        profile_data["activity_days"] = activity_days
+        return self._async.compute_activity_days_from_posts(posts)
+
+    def extract_profile(self, linkedin_url: str, posts: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        posts: recent posts already fetched for this profile (e.g. by
+        extract_recent_posts_bulk); skips the per-profile posts actor run.
+        Otherwise posts are fetched concurrently with the profile actor.
+        """
+        return self._loop.run(self._async.extract_profile(linkedin_url, posts))
+
+    def extract_lead_record(
+        self,
+        linkedin_url: str,
+        posts: Optional[List[Dict]] = None,
+        spill_dir: Optional[str] = None,
+    ) -> Optional[LeadRecord]:
+        """
+        extract_profile() reduced to a compact LeadRecord; the raw actor
+        output is dropped (or gzipped into spill_dir) right away.
+        """
+        return self._loop.run(self._async.extract_lead_record(linkedin_url, posts, spill_dir))
 
-        return profile_data
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional, Dict, List
+from urllib.parse import urlencode
+
+import httpx
+
+# query params that change between otherwise identical calls (auth, how long
+# is left to wait, how many runs are being watched) and must not be in the key
+VOLATILE_PARAMS = ("token", "waitForFinish", "limit")
+# response headers worth keeping; the rest are transport details
+KEPT_HEADERS = ("content-type", "retry-after", "location")
+
+
+def request_key(request: httpx.Request) -> str:
+    """
+    "METHOD /path?stable=params #bodyhash". Run/dataset ids are part of the
+    path, so replayed ids line up with the recorded follow-up calls.
+    """
+    params = sorted((k, v) for k, v in request.url.params.multi_items() if k not in VOLATILE_PARAMS)
+    key = f"{request.method} {request.url.path}"
+    if params:
+        key += "?" + urlencode(params)
+    content = request.content
+    if content:
+        key += " #" + hashlib.sha256(content).hexdigest()[:16]
+    return key
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Passes requests through to a real transport and records every response
+    (status, a few headers, body, elapsed time) under request_key(). Calls
+    with the same key, e.g. repeated run-status polls, are kept in order.
+    The fixture file is written by save() and on aclose().
+    """
+
+    def __init__(self, path: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.path = path
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.entries: Dict[str, List[Dict]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        elapsed = time.monotonic() - start
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+        with self._lock:
+            self.entries[request_key(request)].append(
+                {
+                    "status": response.status_code,
+                    "headers": headers,
+                    "body": body.decode("utf-8", errors="replace"),
+                    "elapsed_s": round(elapsed, 4),
+                }
+            )
+        # body is already decoded, so drop content-encoding/length
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    def save(self):
+        with self._lock:
+            data = {"version": 1, "entries": dict(self.entries)}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    async def aclose(self):
+        await self.transport.aclose()
+        self.save()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serves responses captured by RecordingTransport, with no network. Each
+    key replays its recorded responses in order and then repeats the last
+    one. Recorded latency is reproduced times latency_scale, or replaced by
+    a fixed `latency` (seconds). Unknown requests get a 404.
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0, latency: Optional[float] = None):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.entries: Dict[str, List[Dict]] = data.get("entries") or {}
+        self.latency_scale = latency_scale
+        self.latency = latency
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        responses = self.entries.get(key)
+        if not responses:
+            self.stats["misses"] += 1
+            return httpx.Response(
+                404,
+                json={"error": {"type": "record-not-found", "message": f"no recorded response for {key}"}},
+                request=request,
+            )
+
+        i = self._cursor[key]
+        self._cursor[key] = i + 1
+        entry = responses[min(i, len(responses) - 1)]
+        self.stats["hits"] += 1
+
+        delay = self.latency if self.latency is not None else entry.get("elapsed_s", 0) * self.latency_scale
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            entry["status"], headers=entry.get("headers") or {}, content=entry["body"].encode("utf-8"), request=request
+        )
@@ -0,0 +1,629 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional, Dict, List
+
+import httpx
+
+from core.lead_record import LeadRecord
+from core.metrics import MetricsRegistry, get_default_metrics
+from core.profile_cache import ProfileCache
+from core.rate_limiter import RateLimitScheduler, get_default_scheduler
+from core.single_flight import AsyncSingleFlight
+
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "TIMED_OUT", "ABORTED")
+# bulk run watcher: poll interval while runs are finishing / ceiling while they are not
+BULK_POLL_MIN_S = 0.5
+BULK_POLL_MAX_S = 2.0
+
+
+def extract_username(linkedin_url: str) -> Optional[str]:
+    """
+    Username of a LinkedIn profile URL, as typed. Host casing, www., trailing
+    slashes, query strings and fragments all map to the same username; key
+    caches and coalesced calls on its lower-cased form.
+    """
+    if not linkedin_url:
+        return None
+
+    url = linkedin_url.strip()
+    idx = url.lower().find("linkedin.com/in/")
+    if idx != -1:
+        username = url[idx + len("linkedin.com/in/"):]
+        username = username.split("/")[0].split("?")[0].split("#")[0]
+        return username.strip() or None
+    return None
+
+
+class AsyncLinkedInAPIExtractor:
+    """
+    asyncio version of LinkedInAPIExtractor on one pooled httpx.AsyncClient.
+    Keep-alive connections are reused across calls, so a single process can
+    have hundreds of actor runs in flight. Use it from one event loop only.
+
+    With freshness_probe, a cached profile past its TTL is not refetched
+    right away: the lead's recent posts (cheap, usually prefetched or cached)
+    are fetched first, and if the newest post is the one the profile was
+    stored with, the cached profile is served again. Only a changed, missing
+    or too-old profile runs the profile actor.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int = 200,
+        max_keepalive_connections: int = 50,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ProfileCache] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        wait_for_finish: int = 60,
+        bulk_wait_threshold: int = 8,
+        base_url: str = "https://api.apify.com/v2",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        run_share: float = 1.0,
+        freshness_probe: bool = False,
+    ):
+        self.api_key = api_key
+        self.cache = cache
+        self.freshness_probe = freshness_probe
+        self.scheduler = scheduler or get_default_scheduler()
+        self.metrics = metrics or get_default_metrics()
+        self._run_limits_checked = False
+        # fraction of the account's concurrent-run limit this process may use
+        # when several processes share one Apify account
+        self.run_share = run_share
+        # coalesces concurrent fetches of the same username into one actor run
+        self.flights = AsyncSingleFlight()
+
+        # run waiting: long-poll up to wait_for_finish seconds per request
+        # (Apify caps waitForFinish at 60); once bulk_wait_threshold runs are
+        # outstanding, one watcher task lists run statuses for all of them
+        self.wait_for_finish = min(60, max(0, wait_for_finish))
+        self.bulk_wait_threshold = bulk_wait_threshold
+        self._waiting_runs = 0
+        self._watched: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._watch_tasks: Dict[str, asyncio.Task] = {}
+        # set when a run is handed to an actor's watcher, to cut a backed-off sleep short
+        self._watch_wakeups: Dict[str, asyncio.Event] = {}
+        self.poll_stats = {"runs_waited": 0, "status_requests": 0, "bulk_status_requests": 0}
+        # a local fake server / record-replay transport can stand in for Apify
+        self.base_url = base_url.rstrip("/")
+        self.profile_actor_id = "apimaestro~linkedin-profile-detail"
+        self.posts_actor_id = "apimaestro~linkedin-batch-profile-posts-scraper"
+
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(30.0),
+            transport=transport,
+        )
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _auth_headers(self) -> Dict:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async def send():
+            # one round-trip per attempt, retries included
+            start = time.perf_counter()
+            resp = await self.client.request(method, url, **kwargs)
+            self.metrics.record_http(
+                "apify", resp.status_code, len(resp.request.content or b""), len(resp.content),
+                time.perf_counter() - start,
+            )
+            return resp
+
+        return await self.scheduler.acall("apify", send)
+
+    def _record_run_usage(self, run: Optional[Dict]):
+        """Apify compute units / USD of a finished run, when the API reports them."""
+        if not isinstance(run, dict):
+            return
+        units = (run.get("stats") or {}).get("computeUnits")
+        if units:
+            self.metrics.incr("apify_compute_units_total", float(units))
+        usd = run.get("usageTotalUsd")
+        if usd:
+            self.metrics.incr("apify_usage_usd_total", float(usd))
+
+    async def _ensure_run_limits(self):
+        """
+        Sizes the apify_runs slot pool from the account's concurrent-run limit
+        once per extractor, so we queue locally instead of getting refused.
+        """
+        if self._run_limits_checked:
+            return
+        self._run_limits_checked = True
+        try:
+            r = await self._request("GET", f"{self.base_url}/users/me/limits",
+                                    headers=self._auth_headers(), timeout=15)
+            if r.status_code == 200:
+                limit = r.json()["data"]["limits"]["maxConcurrentActorJobs"]
+                if limit:
+                    self.scheduler.provider("apify_runs").set_max_concurrency(max(1, int(limit * self.run_share)))
+        except Exception:
+            pass
+
+    def _extract_username(self, linkedin_url: str) -> Optional[str]:
+        return extract_username(linkedin_url)
+
+    async def _start_profile_actor(self, username: str) -> Optional[Dict]:
+        endpoint = f"{self.base_url}/acts/{self.profile_actor_id}/runs"
+        payload = {"username": username, "includeEmail": False}
+
+        resp = await self._request("POST", endpoint, headers=self._auth_headers(), json=payload, timeout=30)
+        if resp.status_code == 201:
+            data = resp.json()["data"]
+            return {"run_id": data["id"], "dataset_id": data["defaultDatasetId"]}
+        return None
+
+    async def _wait_for_run(self, run_id: str, timeout: int = 180, actor_id: Optional[str] = None) -> bool:
+        """
+        Waits for an actor run to reach a terminal status. Returns True only
+        for SUCCEEDED. With few runs outstanding each one long-polls its run
+        endpoint; under load, runs are handed to a per-actor bulk watcher.
+        """
+        self.poll_stats["runs_waited"] += 1
+        self._waiting_runs += 1
+        try:
+            with self.metrics.timer("apify.run_wait"):
+                if self._waiting_runs > self.bulk_wait_threshold:
+                    run = await self._wait_bulk(run_id, actor_id or self.profile_actor_id, timeout)
+                else:
+                    run = await self._wait_long_poll(run_id, timeout)
+        finally:
+            self._waiting_runs -= 1
+        self._record_run_usage(run)
+        return (run or {}).get("status") == "SUCCEEDED"
+
+    async def _get_run(self, run_id: str, wait: int = 0) -> Optional[Dict]:
+        endpoint = f"{self.base_url}/actor-runs/{run_id}"
+        params = {"waitForFinish": wait} if wait else None
+        self.poll_stats["status_requests"] += 1
+        r = await self._request(
+            "GET", endpoint, headers=self._auth_headers(), params=params, timeout=wait + 15
+        )
+        if r.status_code == 200:
+            return r.json()["data"]
+        return None
+
+    async def _wait_long_poll(self, run_id: str, timeout: int) -> Optional[Dict]:
+        deadline = time.time() + timeout
+        backoff = 1.0
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+
+            wait = int(min(self.wait_for_finish, remaining))
+            sent = time.time()
+            try:
+                run = await self._get_run(run_id, wait=wait)
+            except httpx.HTTPError:
+                run = None
+            status = run.get("status") if run else None
+
+            if status in TERMINAL_STATUSES:
+                return run
+            if status is not None and wait >= 1 and time.time() - sent >= wait / 2:
+                # the server held the request for us, no need to sleep
+                backoff = 1.0
+                continue
+
+            # long-poll unavailable or errored: exponential backoff
+            await asyncio.sleep(min(backoff, max(0.0, deadline - time.time())))
+            backoff = min(backoff * 2, 15.0)
+
+    async def _wait_bulk(self, run_id: str, actor_id: str, timeout: int) -> Optional[Dict]:
+        fut = asyncio.get_running_loop().create_future()
+        self._watched.setdefault(actor_id, {})[run_id] = fut
+        self._watch_wakeups.setdefault(actor_id, asyncio.Event()).set()
+
+        task = self._watch_tasks.get(actor_id)
+        if task is None or task.done():
+            self._watch_tasks[actor_id] = asyncio.ensure_future(self._watch_runs(actor_id))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._watched.get(actor_id, {}).pop(run_id, None)
+
+    async def _watch_runs(self, actor_id: str):
+        """
+        One loop per actor: lists the actor's most recent runs and resolves
+        every watched run that has finished. Runs too old to appear in the
+        listing are checked individually, concurrently. The poll interval
+        backs off to BULK_POLL_MAX_S while nothing finishes and drops back to
+        BULK_POLL_MIN_S whenever a run finishes or a new one is registered.
+        """
+        interval = BULK_POLL_MIN_S
+        endpoint = f"{self.base_url}/acts/{actor_id}/runs"
+        loop = asyncio.get_running_loop()
+        wakeup = self._watch_wakeups.setdefault(actor_id, asyncio.Event())
+
+        while self._watched.get(actor_id):
+            slept_from = loop.time()
+            try:
+                await asyncio.wait_for(wakeup.wait(), interval)
+                # a new run: don't make it sit out a backed-off interval
+                interval = BULK_POLL_MIN_S
+                await asyncio.sleep(max(0.0, slept_from + interval - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            watched = self._watched.get(actor_id, {})
+            if not watched:
+                break
+
+            runs = {}
+            try:
+                self.poll_stats["bulk_status_requests"] += 1
+                r = await self._request(
+                    "GET",
+                    endpoint,
+                    headers=self._auth_headers(),
+                    params={"desc": 1, "limit": min(1000, max(50, 2 * len(watched)))},
+                    timeout=30,
+                )
+                if r.status_code == 200:
+                    items = r.json()["data"]["items"]
+                    runs = {it.get("id"): it for it in items}
+            except (httpx.HTTPError, KeyError, ValueError):
+                runs = {}
+
+            missing = [run_id for run_id in watched if run_id not in runs] if runs else []
+            if missing:
+                fetched = await asyncio.gather(
+                    *(self._get_run(run_id) for run_id in missing), return_exceptions=True
+                )
+                for run_id, run in zip(missing, fetched):
+                    if isinstance(run, dict):
+                        runs[run_id] = run
+
+            resolved = 0
+            for run_id, fut in list(watched.items()):
+                run = runs.get(run_id)
+                if run and run.get("status") in TERMINAL_STATUSES and not fut.done():
+                    fut.set_result(run)
+                    resolved += 1
+
+            # poll faster while runs are finishing, back off while they are not
+            interval = BULK_POLL_MIN_S if resolved else min(interval * 1.5, BULK_POLL_MAX_S)
+
+    async def _fetch_dataset_items(self, dataset_id: str) -> Optional[List[Dict]]:
+        endpoint = f"{self.base_url}/datasets/{dataset_id}/items"
+        with self.metrics.timer("apify.dataset"):
+            r = await self._request("GET", endpoint, headers=self._auth_headers(), timeout=30)
+
+        if r.status_code == 200:
+            items = r.json()
+            if isinstance(items, list):
+                return items
+        return None
+
+    async def _run_profile_actor(self, username: str) -> Optional[Dict]:
+        with self.metrics.timer("apify.profile_actor"):
+            return await self._run_profile_actor_untimed(username)
+
+    async def _run_profile_actor_untimed(self, username: str) -> Optional[Dict]:
+        await self._ensure_run_limits()
+        queued = time.perf_counter()
+        async with self.scheduler.aslot("apify_runs"):
+            self.metrics.observe("apify.run_slot_wait", time.perf_counter() - queued)
+            with self.metrics.timer("apify.run_start"):
+                run_info = await self._start_profile_actor(username)
+            if not run_info:
+                return None
+
+            ok = await self._wait_for_run(run_info["run_id"], actor_id=self.profile_actor_id)
+            if not ok:
+                return None
+
+        items = await self._fetch_dataset_items(run_info["dataset_id"])
+        if not items:
+            return None
+
+        if isinstance(items, list) and len(items) > 0 and isinstance(items[0], dict):
+            return items[0]
+        return None
+
+    def _latest_posts(self, posts: List[Dict], limit: int) -> List[Dict]:
+        def get_ts(post: Dict) -> int:
+            try:
+                return int(post.get("posted_at", {}).get("timestamp", 0))
+            except Exception:
+                return 0
+
+        return sorted(posts, key=get_ts, reverse=True)[:limit]
+
+    def _post_owner(self, post: Dict) -> Optional[str]:
+        author = post.get("author") or {}
+        if isinstance(author, dict):
+            if author.get("username"):
+                return str(author["username"]).strip().lower()
+            owner = self._extract_username(author.get("profile_url") or author.get("url") or "")
+            if owner:
+                return owner.lower()
+
+        for key in ("username", "profile_input", "input"):
+            value = post.get(key)
+            if isinstance(value, str) and value.strip():
+                owner = self._extract_username(value) or value.strip()
+                return owner.lower()
+        return None
+
+    async def _run_posts_actor(self, usernames: List[str], timeout: int = 90) -> Optional[List[Dict]]:
+        endpoint = f"{self.base_url}/acts/{self.posts_actor_id}/run-sync-get-dataset-items"
+        payload = {"includeEmail": False, "usernames": usernames}
+
+        await self._ensure_run_limits()
+        async with self.scheduler.aslot("apify_runs"):
+            # run-sync: the response carries no run object, so no compute units
+            with self.metrics.timer("apify.posts_actor"):
+                response = await self._request(
+                    "POST", endpoint, params={"token": self.api_key}, json=payload, timeout=timeout
+                )
+        if response.status_code not in (200, 201):
+            return None
+
+        data = response.json()
+        if not isinstance(data, list):
+            return None
+        return data
+
+    async def extract_recent_posts(self, profile_url: str, limit: int = 2) -> List[Dict]:
+        username = self._extract_username(profile_url or "")
+        if not username:
+            return await self._extract_recent_posts(profile_url, username, limit)
+        return await self.flights.do(
+            ("posts", username.lower(), limit),
+            lambda: self._extract_recent_posts(profile_url, username, limit),
+        )
+
+    async def _extract_recent_posts(self, profile_url: str, username: Optional[str], limit: int) -> List[Dict]:
+        if self.cache and username:
+            cached = self.cache.get_posts(username)
+            self.metrics.incr("cache_total", cache="posts", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached[:limit]
+
+        try:
+            data = await self._run_posts_actor([profile_url.strip()])
+            if data is None:
+                return []
+            posts = self._latest_posts(data, limit)
+            if self.cache and username:
+                self.cache.set_posts(username, posts)
+            return posts
+
+        except Exception:
+            return []
+
+    async def extract_recent_posts_bulk(
+        self, profile_urls: List[str], limit: int = 2, batch_size: int = 50
+    ) -> Dict[str, Dict]:
+        """
+        Same contract as LinkedInAPIExtractor.extract_recent_posts_bulk; the
+        per-batch actor runs are issued concurrently.
+        """
+        wanted = {}
+        for url in profile_urls:
+            username = self._extract_username(url or "")
+            if username and username.lower() not in wanted:
+                wanted[username.lower()] = url.strip()
+
+        results = {}
+        if self.cache:
+            for username in list(wanted):
+                cached = self.cache.get_posts(username)
+                if cached is not None:
+                    posts = cached[:limit]
+                    results[username] = {
+                        "recent_posts": posts,
+                        "activity_days": self.compute_activity_days_from_posts(posts),
+                    }
+                    del wanted[username]
+
+        keys = list(wanted)
+        chunks = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+
+        async def run_chunk(chunk: List[str]) -> Optional[List[Dict]]:
+            try:
+                # allow more time for bigger runs, same 90s floor as a single fetch
+                return await self._run_posts_actor(
+                    [wanted[k] for k in chunk], timeout=max(90, 10 * len(chunk))
+                )
+            except Exception:
+                return None
+
+        datasets = await asyncio.gather(*(run_chunk(c) for c in chunks))
+
+        unattributed = []
+        for chunk, data in zip(chunks, datasets):
+            if data is None:
+                continue
+
+            grouped = self._group_posts(chunk, data)
+            if grouped is None:
+                # an empty list here would be cached as "no posts" for the whole chunk
+                self.metrics.incr("apify_posts_unattributed_total")
+                unattributed.extend(chunk)
+                continue
+
+            for username, posts in grouped.items():
+                posts = self._latest_posts(posts, limit)
+                if self.cache:
+                    self.cache.set_posts(username, posts)
+                results[username] = {
+                    "recent_posts": posts,
+                    "activity_days": self.compute_activity_days_from_posts(posts),
+                }
+
+        if unattributed:
+            fetched = await asyncio.gather(
+                *(self.extract_recent_posts(wanted[k], limit) for k in unattributed), return_exceptions=True
+            )
+            for username, posts in zip(unattributed, fetched):
+                if isinstance(posts, list):
+                    results[username] = {
+                        "recent_posts": posts,
+                        "activity_days": self.compute_activity_days_from_posts(posts),
+                    }
+
+        return results
+
+    def _group_posts(self, chunk: List[str], data: List) -> Optional[Dict[str, List[Dict]]]:
+        """
+        Splits one posts-actor dataset back out per username in `chunk`, or
+        None if some post names no owner, in which case nobody's posts can
+        be trusted to be complete.
+        """
+        grouped = {k: [] for k in chunk}
+        for post in data:
+            if not isinstance(post, dict):
+                continue
+            owner = chunk[0] if len(chunk) == 1 else self._post_owner(post)
+            if owner is None:
+                return None
+            if owner in grouped:
+                grouped[owner].append(post)
+        return grouped
+
+    def compute_activity_days_from_posts(self, posts: List[Dict]) -> Optional[int]:
+        if not posts:
+            return None
+
+        ts = posts[0].get("posted_at", {}).get("timestamp")
+        if not ts:
+            return None
+
+        try:
+            post_dt = datetime.fromtimestamp(int(ts) / 1000)
+            days = (datetime.now() - post_dt).days
+            return max(0, int(days))
+        except Exception:
+            return None
+
+    def posts_validator(self, posts: Optional[List[Dict]]) -> Optional[str]:
+        """
+        Change signal stored with a cached profile: the newest post's
+        timestamp. None without posts, so a profile that never posts is
+        always refetched once stale.
+        """
+        if not posts:
+            return None
+        ts = self._latest_posts(posts, 1)[0].get("posted_at", {}).get("timestamp")
+        return str(int(ts)) if ts else None
+
+    async def _cached_profile(
+        self, username: str, posts: Optional[List[Dict]] = None, probe: bool = False
+    ) -> Optional[Dict]:
+        return await self.flights.do(
+            ("profile", username.lower()), lambda: self._cached_profile_uncoalesced(username, posts, probe)
+        )
+
+    async def _cached_profile_uncoalesced(
+        self, username: str, posts: Optional[List[Dict]] = None, probe: bool = False
+    ) -> Optional[Dict]:
+        """
+        posts: the lead's recent posts, if already known; stored as the
+        profile's validator. probe: revalidate a stale cached profile
+        against them before running the profile actor.
+        """
+        if self.cache:
+            cached = self.cache.get_profile(username)
+            self.metrics.incr("cache_total", cache="profile", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+            if probe:
+                cached = self.cache.revalidate_profile(username, self.posts_validator(posts))
+                self.metrics.incr("profile_probe_total", result="fresh" if cached is not None else "changed")
+                if cached is not None:
+                    return cached
+
+        profile_data = await self._run_profile_actor(username)
+        if profile_data and self.cache:
+            self.cache.set_profile(username, profile_data, validator=self.posts_validator(posts))
+        return profile_data
+
+    async def extract_profile(self, linkedin_url: str, posts: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        posts: recent posts already fetched for this profile (e.g. by
+        extract_recent_posts_bulk); skips the per-profile posts actor run.
+
+        Otherwise the posts actor runs concurrently with the profile actor,
+        so wall time is max(profile, posts) rather than their sum, except
+        when the freshness probe needs the posts first.
+        """
+        username = self._extract_username(linkedin_url)
+        if not username:
+            return None
+
+        posts_task = None
+        if posts is None:
+            posts_task = asyncio.ensure_future(self.extract_recent_posts(linkedin_url, limit=2))
+
+        probe = (
+            self.freshness_probe
+            and self.cache is not None
+            and self.cache.stale_profile_validator(username) is not None
+        )
+        try:
+            if probe and posts_task:
+                posts = await posts_task
+                posts_task = None
+            profile_data = await self._cached_profile(username, posts, probe)
+        except BaseException:
+            if posts_task:
+                posts_task.cancel()
+            raise
+
+        if not profile_data:
+            if posts_task:
+                posts_task.cancel()
+            return None
+
+        if posts_task:
+            posts = await posts_task
+            if self.cache:
+                # the profile may have been stored before its posts were known
+                self.cache.set_profile_validator(username, self.posts_validator(posts))
+        activity_days = self.compute_activity_days_from_posts(posts)
+
+        profile_data["recent_posts"] = posts
+        profile_data["activity_days"] = activity_days
+
+        return profile_data
+
+    async def extract_lead_record(
+        self,
+        linkedin_url: str,
+        posts: Optional[List[Dict]] = None,
+        spill_dir: Optional[str] = None,
+    ) -> Optional[LeadRecord]:
+        """
+        extract_profile() reduced to a compact LeadRecord; the raw actor
+        output is dropped (or gzipped into spill_dir) right away.
+        """
+        profile_data = await self.extract_profile(linkedin_url, posts)
+        if not profile_data:
+            return None
+        username = (self._extract_username(linkedin_url) or "").lower()
+        return LeadRecord.from_apify(profile_data, username=username, spill_dir=spill_dir)
+
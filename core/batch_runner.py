@@ -0,0 +1,485 @@
+import asyncio
+import contextlib
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, List, Iterable, Iterator, AsyncIterable, AsyncIterator, Callable, Tuple
+
+import pandas as pd
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.feature_builder import FeatureBuilderLLM
+from core.groq_scorer import GroqLeadScorer
+from core.job_store import JobStore
+from core.lead_state import LeadStateStore, CARRY
+from core.metrics import MetricsRegistry, get_default_metrics
+
+
+COMPANY_COLUMNS = ("company_name", "company_size", "annual_revenue", "industry")
+
+
+def load_leads(source, url_column: str = "linkedin_url") -> pd.DataFrame:
+    """
+    Reads a CSV or Parquet lead list from a path or an uploaded file object
+    (format taken from its name). Every column is kept as a string so
+    company fields like "5,001-10,000 employees" are passed through untouched.
+    """
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if name.lower().endswith((".parquet", ".pq")):
+        df = pd.read_parquet(source)
+    else:
+        df = pd.read_csv(source, dtype=str, keep_default_na=False)
+
+    if url_column not in df.columns:
+        raise ValueError(f"Input file has no '{url_column}' column")
+
+    for col in COMPANY_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+
+    return df.fillna("")
+
+
+def iter_leads(df: pd.DataFrame, url_column: str = "linkedin_url") -> Iterable[Tuple[int, Dict]]:
+    columns = [url_column, *COMPANY_COLUMNS]
+    for row_id, values in enumerate(df[columns].itertuples(index=False, name=None)):
+        lead = {col: str(v or "") for col, v in zip(COMPANY_COLUMNS, values[1:])}
+        lead["linkedin_url"] = str(values[0] or "").strip()
+        yield row_id, lead
+
+
+class BatchLeadRunner:
+    """
+    Runs extraction + scoring for many leads with a bounded number of leads
+    in flight. Results are appended to a JSONL file as soon as each lead
+    finishes, so output order follows completion order (use "row" to re-sort).
+
+    Recent posts are fetched ahead of time for posts_batch_size leads per
+    posts-actor run, overlapping with extraction of the previous chunk.
+    Extracted leads are scored score_batch_size at a time in one LLM request.
+
+    With a state_store, leads scored in an earlier run are not redone unless
+    they changed: see LeadStateStore. Reused results carry
+    "carried_forward": True.
+    """
+
+    def __init__(
+        self,
+        extractor: LinkedInAPIExtractor,
+        scorer: GroqLeadScorer,
+        feature_builder: Optional[FeatureBuilderLLM] = None,
+        concurrency: int = 8,
+        posts_batch_size: int = 50,
+        score_batch_size: int = 10,
+        spill_dir: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        state_store: Optional[LeadStateStore] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        if posts_batch_size < 1:
+            raise ValueError("posts_batch_size must be >= 1")
+        if score_batch_size < 1:
+            raise ValueError("score_batch_size must be >= 1")
+        self.extractor = extractor
+        self.scorer = scorer
+        self.feature_builder = feature_builder or FeatureBuilderLLM()
+        self.concurrency = concurrency
+        self.posts_batch_size = posts_batch_size
+        self.score_batch_size = score_batch_size
+        # raw Apify JSON is gzipped here per lead when set; only compact
+        # LeadRecords stay in memory
+        self.spill_dir = spill_dir
+        self.metrics = metrics or get_default_metrics()
+        self.state_store = state_store
+
+    def _prefetch_posts(self, chunk: List[Dict]) -> List[Dict]:
+        """
+        Fills item["posts"] for every item in the chunk that has neither
+        posts nor a built payload yet, using one bulk fetch. Items whose
+        posts could not be fetched keep posts=None and fall back to the
+        per-lead fetch inside extract_profile.
+        """
+        need = [item for item in chunk if item.get("posts") is None and item.get("payload") is None]
+        if not need:
+            return chunk
+
+        urls = [item["lead"].get("linkedin_url", "") for item in need]
+        try:
+            with self.metrics.timer("batch.prefetch_posts"):
+                posts_map = self.extractor.extract_recent_posts_bulk(urls, batch_size=self.posts_batch_size)
+        except Exception:
+            posts_map = {}
+
+        for item in need:
+            username = self.extractor._extract_username(item["lead"].get("linkedin_url", ""))
+            entry = posts_map.get((username or "").lower())
+            if entry is not None:
+                item["posts"] = entry["recent_posts"]
+                item["posts_fetched"] = True
+        return chunk
+
+    def _plan_item(self, item: Dict, to_record: Dict[int, Tuple]):
+        """
+        Asks state_store whether a lead needs extracting, given its prefetched
+        posts. Sets item["carried"] to the finished result when it does not,
+        or item["payload"]/["result"] (so only scoring is left) when just its
+        activity bucket moved.
+        """
+        lead = item["lead"]
+        url = lead.get("linkedin_url", "")
+        username = self.extractor._extract_username(url)
+        plan = self.state_store.plan(username, lead, posts=item.get("posts"))
+        if plan is None:
+            return
+        action, payload, stored, latest_post_ts = plan
+        ids = {"row": item["row"], "linkedin_url": url, "username": username}
+        if action == CARRY:
+            item["carried"] = dict(stored, **ids, status="ok", error=None, carried_forward=True)
+        else:
+            item["payload"] = payload
+            item["result"] = dict(stored, **ids)
+            to_record[item["row"]] = (username, lead, payload, latest_post_ts, False)
+
+    def extract_lead(self, row_id: int, lead: Dict, posts: Optional[List[Dict]] = None) -> Tuple[Dict, Optional[Dict]]:
+        """
+        Extraction stage for one lead. Returns (result, payload); payload is
+        None when the lead already failed and should not be scored.
+        """
+        url = lead.get("linkedin_url", "")
+        result = {
+            "row": row_id,
+            "linkedin_url": url,
+            "username": self.extractor._extract_username(url),
+            "status": "ok",
+            "error": None,
+        }
+
+        try:
+            with self.metrics.timer("batch.extract"):
+                record = self.extractor.extract_lead_record(url, posts=posts, spill_dir=self.spill_dir)
+            if not record:
+                result.update(status="failed", error="extraction failed")
+                return result, None
+
+            result["activity_days"] = record.activity_days
+            result["_latest_post_ts"] = record.latest_post_ts
+            with self.metrics.timer("batch.build_payload"):
+                return result, self.feature_builder.build_payload(record, lead)
+        except Exception as e:
+            result.update(status="failed", error=str(e)[:500])
+            return result, None
+
+    def score_group(self, group: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """
+        Scoring stage: scores (result, payload) pairs in one batched request
+        and fills the score fields into each result.
+        """
+        payloads = {str(result["row"]): payload for result, payload in group}
+        start = time.perf_counter()
+        try:
+            if len(payloads) == 1:
+                scores = {pid: self.scorer.score(p) for pid, p in payloads.items()}
+            else:
+                scores = self.scorer.score_batch(payloads, batch_size=self.score_batch_size)
+        except Exception as e:
+            scores = {pid: {"error": str(e)[:500]} for pid in payloads}
+        self.metrics.observe("batch.score", time.perf_counter() - start)
+
+        out = []
+        for result, _ in group:
+            score = scores.get(str(result["row"])) or {"error": "no score returned"}
+            if "error" in score:
+                result.update(status="failed", error=score["error"])
+            else:
+                result["priority"] = score.get("priority")
+                result["score"] = score.get("score")
+                result["confidence"] = score.get("confidence")
+                result["reasons"] = score.get("reasons", [])
+                result["source"] = score.get("source", "llm")
+                self.metrics.incr("scored_total", source=result["source"])
+            out.append(result)
+        return out
+
+    def score_lead(self, row_id: int, lead: Dict, posts: Optional[List[Dict]] = None) -> Dict:
+        result, payload = self.extract_lead(row_id, lead, posts)
+        result.pop("_latest_post_ts", None)
+        if payload is None:
+            return result
+        return self.score_group([(result, payload)])[0]
+
+    def stream(
+        self,
+        leads: Iterable[Tuple[int, Dict]],
+        job_store: Optional[JobStore] = None,
+        job_id: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Generator form of the pipeline: pulls (row_id, lead) pairs lazily and
+        yields each finished result as soon as it is ready, in completion
+        order. At most `concurrency` leads are being extracted, one posts
+        chunk is prefetched and one scoring batch is buffered, so memory stays
+        bounded however long the input is. New input is only pulled while the
+        consumer keeps iterating; it is read one chunk ahead on a background
+        thread, so a slow source never holds back results that are done.
+
+        With a job_store and job_id, every lead's stage (posts fetched,
+        extracted, scored, failed) is checkpointed, and leads finished in an
+        earlier run of the same job are skipped.
+        """
+        if job_store is not None:
+            if not job_id:
+                raise ValueError("job_id is required with a job_store")
+            job_store.create_job(job_id, leads)
+            item_iter = job_store.iter_unfinished(job_id)
+        else:
+            item_iter = ({"row": row_id, "lead": lead} for row_id, lead in leads)
+
+        # row -> (username, lead, payload, latest_post_ts, extracted) to record in state_store once scored
+        to_record: Dict[int, Tuple] = {}
+        extracting_leads: Dict[int, Dict] = {}
+
+        def read_and_prefetch(size):
+            # runs on posts_pool, so a slow input source never blocks yielding results
+            chunk = self._prefetch_posts(list(islice(item_iter, size)))
+            if self.state_store is not None:
+                # after the prefetch, so a lead with a new post is never carried forward
+                for item in chunk:
+                    if item.get("payload") is None:
+                        self._plan_item(item, to_record)
+            return chunk
+
+        def carried(res, stored):
+            ids = {k: res[k] for k in ("row", "linkedin_url", "username")}
+            return dict(stored, **ids, status="ok", error=None, carried_forward=True)
+
+        def finish(res):
+            stage = res.pop("_stage", "score")
+            res.pop("_latest_post_ts", None)
+            state = to_record.pop(res["row"], None)
+            if state is not None and res["status"] == "ok":
+                username, lead, payload, latest_post_ts, extracted = state
+                self.state_store.save(username, lead, payload, latest_post_ts, res, extracted=extracted)
+            if res.get("carried_forward"):
+                self.metrics.incr("leads_carried_total")
+            self.metrics.incr("leads_total", status=res["status"])
+            if job_store is not None:
+                if res["status"] == "ok":
+                    job_store.mark_scored(job_id, res["row"], res)
+                else:
+                    job_store.mark_failed(job_id, res["row"], stage, res["error"])
+            return res
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool, \
+                ThreadPoolExecutor(max_workers=1) as posts_pool:
+            extracting = set()
+            scoring = set()
+            to_score = []
+            ready = deque()
+            # a small first chunk gets extraction going before a whole posts batch has been read
+            prefetch = posts_pool.submit(read_and_prefetch, min(self.concurrency, self.posts_batch_size))
+            exhausted = False
+
+            try:
+                while extracting or scoring or to_score or ready or not exhausted:
+                    while len(extracting) < self.concurrency and len(to_score) < self.score_batch_size:
+                        if not ready:
+                            if exhausted:
+                                break
+                            if not prefetch.done() and (extracting or scoring or to_score):
+                                # input not there yet: keep finishing what is in flight meanwhile
+                                break
+                            chunk = prefetch.result()
+                            if not chunk:
+                                exhausted = True
+                                break
+                            prefetch = posts_pool.submit(read_and_prefetch, self.posts_batch_size)
+                            for item in chunk:
+                                if job_store is not None and item.pop("posts_fetched", False):
+                                    job_store.mark_posts_fetched(job_id, item["row"], item["posts"])
+                                if item.get("carried") is not None:
+                                    yield finish(item["carried"])
+                                elif item.get("payload") is not None and item.get("result"):
+                                    # extracted in an earlier run, only scoring is left
+                                    to_score.append((dict(item["result"], status="ok", error=None), item["payload"]))
+                                else:
+                                    ready.append(item)
+                            continue
+
+                        item = ready.popleft()
+                        if self.state_store is not None:
+                            extracting_leads[item["row"]] = item["lead"]
+                        extracting.add(pool.submit(self.extract_lead, item["row"], item["lead"], item.get("posts")))
+
+                    # flush a partial scoring batch once nothing else can fill it without waiting for input
+                    drained = not ready and not extracting and (exhausted or not prefetch.done())
+                    can_score = len(scoring) < self.concurrency
+                    if can_score and to_score and (len(to_score) >= self.score_batch_size or drained):
+                        scoring.add(pool.submit(self.score_group, to_score[:self.score_batch_size]))
+                        del to_score[:self.score_batch_size]
+                        continue
+
+                    pending = extracting | scoring
+                    if not exhausted and not ready:
+                        pending.add(prefetch)
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        if fut is prefetch:
+                            continue
+                        if fut in extracting:
+                            extracting.discard(fut)
+                            res, payload = fut.result()
+                            lead = extracting_leads.pop(res["row"], None)
+                            if payload is None:
+                                res["_stage"] = "extract"
+                                yield finish(res)
+                                continue
+                            latest_post_ts = res.pop("_latest_post_ts", None)
+                            if self.state_store is not None:
+                                stored = self.state_store.unchanged(
+                                    res["username"], payload, latest_post_ts, res.get("activity_days")
+                                )
+                                if stored is not None:
+                                    yield finish(carried(res, stored))
+                                    continue
+                                to_record[res["row"]] = (res["username"], lead, payload, latest_post_ts, True)
+                            if job_store is not None:
+                                job_store.mark_extracted(job_id, res["row"], payload, res)
+                            to_score.append((res, payload))
+                        else:
+                            scoring.discard(fut)
+                            for res in fut.result():
+                                yield finish(res)
+            finally:
+                # consumer stopped early: drop queued work, let running calls finish
+                for fut in extracting | scoring:
+                    fut.cancel()
+                prefetch.cancel()
+
+    async def astream(
+        self,
+        leads: AsyncIterable[Tuple[int, Dict]],
+        job_store: Optional[JobStore] = None,
+        job_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict]:
+        """
+        Async-iterator form of stream(). Input is read from an async iterable
+        and results are yielded as they complete; both directions go through
+        bounded queues, so a slow consumer pauses the pipeline instead of
+        buffering results.
+        """
+        loop = asyncio.get_running_loop()
+        inbox = queue.Queue(maxsize=self.concurrency)
+        outbox = asyncio.Queue(maxsize=self.concurrency)
+        stop = threading.Event()
+
+        def inputs():
+            while True:
+                item = inbox.get()
+                if item is _END:
+                    return
+                yield item
+
+        def worker():
+            try:
+                for res in self.stream(inputs(), job_store=job_store, job_id=job_id):
+                    if stop.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(outbox.put(res), loop).result()
+                end = _END
+            except BaseException as e:
+                end = _Failure(e)
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(outbox.put(end), loop).result()
+
+        async def feed():
+            try:
+                async for pair in leads:
+                    await loop.run_in_executor(None, inbox.put, pair)
+            finally:
+                await loop.run_in_executor(None, inbox.put, _END)
+
+        feeder = asyncio.ensure_future(feed())
+        worker_done = loop.run_in_executor(None, worker)
+        try:
+            while True:
+                res = await outbox.get()
+                if res is _END:
+                    break
+                if isinstance(res, _Failure):
+                    raise res.error
+                yield res
+            await feeder
+        finally:
+            stop.set()
+            feeder.cancel()
+            # unblock the worker if it is waiting on a full outbox
+            while not outbox.empty():
+                outbox.get_nowait()
+            try:
+                inbox.put_nowait(_END)
+            except queue.Full:
+                pass
+            await asyncio.shield(worker_done)
+
+    def run(
+        self,
+        leads: Iterable[Tuple[int, Dict]],
+        output_path: str,
+        progress: Optional[Callable[[Dict], None]] = None,
+        job_store: Optional[JobStore] = None,
+        job_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        leads: iterable of (row_id, lead) pairs, see iter_leads().
+        output_path: JSONL file to append to, or "-" for stdout.
+        progress: optional callback receiving the running stats after each lead.
+
+        See stream() for job_store / job_id. Retried leads are appended to
+        output_path again; use JobStore.export_results() for one line per lead.
+        """
+        stats = {
+            "rows": 0, "ok": 0, "failed": 0, "pre_scored": 0, "carried": 0, "elapsed_s": 0.0, "rows_per_sec": 0.0,
+        }
+        start = time.time()
+
+        if output_path == "-":
+            out_ctx = contextlib.nullcontext(sys.stdout)
+        else:
+            out_ctx = open(output_path, "a", encoding="utf-8")
+
+        with out_ctx as out:
+            for res in self.stream(leads, job_store=job_store, job_id=job_id):
+                out.write(json.dumps(res, ensure_ascii=False) + "\n")
+                out.flush()
+
+                stats["rows"] += 1
+                stats["ok" if res["status"] == "ok" else "failed"] += 1
+                if res.get("source") == "rules":
+                    stats["pre_scored"] += 1
+                if res.get("carried_forward"):
+                    stats["carried"] += 1
+                stats["elapsed_s"] = round(time.time() - start, 3)
+                stats["rows_per_sec"] = round(stats["rows"] / max(stats["elapsed_s"], 1e-9), 3)
+                if progress:
+                    progress(dict(stats))
+
+        stats["elapsed_s"] = round(time.time() - start, 3)
+        stats["rows_per_sec"] = round(stats["rows"] / max(stats["elapsed_s"], 1e-9), 3)
+        return stats
+
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
@@ -1,34 +1,142 @@
+import re
+from typing import Optional, Dict
+
+from core.lead_record import LeadRecord
+
+# seniority keyword tables, highest level first; matched on whole words of
+# current_role + headline (lower-cased). "owner" and "partner" only count in
+# phrases: "Product Owner" and "Partner Account Manager" are not executives.
+SENIORITY_KEYWORDS = (
+    (5, ("chief", "ceo", "cto", "cfo", "coo", "cmo", "cio", "ciso", "cro", "founder", "co-founder",
+         "business owner", "company owner", "co-owner", "president", "managing partner", "managing director")),
+    (4, ("vp", "svp", "evp", "vice president", "vice-president", "head of", "general manager",
+         "general partner")),
+    (3, ("director",)),
+    (2, ("manager", "lead", "principal", "senior", "sr")),
+    (1, ("engineer", "developer", "analyst", "specialist", "consultant", "associate", "coordinator",
+         "executive", "designer", "scientist", "officer", "representative")),
+)
+JUNIOR_KEYWORDS = ("intern", "internship", "student", "trainee", "apprentice", "junior", "jr",
+                   "graduate", "assistant", "volunteer", "fresher")
+
+
+# a keyword does not match right after these words ("vice president" is level 4, not 5)
+NOT_AFTER = {"president": ("vice ", "vice-")}
+
+
+def keyword_pattern(keywords) -> str:
+    words = ("".join(f"(?<!{re.escape(p)})" for p in NOT_AFTER.get(k, ())) + re.escape(k) for k in keywords)
+    return r"\b(?:" + "|".join(words) + r")\b"
+
+
+SENIORITY_PATTERNS = tuple((level, keyword_pattern(words)) for level, words in SENIORITY_KEYWORDS)
+JUNIOR_PATTERN = keyword_pattern(JUNIOR_KEYWORDS)
+_SENIORITY_RE = tuple((level, re.compile(p)) for level, p in SENIORITY_PATTERNS)
+_JUNIOR_RE = re.compile(JUNIOR_PATTERN)
+
+# first number in a free-text size/revenue field, with an optional scale word;
+# ranges like "5,001-10,000" resolve to their lower bound
+AMOUNT_PATTERN = r"(\d+(?:\.\d+)?)\s*(billion|bn|b|million|mio|mn|mm|m|thousand|k)?\b"
+UNIT_MULTIPLIERS = {
+    "": 1.0,
+    "k": 1e3, "thousand": 1e3,
+    "m": 1e6, "mm": 1e6, "mn": 1e6, "mio": 1e6, "million": 1e6,
+    "b": 1e9, "bn": 1e9, "billion": 1e9,
+}
+_AMOUNT_RE = re.compile(AMOUNT_PATTERN)
+
+
+def parse_amount(text) -> Optional[float]:
+    """
+    "$1.3 Billion" -> 1.3e9, "5,001-10,000 employees" -> 5001.0,
+    "10k+" -> 10000.0. Returns None when no number is present.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return None if text != text else float(text)  # NaN from pandas
+    m = _AMOUNT_RE.search(str(text).lower().replace(",", ""))
+    if not m:
+        return None
+    return float(m.group(1)) * UNIT_MULTIPLIERS[m.group(2) or ""]
+
+
+def parse_company_size(text) -> Optional[int]:
+    value = parse_amount(text)
+    return int(value) if value is not None else None
+
+
+def parse_annual_revenue(text) -> Optional[float]:
+    return parse_amount(text)
+
+
+def seniority_level(title: str) -> Optional[int]:
+    """
+    Highest level whose keywords appear in title (5 = C-level/founder,
+    1 = individual contributor), 0 for junior-only titles, None if nothing
+    matched.
+    """
+    title = (title or "").lower()
+    for level, regex in _SENIORITY_RE:
+        if regex.search(title):
+            return level
+    return 0 if _JUNIOR_RE.search(title) else None
+
+
+def extract_features(payload: Dict) -> Dict:
+    """
+    Typed scoring features from a build_payload() result; also accepts the
+    flat payload the Streamlit app builds.
+    """
+    prospect = payload.get("prospect") or payload
+    company = payload.get("company_manual") or payload
+    parts = (prospect.get("current_role"), prospect.get("headline"))
+    title = " ".join(p for p in parts if isinstance(p, str) and p).lower()
+
+    activity_days = prospect.get("activity_days")
+    try:
+        activity_days = int(round(float(activity_days))) if activity_days is not None else None
+    except (TypeError, ValueError, OverflowError):
+        activity_days = None
+
+    return {
+        "seniority": seniority_level(title),
+        "junior": bool(_JUNIOR_RE.search(title)),
+        "employees": parse_company_size(company.get("company_size")),
+        "revenue_usd": parse_annual_revenue(company.get("annual_revenue")),
+        "activity_days": activity_days,
+    }
+
+
 class FeatureBuilderLLM:
     """
     This builder prepares clean structured JSON input for Groq LLM scoring.
     No ML model features. Only human-readable structured fields.
     """
 
-    def build_payload(self, linkedin_data: dict, user_data: dict):
-        basic = linkedin_data.get("basic_info", {}) if linkedin_data else {}
-        exp = linkedin_data.get("experience", []) if linkedin_data else []
-
-        current_role = ""
-        current_company = ""
-        if isinstance(exp, list):
-            for e in exp:
-                if e.get("is_current", False):
-                    current_role = e.get("title", "") or ""
-                    current_company = e.get("company", "") or ""
-                    break
+    def __init__(self, post_chars: int = 500):
+        self.post_chars = post_chars
 
-        if not current_role:
-            current_role = basic.get("headline", "") or ""
+    def build_payload(self, linkedin_data, user_data: dict):
+        """
+        linkedin_data: a LeadRecord, or a raw profile dict as returned by
+        extract_profile (it is compacted to a LeadRecord first). Posts are
+        sent as {text, posted_at} with text capped at post_chars.
+        """
+        if isinstance(linkedin_data, LeadRecord):
+            record = linkedin_data
+        else:
+            record = LeadRecord.from_apify(linkedin_data or {}, post_chars=self.post_chars)
 
         payload = {
             "prospect": {
-                "name": basic.get("fullname", ""),
-                "headline": basic.get("headline", ""),
-                "location": (basic.get("location", {}) or {}).get("full", ""),
-                "current_role": current_role,
-                "current_company": current_company,
-                "activity_days": linkedin_data.get("activity_days", None),
-                "recent_posts": linkedin_data.get("recent_posts", []),
+                "name": record.fullname,
+                "headline": record.headline,
+                "location": record.location,
+                "current_role": record.current_role,
+                "current_company": record.current_company,
+                "activity_days": record.activity_days,
+                "recent_posts": [p.to_prompt() for p in record.recent_posts],
             },
             "company_manual": {
                 "company_name": user_data.get("company_name", ""),
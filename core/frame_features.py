@@ -0,0 +1,119 @@
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from core.feature_builder import (
+    AMOUNT_PATTERN,
+    JUNIOR_PATTERN,
+    SENIORITY_PATTERNS,
+    UNIT_MULTIPLIERS,
+)
+
+FEATURE_COLUMNS = ("seniority", "junior", "employees", "revenue_usd", "activity_days")
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].fillna("").astype(str)
+
+
+def _per_unique(values: pd.Series, fn) -> np.ndarray:
+    # titles and size/revenue bands repeat heavily across leads, so the
+    # string ops run once per distinct value and are broadcast back
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.asarray(fn(pd.Series(uniques, dtype=object)))[codes]
+
+
+def _parse_amounts_unique(text: pd.Series) -> np.ndarray:
+    text = text.fillna("").astype(str).str.lower().str.replace(",", "", regex=False)
+    parts = text.str.extract(AMOUNT_PATTERN)
+    number = pd.to_numeric(parts[0], errors="coerce")
+    scale = parts[1].fillna("").map(UNIT_MULTIPLIERS).astype(float)
+    return (number * scale).to_numpy(dtype="float64")
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """Column-wise parse_amount(): float64, NaN where no number is present."""
+    return pd.Series(_per_unique(values, _parse_amounts_unique), index=values.index, dtype="float64")
+
+
+def _seniority_unique(titles: pd.Series) -> np.ndarray:
+    titles = titles.fillna("").astype(str).str.lower()
+    conditions = [titles.str.contains(p, regex=True).to_numpy() for _, p in SENIORITY_PATTERNS]
+    conditions.append(titles.str.contains(JUNIOR_PATTERN, regex=True).to_numpy())
+    levels = [level for level, _ in SENIORITY_PATTERNS] + [0]
+    return np.select(conditions, levels, default=-1)
+
+
+def seniority_levels(titles: pd.Series) -> pd.Series:
+    """Column-wise seniority_level(): nullable Int8 (NA when nothing matched)."""
+    levels = pd.Series(_per_unique(titles, _seniority_unique), index=titles.index)
+    return levels.mask(levels < 0).astype("Int8")
+
+
+def _junior_unique(titles: pd.Series) -> np.ndarray:
+    return titles.fillna("").astype(str).str.lower().str.contains(JUNIOR_PATTERN, regex=True).to_numpy()
+
+
+def junior_flags(titles: pd.Series) -> pd.Series:
+    return pd.Series(_per_unique(titles, _junior_unique).astype(bool), index=titles.index)
+
+
+class FrameFeatureBuilder:
+    """
+    Vectorized counterpart of FeatureBuilderLLM / extract_features(): turns
+    a DataFrame of leads into typed numeric feature columns using column-wise
+    string ops and the same keyword tables and amount parser, so results
+    match the per-lead path row for row.
+
+    Expected input columns (missing ones are treated as empty): current_role,
+    headline, company_size, annual_revenue, activity_days.
+    """
+
+    def build(self, df: pd.DataFrame) -> pd.DataFrame:
+        titles = (_text(df, "current_role") + " " + _text(df, "headline")).str.lower()
+
+        if "activity_days" in df:
+            activity = pd.to_numeric(df["activity_days"], errors="coerce")
+        else:
+            activity = pd.Series(np.nan, index=df.index)
+
+        employees = parse_amounts(_text(df, "company_size"))
+        return pd.DataFrame(
+            {
+                "seniority": seniority_levels(titles),
+                "junior": junior_flags(titles),
+                "employees": np.floor(employees).astype("Int64"),
+                "revenue_usd": parse_amounts(_text(df, "annual_revenue")),
+                "activity_days": activity.round().astype("Int64"),
+            },
+            index=df.index,
+        )
+
+    def build_from_payloads(self, payloads: Iterable[Dict]) -> pd.DataFrame:
+        """Flattens build_payload() results (prospect + company_manual) first."""
+        return self.build(payloads_to_frame(payloads))
+
+
+def payloads_to_frame(payloads: Iterable[Dict]) -> pd.DataFrame:
+    rows = []
+    for payload in payloads:
+        prospect = payload.get("prospect") or payload
+        company = payload.get("company_manual") or payload
+        rows.append(
+            {
+                "name": prospect.get("name"),
+                "current_role": prospect.get("current_role"),
+                "headline": prospect.get("headline"),
+                "location": prospect.get("location"),
+                "current_company": prospect.get("current_company"),
+                "activity_days": prospect.get("activity_days"),
+                "company_name": company.get("company_name"),
+                "company_size": company.get("company_size"),
+                "annual_revenue": company.get("annual_revenue"),
+                "industry": company.get("industry"),
+            }
+        )
+    return pd.DataFrame(rows)
@@ -1,27 +1,18 @@
-import requests
-import json
+import copy
 import os
+from typing import Optional, Dict
 
-class GroqLeadScorer:
-    def __init__(self, api_key: str):
-        if not api_key:
-            raise ValueError("Groq API key missing")
-        self.api_key = api_key
-        self.url = "https://api.groq.com/openai/v1/chat/completions"
-        self.model = "llama-3.1-8b-instant"
-
-    def score(self, prospect: dict) -> dict:
-        """
-        Returns:
-        {
-          priority: HOT|WARM|COOL|COLD,
-          confidence: float (0-100),
-          reasons: [str, str, ...]
-        }
-        """
+from core.json_stream import iter_json_objects
+from core.llm_backends import ScorerBackend, GroqBackend
+from core.pre_scorer import RulePreScorer
+from core.prompt_builder import PromptBuilder
+from core.rate_limiter import RateLimitScheduler, get_default_scheduler
+from core.score_cache import ScoreCache, payload_fingerprint
+from core.single_flight import SingleFlight
 
-        prompt = f"""
-You are a B2B lead intelligence system.
+PRIORITIES = ("HOT", "WARM", "COOL", "COLD")
+
+RULES_PREAMBLE = """You are a B2B lead intelligence system.
 
 Classify the prospect into one category:
 HOT, WARM, COOL, or COLD.
@@ -31,40 +22,232 @@ Rules:
 - WARM: senior or mid-senior + good fit
 - COOL: senior but weak fit or low activity
 - COLD: junior or irrelevant
+"""
 
+# static templates, split once by PromptBuilder around {payload}
+SINGLE_TEMPLATE = "\n" + RULES_PREAMBLE + """
 Prospect Data (may have missing fields):
-{json.dumps(prospect, indent=2)}
+{payload}
 
 Respond ONLY in valid JSON:
-{{
+{
   "priority": "...",
+  "score": 0-100,
   "confidence": 0-100,
   "reasons": ["...", "..."]
-}}
+}
 """
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+BATCH_TEMPLATE = "\n" + RULES_PREAMBLE + """
+Prospects, keyed by prospect id (may have missing fields):
+{payload}
 
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are an expert sales intelligence analyst."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
+Classify EVERY prospect independently. Respond ONLY with a valid JSON array,
+one object per prospect id:
+[
+  {"id": "...", "priority": "...", "score": 0-100, "confidence": 0-100, "reasons": ["...", "..."]}
+]
+"""
+
+
+def valid_verdict(result: dict, require_score: bool = False) -> bool:
+    """
+    True for a complete verdict: known priority, confidence (and score, when
+    required or present) in 0-100, and a list of string reasons.
+    """
+    if not isinstance(result, dict):
+        return False
+    if str(result.get("priority", "")).upper() not in PRIORITIES:
+        return False
+    fields = ["confidence"]
+    if require_score or "score" in result:
+        fields.append("score")
+    for field in fields:
+        try:
+            value = float(result.get(field))
+        except (TypeError, ValueError):
+            return False
+        if not 0 <= value <= 100:
+            return False
+    reasons = result.get("reasons")
+    return isinstance(reasons, list) and all(isinstance(r, str) for r in reasons)
+
+
+class GroqLeadScorer:
+    # bump whenever the prompt text changes so cached scores are invalidated
+    PROMPT_VERSION = "v3"
+
+    def __init__(
+        self,
+        api_key: str = "",
+        cache: Optional[ScoreCache] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        token_budget: int = 600,
+        pre_scorer: Optional[RulePreScorer] = None,
+        backend: Optional[ScorerBackend] = None,
+    ):
+        self.scheduler = scheduler or get_default_scheduler()
+        # Groq unless another OpenAI-compatible backend (e.g. the load-test
+        # mock) is passed in; api_key is only needed for the default
+        self.backend = backend or GroqBackend(api_key, scheduler=self.scheduler)
+        self.model = self.backend.model
+        self.cache = cache
+        # identical payloads scored concurrently share one LLM call
+        self.flights = SingleFlight()
+        # per-lead payload budget in estimated tokens; long posts are cut first
+        self.prompts = PromptBuilder(SINGLE_TEMPLATE, token_budget=token_budget)
+        self.batch_prompts = PromptBuilder(BATCH_TEMPLATE, token_budget=token_budget)
+        self.prompt_stats = {"requests": 0, "est_prompt_tokens": 0, "last_est_prompt_tokens": 0}
+        # clear-cut leads are classified locally and never reach the LLM
+        self.pre_scorer = pre_scorer
+
+    def score(self, prospect: dict, use_cache: bool = True, pre_score: bool = True) -> dict:
+        """
+        Returns:
+        {
+          priority: HOT|WARM|COOL|COLD,
+          score: float (0-100),
+          confidence: float (0-100),
+          reasons: [str, str, ...]
         }
 
-        resp = requests.post(self.url, headers=headers, json=payload, timeout=60)
+        Identical prospects (same payload, model and PROMPT_VERSION) are
+        served from the cache when one is configured and use_cache is True,
+        and concurrent identical calls share a single request. Leads the
+        pre_scorer is sure about are answered locally (source "rules")
+        unless pre_score is False.
+        """
+        if self.pre_scorer is not None and pre_score:
+            ruled = self.pre_scorer.classify(prospect)
+            if ruled is not None:
+                return ruled
+        return self._score_llm(prospect, use_cache)
 
-        if resp.status_code != 200:
-            raise RuntimeError(f"Groq API error: {resp.text}")
+    def _score_llm(self, prospect: dict, use_cache: bool = True) -> dict:
+        if not use_cache:
+            return self._score_uncached(prospect)
 
-        text = resp.json()["choices"][0]["message"]["content"]
+        cache_key = payload_fingerprint(prospect, self.model, self.PROMPT_VERSION)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        try:
-            return json.loads(text)
-        except Exception:
-            raise RuntimeError(f"Invalid JSON from LLM:\n{text}")
+        return self.flights.do(cache_key, lambda: self._score_and_store(cache_key, prospect))
+
+    def _score_and_store(self, cache_key: str, prospect: dict) -> dict:
+        result = self._score_uncached(prospect)
+        if self.cache is not None:
+            self.cache.set(cache_key, result)
+        return result
+
+    def _messages(self, prompt: str, est_tokens: Optional[int] = None):
+        """Chat messages for `prompt` plus the token cost to reserve for them."""
+        messages = [
+            {"role": "system", "content": "You are an expert sales intelligence analyst."},
+            {"role": "user", "content": prompt}
+        ]
+
+        if est_tokens is None:
+            est_tokens = self.prompts.estimate_tokens(prompt)
+        self.prompt_stats["requests"] += 1
+        self.prompt_stats["est_prompt_tokens"] += est_tokens
+        self.prompt_stats["last_est_prompt_tokens"] = est_tokens
+
+        # prompt + rough completion allowance for the tokens-per-minute bucket
+        return messages, est_tokens + 300
+
+    def _chat(self, prompt: str, timeout: int = 60, est_tokens: Optional[int] = None) -> str:
+        messages, cost = self._messages(prompt, est_tokens)
+        return self.backend.complete(messages, timeout=timeout, cost_tokens=cost)
+
+    def _chat_json(self, prompt: str, timeout: int = 60, est_tokens: Optional[int] = None) -> dict:
+        # streamed; returns as soon as a complete verdict has been parsed
+        messages, cost = self._messages(prompt, est_tokens)
+        return self.backend.complete_json(
+            messages, timeout=timeout, cost_tokens=cost, accept=lambda obj: valid_verdict(obj, require_score=True)
+        )
+
+    def _score_uncached(self, prospect: dict) -> dict:
+        prompt, est_tokens = self.prompts.build(prospect)
+        return self._chat_json(prompt, est_tokens=est_tokens)
+
+    def score_batch(
+        self, prospects: Dict[str, dict], batch_size: int = 10, use_cache: bool = True
+    ) -> Dict[str, dict]:
+        """
+        Scores many prospects, packing up to batch_size of them into one chat
+        completion so the rule preamble is sent once per batch.
+
+        prospects: {prospect_id: payload}. Returns {prospect_id: result}.
+        Entries the model drops or returns malformed are re-scored one by one;
+        if that fails too the id maps to {"error": "..."}. Leads the
+        pre_scorer decides never reach the LLM.
+        """
+        results = {}
+        # the same person can appear under several ids; score each payload once
+        todo = {}
+        aliases = {}
+        for pid, prospect in prospects.items():
+            pid = str(pid)
+            if self.pre_scorer is not None:
+                ruled = self.pre_scorer.classify(prospect)
+                if ruled is not None:
+                    results[pid] = ruled
+                    continue
+            fp = payload_fingerprint(prospect, self.model, self.PROMPT_VERSION)
+            if use_cache and fp in aliases:
+                aliases[fp].append(pid)
+                continue
+            if self.cache is not None and use_cache:
+                cached = self.cache.get(fp)
+                if cached is not None:
+                    results[pid] = cached
+                    continue
+            todo[pid] = prospect
+            aliases.setdefault(fp, []).append(pid)
+
+        ids = list(todo)
+        for i in range(0, len(ids), batch_size):
+            chunk = {pid: todo[pid] for pid in ids[i:i + batch_size]}
+
+            parsed = {}
+            if len(chunk) > 1:
+                try:
+                    parsed = self._score_many_uncached(chunk)
+                except Exception:
+                    parsed = {}
+
+            for pid, prospect in chunk.items():
+                fp = payload_fingerprint(prospect, self.model, self.PROMPT_VERSION)
+                res = parsed.get(pid)
+                if res is not None:
+                    if self.cache is not None and use_cache:
+                        self.cache.set(fp, res)
+                else:
+                    try:
+                        res = self._score_llm(prospect, use_cache=use_cache)
+                    except Exception as e:
+                        res = {"error": str(e)[:500]}
+
+                for alias in aliases.get(fp, [pid]):
+                    results[alias] = res if alias == pid else copy.deepcopy(res)
+
+        return results
+
+    def _score_many_uncached(self, prospects: Dict[str, dict]) -> Dict[str, dict]:
+        prompt, est_tokens = self.batch_prompts.build_many(prospects)
+        text = self._chat(prompt, timeout=120, est_tokens=est_tokens)
+        return self._parse_batch_response(text, set(prospects))
+
+    def _parse_batch_response(self, text: str, ids: set) -> Dict[str, dict]:
+        # item by item, so a truncated or chatty answer still yields its complete entries
+        out = {}
+        for item in iter_json_objects([text]):
+            pid = str(item.get("id", ""))
+            if pid not in ids or pid in out:
+                continue
+            result = {k: v for k, v in item.items() if k != "id"}
+            if valid_verdict(result, require_score=True):
+                out[pid] = result
+        return out
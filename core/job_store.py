@@ -0,0 +1,192 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple
+
+# per-lead stages, in pipeline order
+PENDING = "pending"
+POSTS_FETCHED = "posts_fetched"
+EXTRACTED = "extracted"
+SCORED = "scored"
+FAILED = "failed"
+
+
+def _dumps(value) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(value: Optional[str]):
+    return json.loads(value) if value else None
+
+
+class JobStore:
+    """
+    SQLite record of batch jobs and the stage each lead has reached, so a
+    crashed or interrupted run can be restarted without redoing finished
+    work. Posts, the built payload and the final result are stored per lead;
+    a failed lead keeps whatever earlier stages produced and only the failed
+    stage is retried.
+    """
+
+    def __init__(self, path: str = "lead_jobs.sqlite3", max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "meta TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leads ("
+            "job_id TEXT NOT NULL, row INTEGER NOT NULL, lead TEXT NOT NULL, "
+            "stage TEXT NOT NULL, failed_stage TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "posts TEXT, payload TEXT, result TEXT, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (job_id, row))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS leads_stage ON leads(job_id, stage)")
+
+    def create_job(self, job_id: str, leads: Iterable[Tuple[int, Dict]], meta: Optional[Dict] = None) -> int:
+        """
+        Registers the job and its leads. Idempotent: rows already known for
+        this job keep their state. Returns the number of newly added rows.
+        """
+        now = time.time()
+        added = 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, created_at, updated_at, meta) VALUES (?, ?, ?, ?)",
+                (job_id, now, now, _dumps(meta)),
+            )
+            batch = []
+            for row_id, lead in leads:
+                batch.append((job_id, int(row_id), _dumps(lead), PENDING, now))
+                if len(batch) >= 1000:
+                    added += self._insert_leads(batch)
+                    batch = []
+            if batch:
+                added += self._insert_leads(batch)
+        return added
+
+    def _insert_leads(self, batch: List[Tuple]) -> int:
+        self._conn.execute("BEGIN")
+        try:
+            cur = self._conn.executemany(
+                "INSERT OR IGNORE INTO leads (job_id, row, lead, stage, updated_at) VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    def iter_unfinished(self, job_id: str, page_size: int = 500) -> Iterator[Dict]:
+        """
+        Yields leads that still need work, in row order:
+        {"row", "lead", "posts", "payload", "result"} where posts/payload/result
+        are whatever earlier stages stored (None if not reached). Leads that
+        failed max_attempts times are skipped.
+        """
+        last_row = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT row, lead, posts, payload, result FROM leads "
+                    "WHERE job_id = ? AND row > ? AND stage != ? "
+                    "AND NOT (stage = ? AND attempts >= ?) "
+                    "ORDER BY row LIMIT ?",
+                    (job_id, last_row, SCORED, FAILED, self.max_attempts, page_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row, lead, posts, payload, result in rows:
+                yield {
+                    "row": row,
+                    "lead": _loads(lead),
+                    "posts": _loads(posts),
+                    "payload": _loads(payload),
+                    "result": _loads(result),
+                }
+            last_row = rows[-1][0]
+
+    def _update(self, job_id: str, row: int, sql: str, params: Tuple):
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE leads SET {sql}, updated_at = ? WHERE job_id = ? AND row = ?",
+                (*params, time.time(), job_id, int(row)),
+            )
+
+    def mark_posts_fetched(self, job_id: str, row: int, posts: List[Dict]):
+        # never move a lead backwards if it already got further
+        with self._lock:
+            self._conn.execute(
+                "UPDATE leads SET posts = ?, updated_at = ?, "
+                "stage = CASE WHEN stage = ? THEN ? ELSE stage END "
+                "WHERE job_id = ? AND row = ?",
+                (_dumps(posts), time.time(), PENDING, POSTS_FETCHED, job_id, int(row)),
+            )
+
+    def mark_extracted(self, job_id: str, row: int, payload: Dict, result: Dict):
+        self._update(
+            job_id, row, "stage = ?, payload = ?, result = ?, error = NULL, failed_stage = NULL",
+            (EXTRACTED, _dumps(payload), _dumps(result)),
+        )
+
+    def mark_scored(self, job_id: str, row: int, result: Dict):
+        self._update(
+            job_id, row, "stage = ?, result = ?, error = NULL, failed_stage = NULL",
+            (SCORED, _dumps(result)),
+        )
+
+    def mark_failed(self, job_id: str, row: int, stage: str, error: str):
+        self._update(
+            job_id, row, "stage = ?, failed_stage = ?, error = ?, attempts = attempts + 1",
+            (FAILED, stage, (error or "")[:500]),
+        )
+
+    def progress(self, job_id: str) -> Dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) FROM leads WHERE job_id = ? GROUP BY stage", (job_id,)
+            ).fetchall()
+        counts = {stage: 0 for stage in (PENDING, POSTS_FETCHED, EXTRACTED, SCORED, FAILED)}
+        counts.update(dict(rows))
+        counts["total"] = sum(n for stage, n in rows)
+        return counts
+
+    def export_results(self, job_id: str, path: str) -> int:
+        """
+        Writes one JSONL line per finished lead (scored or failed), in row
+        order, deduplicating the retries an appended output file may contain.
+        """
+        written = 0
+        last_row = -1
+        with open(path, "w", encoding="utf-8") as out:
+            while True:
+                with self._lock:
+                    rows = self._conn.execute(
+                        "SELECT row, stage, error, result FROM leads "
+                        "WHERE job_id = ? AND row > ? AND stage IN (?, ?) ORDER BY row LIMIT 1000",
+                        (job_id, last_row, SCORED, FAILED),
+                    ).fetchall()
+                if not rows:
+                    break
+                for row, stage, error, result in rows:
+                    record = _loads(result) or {"row": row}
+                    if stage == FAILED:
+                        record.update(status="failed", error=error)
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    written += 1
+                last_row = rows[-1][0]
+        return written
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
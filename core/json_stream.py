@@ -0,0 +1,105 @@
+import json
+from typing import Optional, Dict, List, Iterable, Callable, Iterator
+
+
+class JsonObjectStream:
+    """
+    Incremental extractor for JSON objects in model output. Text is fed in
+    arbitrary chunks (e.g. SSE deltas); feed() returns the objects completed
+    by that chunk. Top-level objects and objects directly inside a top-level
+    array are returned, so both a single verdict and a batch array work.
+    Anything outside JSON (prose, ``` fences) is skipped, and an object that
+    fails to decode is dropped without poisoning the rest of the stream.
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._stack: List[str] = []  # open "{" / "[" outside strings
+        self._in_string = False
+        self._escape = False
+        self._capture_depth: Optional[int] = None  # stack depth where the current object opened
+
+    def feed(self, chunk: str) -> List[Dict]:
+        done = []
+        for ch in chunk:
+            if self._capture_depth is not None:
+                self._buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch == "{":
+                if self._capture_depth is None and self._capturable():
+                    self._capture_depth = len(self._stack)
+                    self._buf = ["{"]
+                self._stack.append("{")
+            elif ch == "[":
+                self._stack.append("[")
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if ch == "}" and self._capture_depth == len(self._stack):
+                    obj = self._decode("".join(self._buf))
+                    self._buf = []
+                    self._capture_depth = None
+                    if obj is not None:
+                        done.append(obj)
+        return done
+
+    def _capturable(self) -> bool:
+        return not self._stack or self._stack == ["["]
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict]:
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
+
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[Dict]:
+    """Yields objects from a stream of text chunks as soon as each one closes."""
+    parser = JsonObjectStream()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+def first_json_object(text: str, accept: Optional[Callable[[Dict], bool]] = None) -> Optional[Dict]:
+    """First object in `text` that `accept` approves of (any object if not given)."""
+    for obj in iter_json_objects([text]):
+        if accept is None or accept(obj):
+            return obj
+    return None
+
+
+def iter_sse_data(lines: Iterable) -> Iterator[Dict]:
+    """
+    Parsed `data:` payloads of a server-sent event stream (bytes or str
+    lines), stopping at the OpenAI-style `data: [DONE]` sentinel.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            continue
+        if isinstance(event, dict):
+            yield event
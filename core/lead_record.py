@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+
+
+@dataclass(slots=True)
+class PostSummary:
+    text: str = ""
+    timestamp: Optional[int] = None  # ms since epoch, as returned by the posts actor
+    url: str = ""
+
+    @classmethod
+    def from_apify(cls, post: Dict, max_chars: int = 500) -> "PostSummary":
+        posted_at = post.get("posted_at") or {}
+        try:
+            ts = int(posted_at.get("timestamp")) if posted_at.get("timestamp") else None
+        except (TypeError, ValueError):
+            ts = None
+        text = post.get("text") or ""
+        if len(text) > max_chars:
+            text = text[:max_chars].rstrip() + "…"
+        return cls(text=text, timestamp=ts, url=post.get("url") or post.get("post_url") or "")
+
+    def to_prompt(self) -> Dict:
+        out = {"text": self.text}
+        if self.timestamp:
+            out["posted_at"] = datetime.fromtimestamp(self.timestamp / 1000).strftime("%Y-%m-%d")
+        return out
+
+
+def latest_post_ts(posts: Optional[List[Dict]]) -> Optional[int]:
+    """Newest timestamp among raw Apify posts, as LeadRecord.latest_post_ts has it."""
+    timestamps = [PostSummary.from_apify(p).timestamp for p in posts or () if isinstance(p, dict)]
+    timestamps = [ts for ts in timestamps if ts]
+    return max(timestamps) if timestamps else None
+
+
+@dataclass(slots=True)
+class LeadRecord:
+    """
+    The dozen fields the scorer actually uses, filled in one pass over the
+    raw Apify profile/posts JSON. The raw blob can be spilled to disk
+    (raw_path) instead of being kept in memory.
+    """
+
+    username: str = ""
+    fullname: str = ""
+    headline: str = ""
+    location: str = ""
+    current_role: str = ""
+    current_company: str = ""
+    activity_days: Optional[int] = None
+    latest_post_ts: Optional[int] = None
+    recent_posts: Tuple[PostSummary, ...] = field(default_factory=tuple)
+    raw_path: Optional[str] = None
+
+    @classmethod
+    def from_apify(
+        cls,
+        profile: Dict,
+        posts: Optional[List[Dict]] = None,
+        username: str = "",
+        activity_days: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        post_chars: int = 500,
+    ) -> "LeadRecord":
+        """
+        profile: raw linkedin-profile-detail item. posts/activity_days default
+        to the "recent_posts"/"activity_days" keys extract_profile attaches.
+        """
+        profile = profile or {}
+        basic = profile.get("basic_info") or {}
+        if posts is None:
+            posts = profile.get("recent_posts") or []
+        if activity_days is None:
+            activity_days = profile.get("activity_days")
+
+        current_role = ""
+        current_company = ""
+        exp = profile.get("experience") or []
+        if isinstance(exp, list):
+            for e in exp:
+                if isinstance(e, dict) and e.get("is_current", False):
+                    current_role = e.get("title", "") or ""
+                    current_company = e.get("company", "") or ""
+                    break
+
+        headline = basic.get("headline", "") or ""
+        summaries = tuple(PostSummary.from_apify(p, post_chars) for p in posts if isinstance(p, dict))
+        timestamps = [p.timestamp for p in summaries if p.timestamp]
+
+        record = cls(
+            username=username or basic.get("public_identifier", "") or "",
+            fullname=basic.get("fullname", "") or "",
+            headline=headline,
+            location=(basic.get("location", {}) or {}).get("full", "") or "",
+            current_role=current_role or headline,
+            current_company=current_company,
+            activity_days=activity_days,
+            latest_post_ts=max(timestamps) if timestamps else None,
+            recent_posts=summaries,
+        )
+
+        if spill_dir and record.username:
+            record.raw_path = spill_raw(spill_dir, record.username, {"profile": profile, "posts": posts})
+        return record
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "LeadRecord":
+        """Inverse of to_dict(). None (no profile) gives an empty record, like from_apify()."""
+        data = dict(data or {})
+        data["recent_posts"] = tuple(PostSummary(**p) for p in data.get("recent_posts") or () if isinstance(p, dict))
+        return cls(**data)
+
+
+def spill_raw(spill_dir: str, username: str, blob: Dict) -> str:
+    os.makedirs(spill_dir, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in username.lower())
+    path = os.path.join(spill_dir, f"{safe}.json.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(blob, f, ensure_ascii=False, separators=(",", ":"))
+    return path
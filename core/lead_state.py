@@ -0,0 +1,207 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, List, Tuple
+
+from core.lead_record import latest_post_ts as newest_post_ts
+
+# activity_days bucket upper bounds; a lead is re-scored when it crosses one
+ACTIVITY_BUCKETS = (7, 30, 90, 180, 365)
+
+CARRY = "carry"  # nothing changed: reuse the stored result
+RESCORE = "rescore"  # only the activity bucket moved: re-score the stored payload
+
+
+def _dumps(value) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def _loads(value: Optional[str]):
+    return json.loads(value) if value else None
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(_dumps(value).encode("utf-8")).hexdigest()
+
+
+def activity_bucket(activity_days: Optional[int]) -> int:
+    """Index of the ACTIVITY_BUCKETS range the value falls in; -1 for no activity."""
+    if activity_days is None:
+        return -1
+    for i, bound in enumerate(ACTIVITY_BUCKETS):
+        if activity_days <= bound:
+            return i
+    return len(ACTIVITY_BUCKETS)
+
+
+def days_since(timestamp_ms: Optional[int], now: Optional[float] = None) -> Optional[int]:
+    if not timestamp_ms:
+        return None
+    now = time.time() if now is None else now
+    return max(0, int((now - int(timestamp_ms) / 1000) // 86400))
+
+
+def input_fingerprint(lead: Dict) -> str:
+    """The CRM side of a lead: URL plus company fields."""
+    return _digest({k: str(v or "").strip() for k, v in lead.items()})
+
+
+def state_fingerprint(payload: Dict, latest_post_ts: Optional[int]) -> str:
+    """
+    build_payload() output without activity_days (which drifts daily and is
+    tracked as a bucket instead), plus the newest post's timestamp.
+    """
+    stable = copy.deepcopy(payload)
+    prospect = stable.get("prospect")
+    if isinstance(prospect, dict):
+        prospect.pop("activity_days", None)
+    return _digest({"payload": stable, "latest_post_ts": latest_post_ts})
+
+
+class LeadStateStore:
+    """
+    What each lead (by username) looked like when it was last scored: input
+    and payload fingerprints, newest post timestamp, activity bucket and
+    the result. Lets a periodic re-run of the same list skip work:
+
+    - plan(): before extraction. If the CRM fields are unchanged, the lead
+      was extracted less than refresh_after_s ago and its newest post (when
+      the caller already has its posts) is the stored one, there is no need
+      to extract: the stored result is carried forward, or, if the days
+      since the last post crossed an ACTIVITY_BUCKETS boundary, the stored
+      payload is re-scored with the new activity_days.
+    - unchanged(): after extraction. A payload with the same fingerprint and
+      activity bucket keeps the stored result instead of being re-scored.
+    """
+
+    def __init__(self, path: str = "lead_state.sqlite3", refresh_after_s: float = 7 * 86400):
+        self.path = path
+        self.refresh_after_s = refresh_after_s
+        self._lock = threading.Lock()
+        self._counters = {
+            "carried": 0, "rescored_activity": 0, "new_posts": 0, "unchanged_payload": 0, "changed": 0, "new": 0,
+        }
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lead_state ("
+            "username TEXT PRIMARY KEY, input_fp TEXT NOT NULL, payload_fp TEXT NOT NULL, "
+            "latest_post_ts INTEGER, activity_bucket INTEGER NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT NOT NULL, extracted_at REAL NOT NULL, scored_at REAL NOT NULL)"
+        )
+
+    def _get(self, username: str) -> Optional[Tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT input_fp, payload_fp, latest_post_ts, activity_bucket, payload, result, extracted_at "
+                "FROM lead_state WHERE username = ?",
+                (username.lower(),),
+            ).fetchone()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def plan(
+        self, username: Optional[str], lead: Dict, now: Optional[float] = None, posts: Optional[List[Dict]] = None
+    ) -> Optional[Tuple]:
+        """
+        (CARRY, payload, result, latest_post_ts), (RESCORE, refreshed payload,
+        result without the score fields, latest_post_ts), or None when the
+        lead has to be extracted. posts: the lead's recent posts as just
+        prefetched or read from the cache, if known; a newest post other than
+        the stored one means the lead has to be extracted.
+        """
+        if not username:
+            return None
+        row = self._get(username)
+        if row is None:
+            return None
+        input_fp, _, latest_post_ts, bucket, payload, result, extracted_at = row
+        now = time.time() if now is None else now
+        if input_fp != input_fingerprint(lead) or now - extracted_at > self.refresh_after_s:
+            return None
+        if posts is not None and newest_post_ts(posts) != latest_post_ts:
+            self._count("new_posts")
+            return None
+
+        payload = _loads(payload)
+        result = _loads(result)
+        activity_days = days_since(latest_post_ts, now)
+        if activity_bucket(activity_days) == bucket:
+            self._count("carried")
+            return CARRY, payload, dict(result, activity_days=activity_days), latest_post_ts
+
+        self._count("rescored_activity")
+        payload.setdefault("prospect", {})["activity_days"] = activity_days
+        base = {k: v for k, v in result.items() if k not in ("priority", "score", "confidence", "reasons", "source")}
+        return RESCORE, payload, dict(base, activity_days=activity_days), latest_post_ts
+
+    def unchanged(
+        self, username: Optional[str], payload: Dict, latest_post_ts: Optional[int], activity_days: Optional[int]
+    ) -> Optional[Dict]:
+        """The stored result if this freshly built payload would score the same; else None."""
+        if not username:
+            return None
+        row = self._get(username)
+        if row is None:
+            self._count("new")
+            return None
+        _, payload_fp, _, bucket, _, result, _ = row
+        if payload_fp == state_fingerprint(payload, latest_post_ts) and bucket == activity_bucket(activity_days):
+            self._count("unchanged_payload")
+            # the profile was just re-extracted, so restart the refresh clock
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE lead_state SET extracted_at = ? WHERE username = ?", (time.time(), username.lower())
+                )
+            return dict(_loads(result), activity_days=activity_days)
+        self._count("changed")
+        return None
+
+    def save(
+        self,
+        username: Optional[str],
+        lead: Dict,
+        payload: Dict,
+        latest_post_ts: Optional[int],
+        result: Dict,
+        extracted: bool = True,
+    ):
+        """Records a freshly scored lead. extracted=False keeps the previous extraction time."""
+        if not username:
+            return
+        now = time.time()
+        activity_days = (payload.get("prospect") or {}).get("activity_days")
+        stored = {k: v for k, v in result.items() if not k.startswith("_") and k != "row"}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO lead_state (username, input_fp, payload_fp, latest_post_ts, activity_bucket, payload, "
+                "result, extracted_at, scored_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET input_fp = excluded.input_fp, "
+                "payload_fp = excluded.payload_fp, latest_post_ts = excluded.latest_post_ts, "
+                "activity_bucket = excluded.activity_bucket, payload = excluded.payload, result = excluded.result, "
+                "extracted_at = CASE WHEN ? THEN excluded.extracted_at ELSE lead_state.extracted_at END, "
+                "scored_at = excluded.scored_at",
+                (
+                    username.lower(), input_fingerprint(lead), state_fingerprint(payload, latest_post_ts),
+                    latest_post_ts, activity_bucket(activity_days), _dumps(payload), _dumps(stored), now, now,
+                    1 if extracted else 0,
+                ),
+            )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            out = dict(self._counters)
+            out["entries"] = self._conn.execute("SELECT COUNT(*) FROM lead_state").fetchone()[0]
+        return out
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
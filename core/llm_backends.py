@@ -0,0 +1,257 @@
+import threading
+import time
+from typing import Optional, Dict, List, Callable
+
+import requests
+
+from core.json_stream import JsonObjectStream, first_json_object, iter_sse_data
+from core.metrics import MetricsRegistry, get_default_metrics
+from core.rate_limiter import RateLimitScheduler, get_default_scheduler
+
+
+class ScorerBackend:
+    """
+    Where chat completions go. Scorers build the prompt and parse the answer;
+    the backend owns the endpoint, model, auth and rate limiting.
+    """
+
+    name = "base"
+    model = ""
+
+    def complete(self, messages: List[Dict], timeout: int = 60, cost_tokens: float = 0) -> str:
+        """Returns the assistant message text; raises RuntimeError on API errors."""
+        raise NotImplementedError
+
+    def complete_json(
+        self,
+        messages: List[Dict],
+        timeout: int = 60,
+        cost_tokens: float = 0,
+        accept: Optional[Callable[[Dict], bool]] = None,
+    ) -> Dict:
+        """
+        First JSON object in the answer that `accept` approves of, ignoring
+        fences and surrounding prose; raises RuntimeError if there is none.
+        """
+        text = self.complete(messages, timeout=timeout, cost_tokens=cost_tokens)
+        obj = first_json_object(text, accept)
+        if obj is None:
+            raise RuntimeError(f"{self.name} returned no valid JSON object: {text[:500]}")
+        return obj
+
+    def close(self):
+        pass
+
+
+class OpenAICompatibleBackend(ScorerBackend):
+    """
+    Any server speaking the OpenAI /chat/completions protocol (Groq, a local
+    mock, vLLM, ...). Requests go through scheduler provider `provider`,
+    which must be registered, so retries and 429 handling stay in one place.
+
+    complete_json() streams the answer (SSE) and stops reading as soon as an
+    acceptable object has closed; with json_mode it also asks the server for
+    a JSON-object response_format where the server supports it.
+    """
+
+    name = "openai"
+    # whether the server accepts response_format together with stream=True
+    STREAM_JSON_MODE = True
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        model: str = "llama-3.1-8b-instant",
+        provider: str = "groq",
+        scheduler: Optional[RateLimitScheduler] = None,
+        temperature: float = 0.2,
+        metrics: Optional[MetricsRegistry] = None,
+        stream: bool = True,
+        json_mode: bool = True,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.url = f"{self.base_url}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.provider = provider
+        self.scheduler = scheduler or get_default_scheduler()
+        self.temperature = temperature
+        self.metrics = metrics or get_default_metrics()
+        self.stream = stream
+        self.json_mode = json_mode
+        # one keep-alive pool per thread; requests.Session is not thread-safe.
+        # Every session is also listed so close() can reach other threads' pools.
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            if self.api_key:
+                session.headers["Authorization"] = f"Bearer {self.api_key}"
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _post(self, body: Dict, timeout: int, cost_tokens: float, stream: bool = False) -> requests.Response:
+        session = self._session()
+
+        def send():
+            start = time.perf_counter()
+            r = session.post(self.url, json=body, timeout=timeout, stream=stream)
+            # a streamed 200 is metered once the body has been read
+            if r.status_code != 200 or not stream:
+                self.metrics.record_http(
+                    self.provider, r.status_code, len(r.request.body or b""), len(r.content),
+                    time.perf_counter() - start,
+                )
+            return r
+
+        resp = self.scheduler.call(self.provider, send, cost_tokens=cost_tokens)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{self.name} API error {resp.status_code}: {resp.text[:500]}")
+        return resp
+
+    def _body(self, messages: List[Dict], stream: bool = False, json_mode: bool = False) -> Dict:
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+        }
+        if stream:
+            body["stream"] = True
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    def complete(self, messages: List[Dict], timeout: int = 60, cost_tokens: float = 0) -> str:
+        return self._complete_body(self._body(messages), timeout, cost_tokens)
+
+    def _complete_body(self, body: Dict, timeout: int, cost_tokens: float) -> str:
+        with self.metrics.timer("llm.complete"):
+            resp = self._post(body, timeout, cost_tokens)
+
+        data = resp.json()
+        self._record_usage(data.get("usage"))
+        return data["choices"][0]["message"]["content"]
+
+    def complete_json(
+        self,
+        messages: List[Dict],
+        timeout: int = 60,
+        cost_tokens: float = 0,
+        accept: Optional[Callable[[Dict], bool]] = None,
+    ) -> Dict:
+        if not self.stream:
+            text = self._complete_body(self._body(messages, json_mode=self.json_mode), timeout, cost_tokens)
+            obj = first_json_object(text, accept)
+            if obj is None:
+                raise RuntimeError(f"{self.name} returned no valid JSON object: {text[:500]}")
+            return obj
+
+        body = self._body(messages, stream=True, json_mode=self.json_mode and self.STREAM_JSON_MODE)
+        parser = JsonObjectStream()
+        content = []
+        received = 0
+        found = None
+        with self.metrics.timer("llm.complete"):
+            start = time.perf_counter()
+            resp = self._post(body, timeout, cost_tokens, stream=True)
+            try:
+                for line in resp.iter_lines():
+                    received += len(line) + 1
+                    for event in iter_sse_data([line]):
+                        self._record_usage(event.get("usage") or (event.get("x_groq") or {}).get("usage"))
+                        for choice in event.get("choices") or []:
+                            delta = (choice.get("delta") or {}).get("content") or ""
+                            content.append(delta)
+                            for obj in parser.feed(delta):
+                                if found is None and (accept is None or accept(obj)):
+                                    found = obj
+                    if found is not None:
+                        # the verdict is complete; drop the connection rather than read the rest
+                        self.metrics.incr("llm_stream_early_stop_total", provider=self.provider)
+                        break
+            finally:
+                resp.close()
+                self.metrics.record_http(
+                    self.provider, resp.status_code, len(resp.request.body or b""), received,
+                    time.perf_counter() - start,
+                )
+
+        if found is None:
+            raise RuntimeError(f"{self.name} returned no valid JSON object: {''.join(content)[:500]}")
+        return found
+
+    def _record_usage(self, usage: Optional[Dict]):
+        if not isinstance(usage, dict):
+            return
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens:
+                self.metrics.incr("llm_tokens_total", tokens, provider=self.provider, kind=kind)
+
+    def close(self):
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+            # threads that call again after close() start fresh sessions
+            self._local = threading.local()
+        for session in sessions:
+            session.close()
+
+
+class GroqBackend(OpenAICompatibleBackend):
+    name = "groq"
+    BASE_URL = "https://api.groq.com/openai/v1"
+    DEFAULT_MODEL = "llama-3.1-8b-instant"
+    # Groq rejects JSON mode on streamed requests; the stream parser copes without it
+    STREAM_JSON_MODE = False
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = DEFAULT_MODEL,
+        scheduler: Optional[RateLimitScheduler] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        stream: bool = True,
+    ):
+        if not api_key:
+            raise ValueError("Groq API key missing")
+        super().__init__(
+            self.BASE_URL, api_key, model=model, provider="groq", scheduler=scheduler, metrics=metrics,
+            stream=stream,
+        )
+
+
+def make_backend(
+    api_key: str = "",
+    base_url: Optional[str] = None,
+    model: Optional[str] = None,
+    scheduler: Optional[RateLimitScheduler] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    stream: bool = True,
+) -> ScorerBackend:
+    """
+    Groq by default; any other OpenAI-compatible server (e.g. the load-test
+    mock) when base_url is given. Non-Groq servers use scheduler provider
+    "llm", registered here with generous limits if missing; re-register it
+    to throttle.
+    """
+    if not base_url:
+        return GroqBackend(
+            api_key, model=model or GroqBackend.DEFAULT_MODEL, scheduler=scheduler, metrics=metrics, stream=stream
+        )
+
+    scheduler = scheduler or get_default_scheduler()
+    try:
+        scheduler.provider("llm")
+    except KeyError:
+        scheduler.register("llm", requests_per_sec=1000, burst=1000)
+    return OpenAICompatibleBackend(
+        base_url, api_key, model=model or GroqBackend.DEFAULT_MODEL, provider="llm", scheduler=scheduler,
+        metrics=metrics, stream=stream,
+    )
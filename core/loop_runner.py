@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """
+    A single asyncio loop running on a daemon thread. Sync wrappers submit
+    coroutines here so pooled async clients stay bound to one loop and can be
+    shared by any number of calling threads (Streamlit reruns, thread pools).
+    """
+
+    def __init__(self, name: str = "lead-scoring-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("BackgroundLoop.run() called from its own loop thread; await instead")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self.thread
+
+
+_shared_loop: Optional[BackgroundLoop] = None
+_shared_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    global _shared_loop
+    with _shared_lock:
+        if _shared_loop is None:
+            _shared_loop = BackgroundLoop()
+        return _shared_loop
@@ -0,0 +1,180 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Tuple
+
+# stage latency histogram buckets, seconds
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current_trace: ContextVar[Optional["LeadTrace"]] = ContextVar("lead_trace", default=None)
+
+
+class LeadTrace:
+    """
+    Per-lead breakdown: wall time per stage plus counters (HTTP round-trips,
+    bytes, compute units, tokens). Collected for whatever runs inside
+    trace_lead(), including tasks and threads started with a copy of the
+    caller's context.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.counters: Dict[str, float] = {}
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+
+    def add(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "total_s": round(time.perf_counter() - self.started, 4),
+                "stages": {k: {"seconds": round(v["seconds"], 4), "calls": v["calls"]} for k, v in self.stages.items()},
+                "counters": {k: round(v, 4) for k, v in self.counters.items()},
+            }
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and stage-latency histograms, exported in the
+    Prometheus text format. Every observation is also added to the current
+    LeadTrace, if any.
+    """
+
+    def __init__(self, prefix: str = "leadscore"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._timings: Dict[str, Dict] = {}
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            h = self._timings.get(stage)
+            if h is None:
+                h = self._timings[stage] = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+            h["count"] += 1
+            h["sum"] += seconds
+            i = bisect_left(BUCKETS, seconds)
+            if i < len(BUCKETS):
+                h["buckets"][i] += 1
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_time(stage, seconds)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(_series_name(name, key[1]), value)
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_http(self, provider: str, status: int, sent: int, received: int, seconds: float):
+        self.incr("http_requests_total", provider=provider, status=status)
+        self.incr("http_bytes_total", sent, provider=provider, direction="sent")
+        self.incr("http_bytes_total", received, provider=provider, direction="received")
+        self.observe(f"http.{provider}", seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = {_series_name(name, labels): value for (name, labels), value in self._counters.items()}
+            timings = {
+                stage: {"count": h["count"], "sum_s": round(h["sum"], 4),
+                        "mean_s": round(h["sum"] / h["count"], 4) if h["count"] else 0.0}
+                for stage, h in self._timings.items()
+            }
+        return {"counters": counters, "stages": timings}
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        lines = []
+        with self._lock:
+            by_name: Dict[str, list] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                by_name.setdefault(name, []).append((labels, value))
+            for name, series in by_name.items():
+                lines.append(f"# TYPE {p}_{name} counter")
+                for labels, value in series:
+                    lines.append(f"{p}_{name}{_fmt_labels(labels)} {value:g}")
+
+            if self._timings:
+                lines.append(f"# TYPE {p}_stage_seconds histogram")
+            for stage, h in sorted(self._timings.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h["buckets"]):
+                    cumulative += n
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h["count"]}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {h["sum"]:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {h["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+def _series_name(name: str, labels: Tuple) -> str:
+    label = ",".join(f"{k}={v}" for k, v in labels)
+    return f"{name}{{{label}}}" if label else name
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(k, _escape_label(v)) for k, v in labels)
+    return "{" + body + "}"
+
+
+@contextmanager
+def trace_lead():
+    """Collects a LeadTrace for everything run inside the block."""
+    trace = LeadTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[LeadTrace]:
+    return _current_trace.get()
+
+
+_default_metrics: Optional[MetricsRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_default_metrics() -> MetricsRegistry:
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = MetricsRegistry()
+        return _default_metrics
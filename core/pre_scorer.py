@@ -0,0 +1,122 @@
+import threading
+from typing import Optional, Dict
+
+import pandas as pd
+
+from core.feature_builder import extract_features
+
+
+class RulePreScorer:
+    """
+    Local, deterministic classifier for clear-cut leads, run before the LLM.
+
+    classify() returns a score dict for leads the rules are sure about and
+    None for ambiguous ones, which should go to the LLM:
+    - COLD: a junior title (intern, student, ...) with no senior keyword.
+    - HOT: seniority >= hot_min_seniority without junior keywords, a company
+      of at least hot_min_employees or hot_min_revenue, and activity within
+      hot_max_activity_days (missing activity is neutral).
+    Mixed signals (e.g. "Assistant to the CEO") are always left to the LLM.
+    """
+
+    SOURCE = "rules"
+
+    def __init__(
+        self,
+        cold_max_seniority: int = 1,
+        hot_min_seniority: int = 4,
+        hot_min_employees: int = 1000,
+        hot_min_revenue: float = 100e6,
+        hot_max_activity_days: int = 30,
+        enabled: bool = True,
+    ):
+        self.cold_max_seniority = cold_max_seniority
+        self.hot_min_seniority = hot_min_seniority
+        self.hot_min_employees = hot_min_employees
+        self.hot_min_revenue = hot_min_revenue
+        self.hot_max_activity_days = hot_max_activity_days
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {"seen": 0, "HOT": 0, "COLD": 0, "ambiguous": 0}
+
+    def classify(self, payload: Dict) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        result = self._classify(extract_features(payload))
+        with self._lock:
+            self._counters["seen"] += 1
+            self._counters[result["priority"] if result else "ambiguous"] += 1
+        return result
+
+    def _classify(self, f: Dict) -> Optional[Dict]:
+        seniority = f["seniority"]
+
+        if f["junior"] and (seniority is None or seniority <= self.cold_max_seniority):
+            return self._result("COLD", 15, 90, ["Junior or student role"])
+
+        if seniority is None or seniority < self.hot_min_seniority or f["junior"]:
+            return None
+
+        big_company = (f["employees"] or 0) >= self.hot_min_employees
+        big_revenue = (f["revenue_usd"] or 0) >= self.hot_min_revenue
+        active = f["activity_days"] is None or f["activity_days"] <= self.hot_max_activity_days
+        if not (big_company or big_revenue) or not active:
+            return None
+
+        reasons = ["Senior decision-maker title"]
+        if big_company:
+            reasons.append(f"Company size {f['employees']:,}+ employees")
+        if big_revenue:
+            reasons.append(f"Annual revenue ${f['revenue_usd'] / 1e6:,.0f}M+")
+        if f["activity_days"] is not None:
+            reasons.append(f"Posted {f['activity_days']} days ago")
+        return self._result("HOT", 90, 85, reasons)
+
+    def classify_frame(self, features: pd.DataFrame) -> pd.Series:
+        """
+        Vectorized routing over a FrameFeatureBuilder.build() frame: "HOT",
+        "COLD", or NA for rows that should go to the LLM. Same rules as
+        classify().
+        """
+        out = pd.Series(pd.NA, index=features.index, dtype="string")
+        if not self.enabled:
+            return out
+
+        seniority = features["seniority"]
+        junior = features["junior"].astype(bool)
+        cold = junior & (seniority.isna() | (seniority <= self.cold_max_seniority)).fillna(True)
+
+        activity = features["activity_days"]
+        big = (features["employees"].fillna(0) >= self.hot_min_employees) | (
+            features["revenue_usd"].fillna(0) >= self.hot_min_revenue
+        )
+        active = activity.isna() | (activity <= self.hot_max_activity_days).fillna(False)
+        hot = ~junior & (seniority >= self.hot_min_seniority).fillna(False) & big & active
+
+        out[cold] = "COLD"
+        out[hot & ~cold] = "HOT"
+
+        n_hot, n_cold = int((hot & ~cold).sum()), int(cold.sum())
+        with self._lock:
+            self._counters["seen"] += len(out)
+            self._counters["HOT"] += n_hot
+            self._counters["COLD"] += n_cold
+            self._counters["ambiguous"] += len(out) - n_hot - n_cold
+        return out
+
+    def _result(self, priority: str, score: int, confidence: int, reasons) -> Dict:
+        return {
+            "priority": priority,
+            "score": score,
+            "confidence": confidence,
+            "reasons": list(reasons),
+            "source": self.SOURCE,
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+        decided = stats["HOT"] + stats["COLD"]
+        stats["hit_rate"] = round(decided / stats["seen"], 4) if stats["seen"] else 0.0
+        return stats
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, List
+
+
+class ProfileCache:
+    """
+    On-disk cache of Apify results keyed by normalized LinkedIn username.
+    Profiles and recent posts expire independently (profile_ttl / posts_ttl,
+    seconds). Every 64 writes to a table, its expired rows are dropped and it
+    is trimmed back to max_entries rows, least recently used first.
+
+    A profile can be stored with a validator (see
+    AsyncLinkedInAPIExtractor.posts_validator). Past profile_ttl, and up to
+    profile_max_age, revalidate_profile() serves it again if the caller's
+    freshly probed validator still matches, instead of a new profile-actor
+    run.
+    """
+
+    TABLES = ("profiles", "posts")
+
+    def __init__(
+        self,
+        path: str = "lead_cache.sqlite3",
+        profile_ttl: int = 7 * 24 * 3600,
+        posts_ttl: int = 24 * 3600,
+        max_entries: int = 100_000,
+        profile_max_age: int = 90 * 24 * 3600,
+    ):
+        self.path = path
+        self.ttls = {"profiles": profile_ttl, "posts": posts_ttl}
+        self.profile_max_age = max(profile_max_age, profile_ttl)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = {table: 0 for table in self.TABLES}
+        self._counters = {
+            "profile_hits": 0,
+            "profile_misses": 0,
+            "posts_hits": 0,
+            "posts_misses": 0,
+            "profile_revalidated": 0,
+            "profile_changed": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in self.TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "username TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)"
+            )
+        # caches created before validators existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(profiles)")}
+        if "validator" not in columns:
+            self._conn.execute("ALTER TABLE profiles ADD COLUMN validator TEXT")
+
+    @staticmethod
+    def normalize(username: str) -> str:
+        return (username or "").strip().lower()
+
+    def _get(self, table: str, username: str, counter: str):
+        key = self.normalize(username)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT data, fetched_at FROM {table} WHERE username = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttls[table]:
+                self._counters[f"{counter}_misses"] += 1
+                return None
+
+            self._conn.execute(
+                f"UPDATE {table} SET accessed_at = ? WHERE username = ?", (now, key)
+            )
+            self._counters[f"{counter}_hits"] += 1
+        return json.loads(row[0])
+
+    def _set(self, table: str, username: str, value, **columns):
+        key = self.normalize(username)
+        if not key:
+            return
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        names = ", ".join(["username", "data", "fetched_at", "accessed_at", *columns])
+        marks = ", ".join("?" * (4 + len(columns)))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({marks})",
+                (key, data, now, now, *columns.values()),
+            )
+            # COUNT(*) is a full index scan, so only check the bound periodically
+            self._writes[table] += 1
+            if self._writes[table] % 64 == 0:
+                self._evict(table)
+
+    def _evict(self, table: str):
+        self._counters["expired"] += self._purge(table, time.time())
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE username IN "
+                f"(SELECT username FROM {table} ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+            self._counters["evictions"] += excess
+
+    def get_profile(self, username: str) -> Optional[Dict]:
+        return self._get("profiles", username, "profile")
+
+    def set_profile(self, username: str, profile: Dict, validator: Optional[str] = None):
+        self._set("profiles", username, profile, validator=validator)
+
+    def set_profile_validator(self, username: str, validator: Optional[str]):
+        """Records the validator of a profile stored without one (fetched before its posts were known)."""
+        if validator is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE profiles SET validator = ? WHERE username = ? AND validator IS NULL",
+                (validator, self.normalize(username)),
+            )
+
+    def stale_profile_validator(self, username: str) -> Optional[str]:
+        """Validator of a profile that is past profile_ttl but can still be revalidated; else None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT validator FROM profiles WHERE username = ? AND fetched_at < ? AND fetched_at >= ?",
+                (self.normalize(username), now - self.ttls["profiles"], now - self.profile_max_age),
+            ).fetchone()
+        return row[0] if row else None
+
+    def revalidate_profile(self, username: str, validator: Optional[str]) -> Optional[Dict]:
+        """
+        The stored profile, with its TTL restarted, if validator matches the
+        one it was stored with and it is younger than profile_max_age; else
+        None (the profile has to be fetched again).
+        """
+        key = self.normalize(username)
+        now = time.time()
+        with self._lock:
+            row = None
+            if validator is not None:
+                row = self._conn.execute(
+                    "SELECT data FROM profiles WHERE username = ? AND validator = ? AND fetched_at >= ?",
+                    (key, validator, now - self.profile_max_age),
+                ).fetchone()
+            if row is None:
+                self._counters["profile_changed"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE profiles SET fetched_at = ?, accessed_at = ? WHERE username = ?", (now, now, key)
+            )
+            self._counters["profile_revalidated"] += 1
+        return json.loads(row[0])
+
+    def get_posts(self, username: str) -> Optional[List[Dict]]:
+        return self._get("posts", username, "posts")
+
+    def set_posts(self, username: str, posts: List[Dict]):
+        self._set("posts", username, posts)
+
+    def _purge(self, table: str, now: float) -> int:
+        # stale profiles are kept until profile_max_age so they can be revalidated
+        max_age = self.profile_max_age if table == "profiles" else self.ttls[table]
+        cur = self._conn.execute(f"DELETE FROM {table} WHERE fetched_at < ?", (now - max_age,))
+        return cur.rowcount
+
+    def purge_expired(self) -> int:
+        """Deletes every expired row now, rather than at the next eviction check."""
+        now = time.time()
+        with self._lock:
+            removed = sum(self._purge(table, now) for table in self.TABLES)
+            self._counters["expired"] += removed
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            for table in self.TABLES:
+                stats[f"{table}_entries"] = self._conn.execute(
+                    f"SELECT COUNT(*) FROM {table}"
+                ).fetchone()[0]
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,99 @@
+import copy
+import json
+import math
+from typing import Optional, Dict, List, Tuple
+
+PAYLOAD_MARKER = "{payload}"
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class PromptBuilder:
+    """
+    Static prompt template split once around a single "{payload}" marker, so
+    building a prompt is two string joins plus one compact json.dumps. The
+    template itself may contain literal JSON braces.
+
+    Each lead's payload is held to token_budget (estimated) tokens by
+    shortening, then dropping, its recent posts.
+    """
+
+    def __init__(self, template: str, token_budget: int = 600, chars_per_token: float = 4.0, min_post_chars: int = 80):
+        if template.count(PAYLOAD_MARKER) != 1:
+            raise ValueError(f"template must contain {PAYLOAD_MARKER} exactly once")
+        self.prefix, self.suffix = template.split(PAYLOAD_MARKER)
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        self.min_post_chars = min_post_chars
+        self.static_tokens = self.estimate_tokens(self.prefix) + self.estimate_tokens(self.suffix)
+
+    def estimate_tokens(self, text: str) -> int:
+        # ~4 chars/token for English on Llama tokenizers; good enough for budgeting
+        return int(math.ceil(len(text) / self.chars_per_token))
+
+    @staticmethod
+    def _posts_ref(payload: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+        prospect = payload.get("prospect")
+        if isinstance(prospect, dict) and isinstance(prospect.get("recent_posts"), list):
+            return prospect, "recent_posts"
+        if isinstance(payload.get("recent_posts"), list):
+            return payload, "recent_posts"
+        return None, None
+
+    def fit_payload(self, payload: Dict) -> Tuple[str, int, bool]:
+        """
+        Returns (serialized payload, estimated tokens, truncated?). The input
+        dict is never modified.
+        """
+        text = compact_json(payload)
+        tokens = self.estimate_tokens(text)
+        if tokens <= self.token_budget:
+            return text, tokens, False
+
+        owner, key = self._posts_ref(payload)
+        if owner is None or not owner[key]:
+            return text, tokens, False
+
+        payload = copy.deepcopy(payload)
+        owner, key = self._posts_ref(payload)
+        posts: List = owner[key]
+
+        # 1) halve post texts until they fit or hit min_post_chars
+        longest = max((len(p.get("text") or "") for p in posts if isinstance(p, dict)), default=0)
+        limit = longest
+        while tokens > self.token_budget and limit > self.min_post_chars:
+            limit = max(self.min_post_chars, limit // 2)
+            for p in posts:
+                if isinstance(p, dict) and len(p.get("text") or "") > limit:
+                    p["text"] = p["text"][:limit].rstrip() + "…"
+            text = compact_json(payload)
+            tokens = self.estimate_tokens(text)
+
+        # 2) drop the oldest posts (lists are newest first)
+        while tokens > self.token_budget and posts:
+            posts.pop()
+            text = compact_json(payload)
+            tokens = self.estimate_tokens(text)
+
+        return text, tokens, True
+
+    def build(self, payload: Dict) -> Tuple[str, int]:
+        """Returns (prompt, estimated prompt tokens)."""
+        body, _, _ = self.fit_payload(payload)
+        prompt = self.prefix + body + self.suffix
+        return prompt, self.static_tokens + self.estimate_tokens(body)
+
+    def build_many(self, payloads: Dict[str, Dict]) -> Tuple[str, int]:
+        """
+        One prompt for several payloads keyed by id; each payload gets its
+        own token_budget.
+        """
+        parts = []
+        for pid, payload in payloads.items():
+            body, _, _ = self.fit_payload(payload)
+            parts.append(compact_json(str(pid)) + ":" + body)
+        body = "{" + ",".join(parts) + "}"
+        prompt = self.prefix + body + self.suffix
+        return prompt, self.static_tokens + self.estimate_tokens(body)
@@ -0,0 +1,423 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Dict, Callable, Any, Awaitable
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value) -> Optional[float]:
+    """
+    Parses rate-limit reset values: plain seconds ("7", "0.5") or Groq's
+    Go-style durations ("2m59.56s", "7.66s", "120ms"). Returns seconds.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in _DURATION_PART.findall(value):
+        matched = True
+        amount = float(amount)
+        total += {"h": 3600, "m": 60, "s": 1, "ms": 0.001}[unit] * amount
+    return total if matched else None
+
+
+class TokenBucket:
+    """
+    Classic token bucket. reserve() never blocks: it takes the tokens (going
+    into debt if needed) and returns how long the caller must wait, so the
+    same bucket can serve both threads and coroutines.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate if self.rate > 0 else float("inf")
+
+    def configure(self, rate: Optional[float] = None, capacity: Optional[float] = None):
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = float(rate)
+            if capacity is not None:
+                self.capacity = float(capacity)
+                self._tokens = min(self._tokens, self.capacity)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class ProviderLimiter:
+    """
+    Client-side limits for one provider: a request-rate bucket, an optional
+    token-per-minute bucket, an optional cap on concurrent slots and a pause
+    window set from Retry-After / exhausted rate-limit headers.
+
+    The request rate adapts: a 429 without Retry-After halves it (a 429 with
+    Retry-After just pauses), and each success adds recovery_step * max_rate
+    back, never above max_rate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_sec: float,
+        burst: Optional[float] = None,
+        tokens_per_min: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+        recovery_step: float = 0.05,
+    ):
+        self.name = name
+        self.max_rate = float(requests_per_sec)
+        self.min_rate = self.max_rate / 64
+        self.recovery_step = recovery_step
+        self.requests = TokenBucket(requests_per_sec, burst or max(1.0, requests_per_sec))
+        self.tokens = TokenBucket(tokens_per_min / 60.0, tokens_per_min) if tokens_per_min else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        # (loop, future) per coroutine waiting in aslot(); resolved when a slot frees up
+        self._async_waiters = []
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._slots_in_use = 0
+        self._waiting = 0
+        self._counters = {"requests": 0, "throttled": 0, "retries": 0, "errors": 0, "wait_s": 0.0}
+
+    # ---------- pacing ----------
+
+    def _reserve(self, cost_tokens: float) -> float:
+        wait = self.requests.reserve(1)
+        if self.tokens is not None and cost_tokens:
+            wait = max(wait, self.tokens.reserve(cost_tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            self._counters["wait_s"] += max(0.0, wait)
+        return max(0.0, wait)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            # small jitter so callers released together do not stampede
+            return retry_after + random.uniform(0, min(1.0, self.backoff_base))
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    # ---------- feedback ----------
+
+    def on_response(self, status: int, headers) -> Optional[float]:
+        """
+        Updates limits from a response. Returns Retry-After seconds (if any)
+        for retryable statuses.
+        """
+        headers = headers or {}
+        retry_after = parse_duration(headers.get("retry-after"))
+
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens:
+            try:
+                tpm = float(limit_tokens)
+                if self.tokens is None:
+                    self.tokens = TokenBucket(tpm / 60.0, tpm)
+                elif abs(self.tokens.capacity - tpm) > 1e-6:
+                    self.tokens.configure(rate=tpm / 60.0, capacity=tpm)
+            except ValueError:
+                pass
+
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            try:
+                if remaining is not None and float(remaining) <= 0 and reset:
+                    self.pause(reset)
+            except ValueError:
+                pass
+
+        with self._lock:
+            self._counters["requests"] += 1
+            if status == 429:
+                self._counters["throttled"] += 1
+
+        if status == 429:
+            if retry_after:
+                self.pause(retry_after)
+            else:
+                self.requests.configure(rate=max(self.min_rate, self.requests.rate / 2))
+        elif status < 400 and self.requests.rate < self.max_rate:
+            step = self.recovery_step * self.max_rate
+            self.requests.configure(rate=min(self.max_rate, self.requests.rate + step))
+
+        return retry_after
+
+    # ---------- concurrency slots ----------
+
+    def _try_take_slot(self) -> bool:
+        if self.max_concurrency is None or self._slots_in_use < self.max_concurrency:
+            self._slots_in_use += 1
+            return True
+        return False
+
+    def _release_slot(self):
+        with self._lock:
+            self._slots_in_use -= 1
+            self._slot_free.notify()
+            self._wake_async_waiters()
+
+    def _wake_async_waiters(self):
+        # called with _lock held; every waiter retries, since a thread may take the slot first
+        for loop, fut in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:
+                pass  # that loop is closed
+        self._async_waiters.clear()
+
+    @contextmanager
+    def slot(self):
+        """Holds one of max_concurrency slots (e.g. a running Apify actor)."""
+        with self._lock:
+            self._waiting += 1
+            try:
+                while not self._try_take_slot():
+                    self._slot_free.wait()
+            finally:
+                self._waiting -= 1
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """slot() for coroutines; waits for a release instead of blocking the loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    if self._try_take_slot():
+                        break
+                    waiter = (loop, loop.create_future())
+                    self._async_waiters.append(waiter)
+                try:
+                    await waiter[1]
+                finally:
+                    with self._lock:
+                        if waiter in self._async_waiters:
+                            self._async_waiters.remove(waiter)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    def set_max_concurrency(self, value: Optional[int]):
+        with self._lock:
+            self.max_concurrency = value
+            self._slot_free.notify_all()
+            self._wake_async_waiters()
+
+    # ---------- calls ----------
+
+    def _enter(self):
+        with self._lock:
+            self._waiting += 1
+
+    def _start(self):
+        with self._lock:
+            self._waiting -= 1
+            self._in_flight += 1
+
+    def _finish(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _note_retry(self, error: bool = False):
+        with self._lock:
+            self._counters["retries"] += 1
+            if error:
+                self._counters["errors"] += 1
+
+    def call(self, fn: Callable[[], Any], cost_tokens: float = 0) -> Any:
+        """
+        Runs fn() (which returns a requests/httpx response) under the limits,
+        retrying retryable statuses and exceptions with jittered backoff.
+        After max_retries the last response is returned (or exception raised).
+        """
+        for attempt in range(self.max_retries + 1):
+            self._enter()
+            wait = self._reserve(cost_tokens)
+            if wait:
+                time.sleep(wait)
+            self._start()
+            try:
+                resp = fn()
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                self._note_retry(error=True)
+                time.sleep(self.backoff(attempt))
+                continue
+            finally:
+                self._finish()
+
+            retry_after = self.on_response(resp.status_code, resp.headers)
+            if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return resp
+            self._note_retry()
+            time.sleep(self.backoff(attempt, retry_after))
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], cost_tokens: float = 0) -> Any:
+        for attempt in range(self.max_retries + 1):
+            self._enter()
+            wait = self._reserve(cost_tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            self._start()
+            try:
+                resp = await fn()
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                self._note_retry(error=True)
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            finally:
+                self._finish()
+
+            retry_after = self.on_response(resp.status_code, resp.headers)
+            if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return resp
+            self._note_retry()
+            await asyncio.sleep(self.backoff(attempt, retry_after))
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            out = dict(self._counters)
+            out.update(
+                queue_depth=self._waiting,
+                in_flight=self._in_flight,
+                slots_in_use=self._slots_in_use,
+                max_concurrency=self.max_concurrency,
+                paused_s=round(max(0.0, self._paused_until - time.monotonic()), 3),
+            )
+        out["wait_s"] = round(out["wait_s"], 3)
+        out["request_rate"] = round(self.requests.rate, 4)
+        if self.tokens is not None:
+            out["tokens_per_min"] = self.tokens.capacity
+            out["tokens_available"] = round(self.tokens.available(), 1)
+        return out
+
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class RateLimitScheduler:
+    """
+    Registry of ProviderLimiters shared by every client in the process, so
+    the Groq scorer, the Apify extractor and app.py all draw from the same
+    buckets.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, **limits) -> ProviderLimiter:
+        with self._lock:
+            limiter = ProviderLimiter(name, **limits)
+            self._providers[name] = limiter
+            return limiter
+
+    def provider(self, name: str) -> ProviderLimiter:
+        with self._lock:
+            if name not in self._providers:
+                raise KeyError(f"Unknown provider '{name}'")
+            return self._providers[name]
+
+    def call(self, name: str, fn: Callable[[], Any], cost_tokens: float = 0) -> Any:
+        return self.provider(name).call(fn, cost_tokens)
+
+    async def acall(self, name: str, fn: Callable[[], Awaitable[Any]], cost_tokens: float = 0) -> Any:
+        return await self.provider(name).acall(fn, cost_tokens)
+
+    def slot(self, name: str):
+        return self.provider(name).slot()
+
+    def aslot(self, name: str):
+        return self.provider(name).aslot()
+
+    def metrics(self) -> Dict[str, Dict]:
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: p.metrics() for name, p in providers.items()}
+
+
+_default_scheduler: Optional[RateLimitScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_default_scheduler() -> RateLimitScheduler:
+    """
+    Process-wide scheduler with conservative defaults:
+    - groq: 30 requests/min, 6000 tokens/min until Groq's x-ratelimit-*
+      headers report the real token limit
+    - apify: 200 requests/sec across all endpoints; Apify's own limits are
+      per resource, and 429s slow this down further
+    - apify_runs: concurrent actor runs, sized from the account's
+      maxConcurrentActorJobs by the extractor on first use
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            s = RateLimitScheduler()
+            s.register("groq", requests_per_sec=0.5, burst=30, tokens_per_min=6000)
+            s.register("apify", requests_per_sec=200, burst=200)
+            s.register("apify_runs", requests_per_sec=1000, burst=1000, max_concurrency=25)
+            _default_scheduler = s
+        return _default_scheduler
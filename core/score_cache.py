@@ -0,0 +1,67 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict
+
+
+def payload_fingerprint(payload: Dict, model: str, prompt_version: str) -> str:
+    """
+    Canonical hash of a scoring request: key order and whitespace do not
+    matter, while any change to the payload, model or prompt version does.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt_version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(canonical.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ScoreCache:
+    """
+    In-memory LRU cache of LLM scoring results with a TTL (seconds).
+    Thread-safe; values are copied on the way in and out.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: int = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                self._counters["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._counters, entries=len(self._data))
@@ -0,0 +1,214 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Dict, List
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+
+def _dumps(value) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(value: Optional[str]):
+    return json.loads(value) if value else None
+
+
+class LeaseLost(Exception):
+    """The worker's lease ran out and the job was handed out again (or finished) before it reported back."""
+
+
+class ScoreQueue:
+    """
+    Persistent SQLite queue of scoring-service jobs. Jobs are claimed with a
+    lease; a job whose worker died (lease expired) is handed out again, up
+    to max_attempts, so workers heartbeat() while a job runs. Claims are fair across tenants: the next job comes from
+    the tenant with the fewest running jobs, oldest first, so one analyst's
+    big submission cannot starve everybody else.
+
+    Safe to share between threads and between processes using the same file.
+    """
+
+    def __init__(self, path: str = "score_queue.sqlite3", max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS score_jobs ("
+            "job_id TEXT PRIMARY KEY, tenant TEXT NOT NULL, kind TEXT NOT NULL, request TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "worker TEXT, lease_until REAL, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS score_jobs_status ON score_jobs(status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS score_jobs_tenant ON score_jobs(tenant, status)")
+
+    def submit(self, kind: str, request: Dict, tenant: str = "default") -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO score_jobs (job_id, tenant, kind, request, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, tenant or "default", kind, _dumps(request), QUEUED, time.time()),
+            )
+        return job_id
+
+    def claim(self, worker: str, lease_s: float = 300) -> Optional[Dict]:
+        """
+        Marks the next job running for `worker` and returns it as
+        {"job_id", "tenant", "kind", "request", "attempts"}, or None if the
+        queue is empty. Expired leases are requeued (or failed) first.
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two processes cannot claim the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire_leases(now)
+                row = self._conn.execute(
+                    "SELECT j.job_id, j.tenant, j.kind, j.request, j.attempts FROM score_jobs j "
+                    "WHERE j.status = ? ORDER BY "
+                    "(SELECT COUNT(*) FROM score_jobs r WHERE r.tenant = j.tenant AND r.status = ?), "
+                    "j.created_at LIMIT 1",
+                    (QUEUED, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE score_jobs SET status = ?, worker = ?, lease_until = ?, "
+                        "started_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+                        (RUNNING, worker, now + lease_s, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        job_id, tenant, kind, request, attempts = row
+        return {"job_id": job_id, "tenant": tenant, "kind": kind, "request": _loads(request), "attempts": attempts + 1}
+
+    def _expire_leases(self, now: float):
+        self._conn.execute(
+            "UPDATE score_jobs SET status = ?, worker = NULL, lease_until = NULL "
+            "WHERE status = ? AND lease_until < ? AND attempts < ?",
+            (QUEUED, RUNNING, now, self.max_attempts),
+        )
+        self._conn.execute(
+            "UPDATE score_jobs SET status = ?, error = ?, finished_at = ? "
+            "WHERE status = ? AND lease_until < ?",
+            (FAILED, "worker lease expired", now, RUNNING, now),
+        )
+
+    def heartbeat(self, job_id: str, worker: str, lease_s: float = 300) -> bool:
+        """Extends the lease by lease_s from now. False if `worker` no longer holds the job."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE score_jobs SET lease_until = ? WHERE job_id = ? AND status = ? AND worker = ?",
+                (time.time() + lease_s, job_id, RUNNING, worker),
+            )
+        return cur.rowcount > 0
+
+    def complete(self, job_id: str, result: Dict, worker: Optional[str] = None):
+        """
+        Stores the result. With `worker`, only while that worker still holds
+        the lease; raises LeaseLost otherwise and leaves the job alone.
+        """
+        self._finish(job_id, DONE, worker, result=result)
+
+    def fail(self, job_id: str, error: str, retry: bool = False, worker: Optional[str] = None) -> bool:
+        """
+        Fails the job, or puts it back in the queue if retry and attempts
+        remain. Returns True if it was requeued. With `worker`, raises
+        LeaseLost like complete().
+        """
+        if retry:
+            sql = (
+                "UPDATE score_jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL "
+                "WHERE job_id = ? AND status = ? AND attempts < ?"
+            )
+            params = [QUEUED, (error or "")[:500], job_id, RUNNING, self.max_attempts]
+            if worker is not None:
+                sql += " AND worker = ?"
+                params.append(worker)
+            with self._lock:
+                cur = self._conn.execute(sql, params)
+            if cur.rowcount:
+                return True
+        self._finish(job_id, FAILED, worker, error=error)
+        return False
+
+    def _finish(
+        self, job_id: str, status: str, worker: Optional[str], result: Optional[Dict] = None,
+        error: Optional[str] = None,
+    ):
+        sql = (
+            "UPDATE score_jobs SET status = ?, result = ?, error = ?, lease_until = NULL, finished_at = ? "
+            "WHERE job_id = ?"
+        )
+        params = [status, _dumps(result), (error or "")[:500] or None, time.time(), job_id]
+        if worker is not None:
+            sql += " AND status = ? AND worker = ?"
+            params += [RUNNING, worker]
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+        if worker is not None and not cur.rowcount:
+            raise LeaseLost(f"job {job_id} is no longer leased to {worker}")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, tenant, kind, status, result, error, attempts, created_at, started_at, finished_at "
+                "FROM score_jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, tenant, kind, status, result, error, attempts, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "tenant": tenant,
+            "kind": kind,
+            "status": status,
+            "result": _loads(result),
+            "error": error,
+            "attempts": attempts,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def counts(self, tenant: Optional[str] = None) -> Dict[str, int]:
+        sql = "SELECT status, COUNT(*) FROM score_jobs"
+        params: List = []
+        if tenant is not None:
+            sql += " WHERE tenant = ?"
+            params.append(tenant)
+        with self._lock:
+            rows = self._conn.execute(sql + " GROUP BY status", params).fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def purge(self, older_than_s: float = 7 * 86400) -> int:
+        """Deletes finished jobs older than older_than_s. Returns the number removed."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM score_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - older_than_s),
+            )
+        return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,347 @@
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List, Callable
+
+import requests
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.batch_runner import BatchLeadRunner, COMPANY_COLUMNS
+from core.groq_scorer import GroqLeadScorer
+from core.metrics import MetricsRegistry, get_default_metrics, trace_lead
+from core.rate_limiter import RateLimitScheduler, get_default_scheduler
+from core.score_queue import ScoreQueue, LeaseLost, DONE, FAILED
+
+# job kinds and the request fields each one needs
+JOB_KINDS = {
+    "extract": "linkedin_url",  # profile + posts -> LeadRecord
+    "score": "payload",  # scorer payload -> verdict
+    "lead": "linkedin_url",  # extract + build payload + score, like one batch row
+}
+
+
+class JobFailed(Exception):
+    """A job that cannot succeed on retry (bad input, profile not found)."""
+
+
+class ScoringWorkerPool:
+    """
+    `workers` threads claiming jobs from a ScoreQueue and running them with
+    one shared extractor and scorer. Provider limits are global to the
+    process because both go through the same RateLimitScheduler, and the
+    pool size caps how many jobs run at once however many analysts submit.
+    Each job runs inside trace_lead(); its timing breakdown is stored with
+    the result under "timings". A heartbeat thread renews the lease of every
+    running job each lease_s / 3, so slow provider calls do not get a live
+    job handed to a second worker.
+    """
+
+    def __init__(
+        self,
+        queue: ScoreQueue,
+        extractor: LinkedInAPIExtractor,
+        scorer: GroqLeadScorer,
+        workers: int = 4,
+        poll_interval: float = 0.2,
+        lease_s: float = 300,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.queue = queue
+        self.extractor = extractor
+        self.scorer = scorer
+        self.runner = BatchLeadRunner(extractor, scorer, concurrency=1)
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_s = lease_s
+        self.metrics = metrics or get_default_metrics()
+        self.handlers: Dict[str, Callable[[Dict], Dict]] = {
+            "extract": self._extract,
+            "score": self._score,
+            "lead": self._lead,
+        }
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # job_id -> worker for jobs being run, for busy() and the heartbeat
+        self._leases: Dict[str, str] = {}
+        self._leases_lock = threading.Lock()
+
+    def start(self) -> "ScoringWorkerPool":
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, args=(f"{prefix}-{i}",), name=f"score-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name="score-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        return self
+
+    def stop(self, timeout: float = 30):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def busy(self) -> int:
+        with self._leases_lock:
+            return len(self._leases)
+
+    def _loop(self, worker: str):
+        while not self._stop.is_set():
+            job = self.queue.claim(worker, lease_s=self.lease_s)
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._leases_lock:
+                self._leases[job["job_id"]] = worker
+            try:
+                self.run_job(job, worker)
+            finally:
+                with self._leases_lock:
+                    self._leases.pop(job["job_id"], None)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.lease_s / 3):
+            with self._leases_lock:
+                leases = list(self._leases.items())
+            for job_id, worker in leases:
+                if not self.queue.heartbeat(job_id, worker, lease_s=self.lease_s):
+                    self.metrics.incr("service_leases_lost_total")
+
+    def run_job(self, job: Dict, worker: Optional[str] = None):
+        """
+        Runs a claimed job and records the outcome. With `worker`, the
+        outcome is only recorded while that worker still holds the lease; a
+        job that was handed out again is left to its new worker.
+        """
+        kind = job["kind"]
+        job_id = job["job_id"]
+        status = DONE
+        try:
+            with trace_lead() as trace, self.metrics.timer(f"service.{kind}"):
+                result = self.handlers[kind](job["request"] or {})
+            result["timings"] = trace.to_dict()
+            self.queue.complete(job_id, result, worker=worker)
+        except LeaseLost:
+            status = "lease_lost"
+        except JobFailed as e:
+            status = self._fail(job_id, str(e), worker)
+        except Exception as e:
+            # provider hiccups: put it back while attempts remain
+            status = self._fail(job_id, str(e)[:500], worker, retry=True)
+        self.metrics.incr("service_jobs_total", kind=kind, status=status)
+
+    def _fail(self, job_id: str, error: str, worker: Optional[str], retry: bool = False) -> str:
+        try:
+            requeued = self.queue.fail(job_id, error, retry=retry, worker=worker)
+        except LeaseLost:
+            return "lease_lost"
+        return "retried" if requeued else FAILED
+
+    def _extract(self, request: Dict) -> Dict:
+        record = self.extractor.extract_lead_record(request["linkedin_url"])
+        if record is None:
+            raise JobFailed("extraction failed")
+        return {"record": record.to_dict(), "activity_days": record.activity_days}
+
+    def _score(self, request: Dict) -> Dict:
+        return self.scorer.score(
+            request["payload"],
+            use_cache=bool(request.get("use_cache", True)),
+            pre_score=bool(request.get("pre_score", True)),
+        )
+
+    def _lead(self, request: Dict) -> Dict:
+        lead = {col: str(request.get(col) or "") for col in COMPANY_COLUMNS}
+        lead["linkedin_url"] = str(request["linkedin_url"]).strip()
+        result = self.runner.score_lead(0, lead)
+        result.pop("row", None)
+        if result["status"] != "ok":
+            raise JobFailed(result.get("error") or "scoring failed")
+        return result
+
+
+class ScoringService:
+    """
+    HTTP front of the job queue:
+
+        POST /v1/jobs         {"kind": "extract"|"score"|"lead", ...} -> 202 {"job_id", "status"}
+        GET  /v1/jobs/<id>    job status, result (when done) or error
+        GET  /v1/stats        queue counts, busy workers, provider rate-limit state
+        GET  /metrics         Prometheus text
+        GET  /v1/health
+
+    The tenant comes from the X-Tenant header (or "tenant" in the body).
+    A tenant with max_queued_per_tenant jobs waiting gets 429 + Retry-After.
+    """
+
+    def __init__(
+        self,
+        queue: ScoreQueue,
+        pool: ScoringWorkerPool,
+        host: str = "127.0.0.1",
+        port: int = 8090,
+        max_queued_per_tenant: int = 500,
+        scheduler: Optional[RateLimitScheduler] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.queue = queue
+        self.pool = pool
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.scheduler = scheduler or get_default_scheduler()
+        self.metrics = metrics or get_default_metrics()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ScoringService":
+        self.pool.start()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="scoring-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.pool.start()
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.pool.stop()
+
+    def stats(self) -> Dict:
+        return {
+            "queue": self.queue.counts(),
+            "workers": self.pool.workers,
+            "busy": self.pool.busy(),
+            "rate_limits": self.scheduler.metrics(),
+        }
+
+    def submit(self, body: Dict, tenant: str):
+        """Returns (status, response body)."""
+        kind = body.get("kind")
+        if kind not in JOB_KINDS:
+            return 400, {"error": f"kind must be one of {sorted(JOB_KINDS)}"}
+        field = JOB_KINDS[kind]
+        value = body.get(field)
+        if not value or (field == "payload" and not isinstance(value, dict)):
+            return 400, {"error": f"'{field}' is required for {kind} jobs"}
+
+        if self.queue.counts(tenant)["queued"] >= self.max_queued_per_tenant:
+            self.metrics.incr("service_rejected_total", reason="tenant_queue_full")
+            return 429, {"error": f"too many queued jobs for tenant '{tenant}'"}
+
+        request = {k: v for k, v in body.items() if k not in ("kind", "tenant")}
+        job_id = self.queue.submit(kind, request, tenant=tenant)
+        return 202, {"job_id": job_id, "status": "queued"}
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send(self, status: int, body, content_type: str = "application/json", headers: Optional[Dict] = None):
+                data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/v1/health":
+                    self._send(200, {"ok": True})
+                elif path == "/v1/stats":
+                    self._send(200, service.stats())
+                elif path == "/metrics":
+                    self._send(200, service.metrics.to_prometheus(), content_type="text/plain; version=0.0.4")
+                elif path.startswith("/v1/jobs/"):
+                    job = service.queue.get(path.rsplit("/", 1)[1])
+                    if job is None:
+                        self._send(404, {"error": "job not found"})
+                    else:
+                        self._send(200, job)
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if self.path.split("?")[0].rstrip("/") != "/v1/jobs":
+                    self._send(404, {"error": "not found"})
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                    if not isinstance(body, dict):
+                        raise ValueError
+                except ValueError:
+                    self._send(400, {"error": "invalid JSON body"})
+                    return
+
+                tenant = self.headers.get("X-Tenant") or str(body.get("tenant") or "default")
+                status, response = service.submit(body, tenant)
+                self._send(status, response, headers={"Retry-After": "5"} if status == 429 else None)
+
+        return Handler
+
+
+class ScoringServiceClient:
+    """Submits jobs to a ScoringService and polls for their results."""
+
+    def __init__(self, base_url: str, tenant: str = "default", timeout: float = 10):
+        self.base_url = base_url.rstrip("/")
+        self.tenant = tenant
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["X-Tenant"] = tenant
+
+    def submit(self, kind: str, **request) -> str:
+        resp = self.session.post(f"{self.base_url}/v1/jobs", json=dict(request, kind=kind), timeout=self.timeout)
+        if resp.status_code != 202:
+            raise RuntimeError(f"Scoring service rejected job ({resp.status_code}): {resp.text[:500]}")
+        return resp.json()["job_id"]
+
+    def get(self, job_id: str) -> Dict:
+        resp = self.session.get(f"{self.base_url}/v1/jobs/{job_id}", timeout=self.timeout)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Scoring service error ({resp.status_code}): {resp.text[:500]}")
+        return resp.json()
+
+    def wait(self, job_id: str, timeout: float = 300, poll_interval: float = 0.5) -> Dict:
+        """
+        Polls until the job is done and returns its result. Raises
+        RuntimeError if it failed or is still unfinished after timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job["status"] == DONE:
+                return job["result"]
+            if job["status"] == FAILED:
+                raise RuntimeError(job.get("error") or "job failed")
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"job {job_id} still {job['status']} after {timeout:.0f}s")
+            time.sleep(poll_interval)
+
+    def run(self, kind: str, timeout: float = 300, **request) -> Dict:
+        return self.wait(self.submit(kind, **request), timeout=timeout)
+
+    def close(self):
+        self.session.close()
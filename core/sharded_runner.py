@@ -0,0 +1,240 @@
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, List, Iterable, Iterator, Callable, Tuple
+
+from core.async_apify_extractor import extract_username
+from core.batch_runner import BatchLeadRunner
+from core.job_store import JobStore
+
+
+def shard_key(linkedin_url: str) -> str:
+    """Lower-cased LinkedIn username (the cache key), or the bare URL if there is none."""
+    username = extract_username(linkedin_url)
+    if username:
+        return username.lower()
+    return (linkedin_url or "").strip().lower()
+
+
+def shard_of(linkedin_url: str, shards: int) -> int:
+    """
+    Stable shard for a lead: the same username maps to the same shard on
+    every run and machine (unlike hash(), which is salted per process).
+    """
+    digest = hashlib.blake2b(shard_key(linkedin_url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def _read_leads(path: str) -> Iterator[Tuple[int, Dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            row_id, lead = json.loads(line)
+            yield row_id, lead
+
+
+def _run_shard(
+    factory: Callable[[int], BatchLeadRunner],
+    shard: int,
+    input_path: str,
+    output_path: str,
+    job_db: Optional[str],
+    job_id: Optional[str],
+) -> Dict:
+    runner = factory(shard)
+    job_store = JobStore(job_db) if job_id else None
+    try:
+        return runner.run(
+            _read_leads(input_path),
+            output_path,
+            job_store=job_store,
+            job_id=f"{job_id}.shard{shard}" if job_id else None,
+        )
+    finally:
+        if job_store:
+            job_store.close()
+        close = getattr(runner.extractor, "close", None)
+        if close:
+            close()
+        if runner.state_store is not None:
+            runner.state_store.close()
+
+
+class ShardedBatchRunner:
+    """
+    Runs a lead list across `processes` worker processes, each with its own
+    BatchLeadRunner (and so its own pooled extractor/scorer clients and
+    event loop), to get JSON parsing and feature building off one GIL.
+
+    Leads are partitioned by shard_of(), so a username always lands on the
+    same shard and the same per-shard cache. runner_factory(shard) builds a
+    worker's runner inside the worker process; it must be picklable (a
+    module-level function or functools.partial of one). Provider limits are
+    per process, so the factory should give each shard its share of them.
+
+    Each shard appends to its own JSONL file under work_dir; run() then
+    merges them into output_path ordered by row, one line per row (the
+    latest, if a resumed job appended a row twice), so the merged file is
+    identical however the shards interleaved.
+    """
+
+    def __init__(
+        self,
+        runner_factory: Callable[[int], BatchLeadRunner],
+        processes: int = 4,
+        work_dir: Optional[str] = None,
+    ):
+        if processes < 1:
+            raise ValueError("processes must be >= 1")
+        self.runner_factory = runner_factory
+        self.processes = processes
+        self.work_dir = work_dir
+
+    def shard_paths(self, work_dir: str, shard: int) -> Tuple[str, str]:
+        return (
+            os.path.join(work_dir, f"shard-{shard:03d}.input.jsonl"),
+            os.path.join(work_dir, f"shard-{shard:03d}.jsonl"),
+        )
+
+    def partition(self, leads: Iterable[Tuple[int, Dict]], work_dir: str) -> List[int]:
+        """Writes each shard's (row_id, lead) pairs to its input file. Returns rows per shard."""
+        os.makedirs(work_dir, exist_ok=True)
+        files = [open(self.shard_paths(work_dir, i)[0], "w", encoding="utf-8") for i in range(self.processes)]
+        counts = [0] * self.processes
+        try:
+            for row_id, lead in leads:
+                shard = shard_of(lead.get("linkedin_url", ""), self.processes)
+                files[shard].write(json.dumps([row_id, lead], ensure_ascii=False) + "\n")
+                counts[shard] += 1
+        finally:
+            for f in files:
+                f.close()
+        return counts
+
+    def run(
+        self,
+        leads: Iterable[Tuple[int, Dict]],
+        output_path: str,
+        progress: Optional[Callable[[Dict], None]] = None,
+        job_db: Optional[str] = None,
+        job_id: Optional[str] = None,
+        keep_work_dir: bool = False,
+    ) -> Dict:
+        """
+        Same contract as BatchLeadRunner.run(), except that output_path is
+        (re)written with the merged, row-ordered results ("-" for stdout).
+        With job_id, every shard checkpoints to job_db as "<job_id>.shard<N>"
+        and the shard files are kept so a re-run resumes each shard.
+        """
+        start = time.time()
+        work_dir = self.work_dir or (
+            f"{output_path}.shards" if output_path != "-" else f"batch-shards-{os.getpid()}"
+        )
+        keep_work_dir = keep_work_dir or bool(job_id)
+        counts = self.partition(leads, work_dir)
+        if not job_id:
+            # nothing to resume: leftovers of an interrupted run must not be merged in
+            for shard in range(self.processes):
+                shard_output = self.shard_paths(work_dir, shard)[1]
+                if os.path.exists(shard_output):
+                    os.remove(shard_output)
+
+        stats = {
+            "rows": 0, "ok": 0, "failed": 0, "pre_scored": 0, "carried": 0, "elapsed_s": 0.0, "rows_per_sec": 0.0,
+        }
+        # spawn: workers must not inherit the parent's event-loop and pool threads
+        ctx = multiprocessing.get_context("spawn")
+        offsets = [self._size(self.shard_paths(work_dir, i)[1]) for i in range(self.processes)]
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=ctx) as pool:
+            pending = set()
+            for shard in range(self.processes):
+                if not counts[shard]:
+                    continue
+                input_path, shard_output = self.shard_paths(work_dir, shard)
+                pending.add(pool.submit(
+                    _run_shard, self.runner_factory, shard, input_path, shard_output, job_db, job_id
+                ))
+
+            while pending:
+                done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                if progress:
+                    self._tail_stats(work_dir, offsets, stats, start)
+                    progress(dict(stats))
+
+        stats = self.merge(work_dir, output_path)
+        if not keep_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        stats["elapsed_s"] = round(time.time() - start, 3)
+        stats["rows_per_sec"] = round(stats["rows"] / max(stats["elapsed_s"], 1e-9), 3)
+        return stats
+
+    @staticmethod
+    def _size(path: str) -> int:
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _tail_stats(self, work_dir: str, offsets: List[int], stats: Dict, start: float):
+        """Adds lines appended to the shard outputs since the last call to the running stats."""
+        for shard in range(self.processes):
+            path = self.shard_paths(work_dir, shard)[1]
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                f.seek(offsets[shard])
+                data = f.read()
+            # only whole lines; a partial last line is picked up next time
+            end = data.rfind(b"\n") + 1
+            offsets[shard] += end
+            for line in data[:end].splitlines():
+                try:
+                    res = json.loads(line)
+                except ValueError:
+                    continue
+                stats["rows"] += 1
+                stats["ok" if res.get("status") == "ok" else "failed"] += 1
+                if res.get("source") == "rules":
+                    stats["pre_scored"] += 1
+                if res.get("carried_forward"):
+                    stats["carried"] += 1
+        stats["elapsed_s"] = round(time.time() - start, 3)
+        stats["rows_per_sec"] = round(stats["rows"] / max(stats["elapsed_s"], 1e-9), 3)
+
+    def _shard_results(self, path: str) -> List[Tuple[int, str]]:
+        # one shard's results fit in memory; keep the last line written per row
+        latest: Dict[int, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = int(json.loads(line)["row"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    latest[row] = line if line.endswith("\n") else line + "\n"
+        return sorted(latest.items())
+
+    def merge(self, work_dir: str, output_path: str) -> Dict:
+        """k-way merge of the shard outputs by row into output_path. Returns the row counts."""
+        shards = [self._shard_results(self.shard_paths(work_dir, i)[1]) for i in range(self.processes)]
+        stats = {"rows": 0, "ok": 0, "failed": 0, "pre_scored": 0, "carried": 0}
+        out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+        try:
+            for _, line in heapq.merge(*shards):
+                out.write(line)
+                res = json.loads(line)
+                stats["rows"] += 1
+                stats["ok" if res.get("status") == "ok" else "failed"] += 1
+                if res.get("source") == "rules":
+                    stats["pre_scored"] += 1
+                if res.get("carried_forward"):
+                    stats["carried"] += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return stats
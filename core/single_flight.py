@@ -0,0 +1,95 @@
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Thread-level request coalescing: while a call for `key` is running, other
+    callers with the same key wait for it and receive a copy of its result
+    (or its exception) instead of starting their own. The leader gets a copy
+    too, so no caller can change what the others see.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._counters = {"calls": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._counters["calls"] += 1
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+            else:
+                self._counters["shared"] += 1
+
+        if not leader:
+            return copy.deepcopy(fut.result())
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight, for use inside one event loop. If
+    the leading call is cancelled, waiting callers retry instead of failing.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._counters = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._counters["calls"] += 1
+        while True:
+            fut = self._calls.get(key)
+            if fut is None:
+                break
+            self._counters["shared"] += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(fut))
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # leader was cancelled, not us: try again (possibly as leader)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            fut.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+
+    def stats(self) -> Dict:
+        return dict(self._counters, in_flight=len(self._calls))
@@ -0,0 +1,323 @@
+"""
+End-to-end benchmark against local stand-ins (fake Apify + mock LLM, both
+started in-process), so numbers are reproducible and cost nothing.
+
+    python -m loadtest.benchmark --output bench.json
+    python -m loadtest.benchmark --quick --compare bench.json
+
+Measures throughput and p50/p95/p99 latency for:
+    build_payload, prompt_build, parse_stream        CPU-only, single thread
+    extract_profile                                  async, per concurrency level
+    pipeline (extract + build + score one lead)      threads, per concurrency level
+    batch_runner (BatchLeadRunner.run)               per concurrency level
+
+Results are written as JSON; --compare prints the throughput / p95 change
+against an earlier result file.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.async_apify_extractor import AsyncLinkedInAPIExtractor
+from core.batch_runner import BatchLeadRunner
+from core.feature_builder import FeatureBuilderLLM
+from core.groq_scorer import GroqLeadScorer, SINGLE_TEMPLATE, valid_verdict
+from core.json_stream import JsonObjectStream, iter_sse_data
+from core.lead_record import LeadRecord
+from core.llm_backends import make_backend
+from core.prompt_builder import PromptBuilder
+from core.rate_limiter import RateLimitScheduler
+from loadtest.fake_apify_server import FakeApifyServer, FakeApifyConfig, fake_posts, fake_profile
+from loadtest.mock_llm_server import MockLLMServer, MockConfig, mock_answer
+
+DEFAULT_LEVELS = (1, 4, 16, 64, 256)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least pct% of the values at or below it."""
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[k]
+
+
+def summarize(name: str, latencies_s: List[float], elapsed_s: float, concurrency: int = 1, errors: int = 0) -> Dict:
+    lat = sorted(x * 1000 for x in latencies_s)
+    ops = len(lat)
+    return {
+        "name": name,
+        "concurrency": concurrency,
+        "ops": ops,
+        "errors": errors,
+        "elapsed_s": round(elapsed_s, 4),
+        "throughput_per_s": round(ops / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(lat, 50), 4),
+            "p95": round(percentile(lat, 95), 4),
+            "p99": round(percentile(lat, 99), 4),
+            "mean": round(sum(lat) / ops, 4) if ops else 0.0,
+            "max": round(lat[-1], 4) if lat else 0.0,
+        },
+    }
+
+
+def make_scheduler() -> RateLimitScheduler:
+    # no client-side throttling: the stand-ins are what is being measured
+    s = RateLimitScheduler()
+    s.register("apify", requests_per_sec=100_000, burst=100_000, backoff_base=0.05, backoff_cap=1.0)
+    s.register("apify_runs", requests_per_sec=100_000, burst=100_000, max_concurrency=4096)
+    s.register("llm", requests_per_sec=100_000, burst=100_000, backoff_base=0.05, backoff_cap=1.0)
+    return s
+
+
+# ---------- CPU stages ----------
+
+def bench_cpu(name: str, fn: Callable[[int], object], iterations: int) -> Dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t)
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def sse_lines(content: str, chunk_chars: int = 16) -> List[bytes]:
+    """`content` as the mock server streams it: one `data:` line per chunk, then [DONE]."""
+    lines = []
+    for i in range(0, len(content), chunk_chars):
+        event = {"choices": [{"index": 0, "delta": {"content": content[i:i + chunk_chars]}}]}
+        lines.append(b"data: " + json.dumps(event).encode())
+    lines.append(b"data: [DONE]")
+    return lines
+
+
+def parse_stream(lines: List[bytes], accept: Callable[[Dict], bool], want: int = 1) -> List[Dict]:
+    """The streaming path of complete_json: SSE events -> deltas -> JsonObjectStream, stopping early."""
+    parser = JsonObjectStream()
+    found = []
+    for line in lines:
+        for event in iter_sse_data([line]):
+            for choice in event.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content") or ""
+                found.extend(obj for obj in parser.feed(delta) if accept(obj))
+        if len(found) >= want:
+            break
+    return found
+
+
+def cpu_benchmarks(iterations: int) -> List[Dict]:
+    usernames = [f"bench-user-{i}" for i in range(256)]
+    records = [
+        LeadRecord.from_apify(fake_profile(u), posts=fake_posts(u, 3), username=u, activity_days=5) for u in usernames
+    ]
+    company = {"company_name": "Acme", "company_size": "1,001-5,000", "annual_revenue": "$120M", "industry": "SaaS"}
+    builder = FeatureBuilderLLM()
+    payloads = [builder.build_payload(r, company) for r in records]
+    prompts = PromptBuilder(SINGLE_TEMPLATE)
+    answers = [mock_answer(prompts.build(p)[0]) for p in payloads]
+    streams = [sse_lines(a) for a in answers]
+    batch_ids = {str(i) for i in range(10)}
+    batch_stream = sse_lines(json.dumps([dict(json.loads(answers[i]), id=str(i)) for i in range(10)]))
+
+    # the scorer's acceptance rules: a verdict without a score is not done yet
+    def verdict(obj: Dict) -> bool:
+        return valid_verdict(obj, require_score=True)
+
+    def batch_verdict(obj: Dict) -> bool:
+        return str(obj.get("id", "")) in batch_ids and verdict(obj)
+
+    n = len(records)
+    return [
+        bench_cpu("build_payload", lambda i: builder.build_payload(records[i % n], company), iterations),
+        bench_cpu("prompt_build", lambda i: prompts.build(payloads[i % n]), iterations),
+        bench_cpu("parse_stream", lambda i: parse_stream(streams[i % n], verdict), iterations),
+        bench_cpu(
+            "parse_batch_stream", lambda i: parse_stream(batch_stream, batch_verdict, len(batch_ids)), iterations
+        ),
+    ]
+
+
+# ---------- I/O stages ----------
+
+async def _extract_level(base_url: str, concurrency: int, ops: int, tag: str) -> Dict:
+    extractor = AsyncLinkedInAPIExtractor(
+        "bench", base_url=base_url, scheduler=make_scheduler(), max_connections=max(concurrency, 10)
+    )
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            t = time.perf_counter()
+            # posts=[] skips the posts actor so only the profile run is timed
+            profile = await extractor.extract_profile(f"https://www.linkedin.com/in/{tag}-{i}", posts=[])
+            latencies.append(time.perf_counter() - t)
+            if not profile:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(ops)))
+    elapsed = time.perf_counter() - start
+    await extractor.aclose()
+    return summarize("extract_profile", latencies, elapsed, concurrency, errors)
+
+
+def pipeline_level(apify_url: str, llm_url: str, concurrency: int, ops: int, tag: str) -> Dict:
+    scheduler = make_scheduler()
+    extractor = LinkedInAPIExtractor("bench", base_url=apify_url, scheduler=scheduler, max_connections=max(concurrency, 10))
+    scorer = GroqLeadScorer(backend=make_backend(base_url=llm_url, scheduler=scheduler), scheduler=scheduler)
+    runner = BatchLeadRunner(extractor, scorer, concurrency=concurrency)
+    latencies, errors = [], 0
+
+    def one(i: int):
+        t = time.perf_counter()
+        res = runner.score_lead(i, {"linkedin_url": f"https://www.linkedin.com/in/{tag}-{i}"})
+        return time.perf_counter() - t, res["status"] == "ok"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(one, range(ops)):
+            latencies.append(latency)
+            errors += 0 if ok else 1
+    elapsed = time.perf_counter() - start
+    extractor.close()
+    return summarize("pipeline", latencies, elapsed, concurrency, errors)
+
+
+def batch_runner_level(apify_url: str, llm_url: str, concurrency: int, ops: int, tag: str) -> Dict:
+    """Latency here is time from start until each lead's result is yielded."""
+    scheduler = make_scheduler()
+    extractor = LinkedInAPIExtractor("bench", base_url=apify_url, scheduler=scheduler, max_connections=max(concurrency, 10))
+    scorer = GroqLeadScorer(backend=make_backend(base_url=llm_url, scheduler=scheduler), scheduler=scheduler)
+    runner = BatchLeadRunner(extractor, scorer, concurrency=concurrency)
+    leads = ((i, {"linkedin_url": f"https://www.linkedin.com/in/{tag}-{i}"}) for i in range(ops))
+
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for res in runner.stream(leads):
+        latencies.append(time.perf_counter() - start)
+        errors += 0 if res["status"] == "ok" else 1
+    elapsed = time.perf_counter() - start
+    extractor.close()
+    return summarize("batch_runner", latencies, elapsed, concurrency, errors)
+
+
+# ---------- driver ----------
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(current: Dict, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["name"], r["concurrency"]): r for r in baseline.get("results", [])}
+    print(f"{'benchmark':<24}{'conc':>6}{'thrpt/s':>12}{'Δ':>9}{'p95 ms':>12}{'Δ':>9}", file=sys.stderr)
+    for r in current["results"]:
+        old = before.get((r["name"], r["concurrency"]))
+        d_tp = d_p95 = ""
+        if old and old["throughput_per_s"]:
+            d_tp = f"{(r['throughput_per_s'] / old['throughput_per_s'] - 1) * 100:+.1f}%"
+        if old and old["latency_ms"]["p95"]:
+            d_p95 = f"{(r['latency_ms']['p95'] / old['latency_ms']['p95'] - 1) * 100:+.1f}%"
+        print(
+            f"{r['name']:<24}{r['concurrency']:>6}{r['throughput_per_s']:>12.1f}{d_tp:>9}"
+            f"{r['latency_ms']['p95']:>12.2f}{d_p95:>9}",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark extraction, feature building and scoring offline.")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--ops-per-level", type=int, default=0,
+                        help="operations per level (default: max(32, 4 x concurrency))")
+    parser.add_argument("--cpu-iterations", type=int, default=20_000)
+    parser.add_argument("--stages", default="cpu,extract,pipeline,batch",
+                        help="subset of cpu,extract,pipeline,batch")
+    parser.add_argument("--run-seconds", type=float, default=0.2, help="fake Apify actor run duration")
+    parser.add_argument("--apify-latency-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--quick", action="store_true", help="levels 1,16 and few iterations, for CI")
+    parser.add_argument("--output", "-o", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="print changes against an earlier result file")
+    args = parser.parse_args(argv)
+
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    cpu_iterations = args.cpu_iterations
+    if args.quick:
+        levels, cpu_iterations = [1, 16], min(cpu_iterations, 2000)
+    stages = set(args.stages.split(","))
+
+    apify = FakeApifyServer(config=FakeApifyConfig(
+        latency_ms=args.apify_latency_ms, run_seconds=args.run_seconds, run_jitter=args.run_seconds / 4,
+        max_concurrent_runs=100_000, seed=1,
+    )).start()
+    llm = MockLLMServer(config=MockConfig(
+        latency_ms=args.llm_latency_ms, jitter_ms=args.llm_latency_ms / 4,
+        error_rate=args.llm_error_rate, throttle_rate=args.llm_throttle_rate, retry_after=0.05, seed=1,
+    )).start()
+
+    results = []
+    try:
+        if "cpu" in stages:
+            results.extend(cpu_benchmarks(cpu_iterations))
+        for c in levels:
+            ops = args.ops_per_level or max(32, 4 * c)
+            if "extract" in stages:
+                results.append(asyncio.run(_extract_level(apify.url, c, ops, f"ex{c}")))
+            if "pipeline" in stages:
+                results.append(pipeline_level(apify.url, llm.url, c, ops, f"pl{c}"))
+            if "batch" in stages:
+                results.append(batch_runner_level(apify.url, llm.url, c, ops, f"br{c}"))
+            print(f"level {c} done", file=sys.stderr)
+    finally:
+        apify.stop()
+        llm.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "levels": levels,
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,357 @@
+"""
+Local stand-in for the parts of the Apify API the extractor uses, with
+synthetic run durations and request latency, for reproducible extraction
+benchmarks and polling tests without paying for actor runs.
+
+    python -m loadtest.fake_apify_server --port 8090 --run-seconds 3
+    python batch_score.py leads.csv out.jsonl --apify-base-url http://127.0.0.1:8090/v2
+
+Serves:
+    GET  /v2/users/me/limits
+    POST /v2/acts/{actor}/runs                        start a run (201)
+    GET  /v2/acts/{actor}/runs?desc=1&limit=N          recent runs of an actor
+    GET  /v2/actor-runs/{id}[?waitForFinish=S]         run status, long-polled
+    GET  /v2/datasets/{id}/items                       run output
+    POST /v2/acts/{actor}/run-sync-get-dataset-items   posts actor, synchronous
+    GET  /v2/stats                                     request counters
+
+Profiles and posts are derived from the username, so every run returns the
+same data for the same lead.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List
+from urllib.parse import urlsplit, parse_qs
+
+ROLES = ("Intern", "Software Engineer", "Marketing Manager", "Director of Sales", "VP Engineering", "CEO")
+COMPANIES = ("Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries")
+
+
+@dataclass
+class FakeApifyConfig:
+    latency_ms: float = 30.0  # added to every API request
+    run_seconds: float = 3.0  # mean actor run duration
+    run_jitter: float = 1.0  # +/- uniform jitter on run duration
+    fail_rate: float = 0.0  # fraction of runs that end FAILED
+    missing_rate: float = 0.0  # fraction of profiles whose dataset is empty
+    throttle_rate: float = 0.0  # fraction of requests answered with 429
+    max_concurrent_runs: int = 25  # reported limit; more running runs get 402
+    posts_per_user: int = 3
+    seed: Optional[int] = None
+
+
+def _digest(username: str) -> bytes:
+    return hashlib.sha256(username.lower().encode("utf-8")).digest()
+
+
+def fake_profile(username: str) -> Dict:
+    d = _digest(username)
+    return {
+        "basic_info": {
+            "fullname": f"{username.replace('-', ' ').title()}",
+            "headline": f"{ROLES[d[0] % len(ROLES)]} at {COMPANIES[d[1] % len(COMPANIES)]}",
+            "public_identifier": username,
+            "location": {"full": "Berlin, Germany"},
+        },
+        "experience": [
+            {"title": ROLES[d[0] % len(ROLES)], "company": COMPANIES[d[1] % len(COMPANIES)], "is_current": True},
+        ],
+    }
+
+
+def fake_posts(username: str, count: int, now: Optional[float] = None) -> List[Dict]:
+    d = _digest(username)
+    now = now or time.time()
+    posts = []
+    for i in range(count):
+        age_days = d[(i + 2) % len(d)] % 90
+        posts.append(
+            {
+                "text": f"Post {i} by {username}: thoughts on scaling go-to-market. " * (1 + d[i % len(d)] % 4),
+                "posted_at": {"timestamp": int((now - age_days * 86400) * 1000)},
+                "url": f"https://www.linkedin.com/posts/{username}_{i}",
+                "author": {"username": username, "profile_url": f"https://www.linkedin.com/in/{username}"},
+            }
+        )
+    return posts
+
+
+class _Server(ThreadingHTTPServer):
+    # listen() runs inside __init__, so the backlog has to be set on the class;
+    # with the default of 5, bursts of new connections wait out a 1s SYN retry
+    request_queue_size = 1024
+
+
+class FakeApifyServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeApifyConfig] = None):
+        self.config = config or FakeApifyConfig()
+        self.random = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.runs: Dict[str, Dict] = {}
+        self.runs_by_actor: Dict[str, List[str]] = {}
+        self.datasets: Dict[str, List[Dict]] = {}
+        self.counters = {
+            "requests": 0, "runs_started": 0, "status_requests": 0, "list_requests": 0,
+            "dataset_requests": 0, "sync_runs": 0, "throttled": 0, "refused": 0,
+        }
+        self.httpd = _Server((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def start(self) -> "FakeApifyServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-apify", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counters, runs=len(self.runs), config=asdict(self.config))
+
+    # ---------- model ----------
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _duration(self) -> float:
+        cfg = self.config
+        with self.lock:
+            return max(0.0, cfg.run_seconds + self.random.uniform(-cfg.run_jitter, cfg.run_jitter))
+
+    def _roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+    def _status(self, run: Dict) -> str:
+        if time.time() < run["finish_at"]:
+            return "RUNNING"
+        return run["final_status"]
+
+    def _running(self) -> int:
+        now = time.time()
+        return sum(1 for r in self.runs.values() if r["finish_at"] > now)
+
+    def start_run(self, actor: str, body: Dict) -> Optional[Dict]:
+        username = str(body.get("username") or "")
+        duration = self._duration()
+        failed = self._roll(self.config.fail_rate)
+        missing = self._roll(self.config.missing_rate)
+        with self.lock:
+            if self._running() >= self.config.max_concurrent_runs:
+                self.counters["refused"] += 1
+                return None
+            n = next(self.ids)
+            run_id, dataset_id = f"run{n:08d}", f"ds{n:08d}"
+            run = {
+                "id": run_id,
+                "actId": actor,
+                "defaultDatasetId": dataset_id,
+                "startedAt": time.time(),
+                "finish_at": time.time() + duration,
+                "final_status": "FAILED" if failed else "SUCCEEDED",
+            }
+            self.runs[run_id] = run
+            self.runs_by_actor.setdefault(actor, []).append(run_id)
+            self.datasets[dataset_id] = [] if failed or missing or not username else [fake_profile(username)]
+            self.counters["runs_started"] += 1
+        return self._run_view(run)
+
+    def _run_view(self, run: Dict) -> Dict:
+        status = self._status(run)
+        view = {
+            "id": run["id"],
+            "actId": run["actId"],
+            "status": status,
+            "defaultDatasetId": run["defaultDatasetId"],
+        }
+        if status != "RUNNING":
+            # roughly a 1 GB actor: 1 CU per hour, $0.25 per CU
+            units = (run["finish_at"] - run["startedAt"]) / 3600
+            view["stats"] = {"computeUnits": round(units, 6)}
+            view["usageTotalUsd"] = round(units * 0.25, 6)
+        return view
+
+    def wait_run(self, run_id: str, wait: float) -> Optional[Dict]:
+        with self.lock:
+            run = self.runs.get(run_id)
+        if run is None:
+            return None
+        if wait > 0:
+            time.sleep(max(0.0, min(wait, run["finish_at"] - time.time())))
+        return self._run_view(run)
+
+    def list_runs(self, actor: str, limit: int, desc: bool) -> List[Dict]:
+        with self.lock:
+            ids = list(self.runs_by_actor.get(actor, []))
+            runs = [self.runs[i] for i in (reversed(ids) if desc else ids)][:limit]
+        return [self._run_view(r) for r in runs]
+
+    def run_sync_posts(self, body: Dict) -> List[Dict]:
+        usernames = [str(u) for u in body.get("usernames") or []]
+        time.sleep(self._duration())
+        items = []
+        for u in usernames:
+            items.extend(fake_posts(u.split("/in/")[-1].strip("/"), self.config.posts_per_user))
+        return items
+
+    # ---------- http ----------
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send(self, status: int, body, headers: Optional[Dict] = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _error(self, status: int, kind: str, message: str, headers: Optional[Dict] = None):
+                self._send(status, {"error": {"type": kind, "message": message}}, headers)
+
+            def _begin(self):
+                """Common latency / throttling; returns (path parts, query) or None if answered."""
+                server._count("requests")
+                time.sleep(server.config.latency_ms / 1000)
+                if server._roll(server.config.throttle_rate):
+                    server._count("throttled")
+                    self._error(429, "rate-limit-exceeded", "Too many requests", {"Retry-After": "1"})
+                    return None
+                url = urlsplit(self.path)
+                parts = [p for p in url.path.split("/") if p]
+                if parts and parts[0] == "v2":
+                    parts = parts[1:]
+                return parts, parse_qs(url.query)
+
+            def _body(self) -> Dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    value = json.loads(raw or b"{}")
+                except ValueError:
+                    return {}
+                return value if isinstance(value, dict) else {}
+
+            def do_GET(self):
+                begun = self._begin()
+                if begun is None:
+                    return
+                parts, query = begun
+
+                if parts == ["stats"]:
+                    self._send(200, server.stats())
+                elif parts == ["users", "me", "limits"]:
+                    limits = {"maxConcurrentActorJobs": server.config.max_concurrent_runs}
+                    self._send(200, {"data": {"limits": limits}})
+                elif len(parts) == 2 and parts[0] == "actor-runs":
+                    server._count("status_requests")
+                    wait = min(60.0, float((query.get("waitForFinish") or ["0"])[0] or 0))
+                    run = server.wait_run(parts[1], wait)
+                    if run is None:
+                        self._error(404, "record-not-found", "Actor run was not found")
+                    else:
+                        self._send(200, {"data": run})
+                elif len(parts) == 3 and parts[0] == "acts" and parts[2] == "runs":
+                    server._count("list_requests")
+                    limit = int((query.get("limit") or ["1000"])[0])
+                    desc = (query.get("desc") or ["0"])[0] in ("1", "true")
+                    items = server.list_runs(parts[1], min(limit, 1000), desc)
+                    self._send(200, {"data": {"total": len(items), "items": items}})
+                elif len(parts) == 3 and parts[0] == "datasets" and parts[2] == "items":
+                    server._count("dataset_requests")
+                    with server.lock:
+                        items = server.datasets.get(parts[1])
+                    if items is None:
+                        self._error(404, "record-not-found", "Dataset was not found")
+                    else:
+                        self._send(200, items)
+                else:
+                    self._error(404, "page-not-found", "Not found")
+
+            def do_POST(self):
+                body = self._body()
+                begun = self._begin()
+                if begun is None:
+                    return
+                parts, _ = begun
+
+                if len(parts) == 3 and parts[0] == "acts" and parts[2] == "runs":
+                    run = server.start_run(parts[1], body)
+                    if run is None:
+                        self._error(402, "actor-memory-limit-exceeded", "Too many concurrent actor runs")
+                    else:
+                        self._send(201, {"data": run})
+                elif len(parts) == 3 and parts[0] == "acts" and parts[2] == "run-sync-get-dataset-items":
+                    server._count("sync_runs")
+                    self._send(201, server.run_sync_posts(body))
+                else:
+                    self._error(404, "page-not-found", "Not found")
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fake Apify API for offline extraction benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--run-seconds", type=float, default=3.0)
+    parser.add_argument("--run-jitter", type=float, default=1.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--missing-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrent-runs", type=int, default=25)
+    parser.add_argument("--posts-per-user", type=int, default=3)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = FakeApifyConfig(
+        latency_ms=args.latency_ms,
+        run_seconds=args.run_seconds,
+        run_jitter=args.run_jitter,
+        fail_rate=args.fail_rate,
+        missing_rate=args.missing_rate,
+        throttle_rate=args.throttle_rate,
+        max_concurrent_runs=args.max_concurrent_runs,
+        posts_per_user=args.posts_per_user,
+        seed=args.seed,
+    )
+    server = FakeApifyServer(args.host, args.port, config)
+    print(f"Fake Apify listening on {server.url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
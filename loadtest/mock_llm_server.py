@@ -0,0 +1,353 @@
+"""
+Local stand-in for an OpenAI-compatible /chat/completions endpoint (Groq),
+for exercising the scoring pipeline offline: throughput, retries, 429
+handling and concurrency, without tokens or network.
+
+    python -m loadtest.mock_llm_server --port 8089 --latency-ms 300 --throttle-rate 0.05
+    python batch_score.py leads.csv out.jsonl --llm-base-url http://127.0.0.1:8089/v1
+
+Answers are deterministic per prospect (hash of its JSON), so repeated runs
+produce the same priorities. "stream": true is answered with SSE chunks in
+the OpenAI format; --chatter-tokens appends prose after the JSON (as chatty
+models do) unless the request asks for a json_object response_format.
+GET /stats returns request counters.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List
+
+PRIORITIES = ("HOT", "WARM", "COOL", "COLD")
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    ms_per_token: float = 0.0  # extra latency per estimated completion token
+    error_rate: float = 0.0  # fraction of requests answered with 500
+    throttle_rate: float = 0.0  # fraction answered with a random 429
+    retry_after: float = 1.0  # Retry-After on random 429s; 0 omits the header
+    rpm: Optional[int] = None  # server-side requests/minute limit
+    tpm: Optional[int] = None  # server-side tokens/minute limit
+    chatter_tokens: int = 0  # filler after the JSON answer, unless JSON mode is requested
+    stream_chunk_chars: int = 16  # content characters per SSE chunk
+    seed: Optional[int] = None
+
+
+class _Window:
+    """Fixed one-minute window counter, like Groq's x-ratelimit-* headers."""
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.start = time.monotonic()
+        self.used = 0
+
+    def take(self, amount: int) -> bool:
+        if not self.limit:
+            return True
+        now = time.monotonic()
+        if now - self.start >= 60:
+            self.start, self.used = now, 0
+        if self.used + amount > self.limit:
+            return False
+        self.used += amount
+        return True
+
+    def remaining(self) -> int:
+        return max(0, (self.limit or 0) - self.used)
+
+    def reset_in(self) -> float:
+        return max(0.0, 60 - (time.monotonic() - self.start))
+
+
+def _verdict(prospect) -> Dict:
+    digest = hashlib.sha256(json.dumps(prospect, sort_keys=True).encode("utf-8")).digest()
+    return {
+        "priority": PRIORITIES[digest[0] % 4],
+        "score": digest[1] % 101,
+        "confidence": 50 + digest[2] % 51,
+        "reasons": ["Mock verdict derived from the prospect payload", f"bucket {digest[3] % 10}"],
+    }
+
+
+def _payload_objects(prompt: str) -> List[Dict]:
+    # prompts embed the payload as one line of compact JSON
+    found = []
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line.startswith("{") and line.endswith("}"):
+            try:
+                value = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                found.append(value)
+    return found
+
+
+def mock_answer(prompt: str) -> str:
+    objects = _payload_objects(prompt)
+    if "JSON array" in prompt and objects:
+        return json.dumps([dict(_verdict(p), id=str(pid)) for pid, p in objects[0].items()])
+    return json.dumps(_verdict(objects[0] if objects else prompt))
+
+
+class _Server(ThreadingHTTPServer):
+    # listen() runs inside __init__, so the backlog has to be set on the class;
+    # with the default of 5, bursts of new connections wait out a 1s SYN retry
+    request_queue_size = 1024
+
+
+class MockLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[MockConfig] = None):
+        self.config = config or MockConfig()
+        self.random = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.requests = _Window(self.config.rpm)
+        self.tokens = _Window(self.config.tpm)
+        self.counters = {
+            "requests": 0, "ok": 0, "errors": 0, "throttled": 0, "prompt_tokens": 0,
+            "streamed": 0, "stream_disconnects": 0,
+        }
+        self.httpd = _Server((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counters, config=asdict(self.config))
+
+    def _decide(self, prompt_tokens: int):
+        """Returns (status, headers) for a request before any latency."""
+        cfg = self.config
+        with self.lock:
+            self.counters["requests"] += 1
+            roll = self.random.random()
+            if roll < cfg.error_rate:
+                self.counters["errors"] += 1
+                return 500, {}
+            if roll < cfg.error_rate + cfg.throttle_rate:
+                self.counters["throttled"] += 1
+                return 429, {"retry-after": f"{cfg.retry_after:g}"} if cfg.retry_after else {}
+            window = None
+            if not self.requests.take(1):
+                window = self.requests
+            elif not self.tokens.take(prompt_tokens):
+                self.requests.used -= 1
+                window = self.tokens
+            if window is not None:
+                self.counters["throttled"] += 1
+                return 429, {"retry-after": f"{window.reset_in():.2f}"}
+            self.counters["ok"] += 1
+            self.counters["prompt_tokens"] += prompt_tokens
+
+            headers = {}
+            if cfg.rpm:
+                headers["x-ratelimit-limit-requests"] = str(cfg.rpm)
+                headers["x-ratelimit-remaining-requests"] = str(self.requests.remaining())
+                headers["x-ratelimit-reset-requests"] = f"{self.requests.reset_in():.2f}s"
+            if cfg.tpm:
+                headers["x-ratelimit-limit-tokens"] = str(cfg.tpm)
+                headers["x-ratelimit-remaining-tokens"] = str(self.tokens.remaining())
+                headers["x-ratelimit-reset-tokens"] = f"{self.tokens.reset_in():.2f}s"
+            return 200, headers
+
+    def _latency(self, completion_tokens: int) -> float:
+        cfg = self.config
+        with self.lock:
+            jitter = self.random.uniform(-cfg.jitter_ms, cfg.jitter_ms)
+        return max(0.0, cfg.latency_ms + jitter + cfg.ms_per_token * completion_tokens) / 1000
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send(self, status: int, body: Dict, headers: Optional[Dict] = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/stats"):
+                    self._send(200, server.stats())
+                elif self.path.rstrip("/").endswith(("/health", "/models")):
+                    self._send(200, {"ok": True, "data": [{"id": "mock"}]})
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                    messages = body.get("messages") or []
+                    prompt = "\n".join(str(m.get("content", "")) for m in messages if isinstance(m, dict))
+                except (ValueError, AttributeError):
+                    self._send(400, {"error": {"message": "invalid JSON body"}})
+                    return
+
+                prompt_tokens = len(prompt) // 4
+                status, headers = server._decide(prompt_tokens)
+                if status != 200:
+                    time.sleep(server._latency(0) / 4)
+                    message = "rate limit exceeded" if status == 429 else "mock server error"
+                    self._send(status, {"error": {"message": message, "type": str(status)}}, headers)
+                    return
+
+                content = mock_answer(prompt)
+                json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+                if server.config.chatter_tokens and not json_mode:
+                    content += "\n\nRationale: " + "the prospect profile was reviewed carefully. " * (
+                        server.config.chatter_tokens // 8 + 1
+                    )
+                completion_tokens = len(content) // 4
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+                if body.get("stream"):
+                    self._stream(body, content, usage, headers)
+                    return
+
+                time.sleep(server._latency(completion_tokens))
+                self._send(
+                    200,
+                    {
+                        "id": f"mock-{time.time_ns()}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model", "mock"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": content},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": usage,
+                    },
+                    headers,
+                )
+
+            def _stream(self, body: Dict, content: str, usage: Dict, headers: Dict):
+                """Time to first token is the base latency; ms_per_token paces the rest."""
+                server._count("streamed")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+
+                base = {"id": f"mock-{time.time_ns()}", "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": body.get("model", "mock")}
+                size = max(1, server.config.stream_chunk_chars)
+                pieces = [content[i:i + size] for i in range(0, len(content), size)]
+                try:
+                    time.sleep(server._latency(0))
+                    for piece in pieces:
+                        if server.config.ms_per_token:
+                            time.sleep(server.config.ms_per_token * len(piece) / 4 / 1000)
+                        delta = {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                        self._event(dict(base, choices=[delta]))
+                    # final chunk carries usage, like Groq's x_groq.usage / OpenAI include_usage
+                    self._event(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=usage))
+                    self._chunk(b"data: [DONE]\n\n")
+                    self._chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    # client stopped reading once it had what it needed
+                    server._count("stream_disconnects")
+                    self.close_connection = True
+
+            def _event(self, event: Dict):
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that return 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests that return 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on random 429s (0 = none)")
+    parser.add_argument("--rpm", type=int, help="server-side requests/minute limit")
+    parser.add_argument("--tpm", type=int, help="server-side tokens/minute limit")
+    parser.add_argument("--chatter-tokens", type=int, default=0,
+                        help="prose tokens appended after the JSON answer unless JSON mode is requested")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="content characters per SSE chunk")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        ms_per_token=args.ms_per_token,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        chatter_tokens=args.chatter_tokens,
+        stream_chunk_chars=args.stream_chunk_chars,
+        seed=args.seed,
+    )
+    server = MockLLMServer(args.host, args.port, config)
+    print(f"Mock LLM listening on {server.url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.groq_scorer import GroqLeadScorer
+from core.llm_backends import make_backend
+from core.pre_scorer import RulePreScorer
+from core.profile_cache import ProfileCache
+from core.rate_limiter import get_default_scheduler
+from core.score_queue import ScoreQueue
+from core.score_cache import ScoreCache
+from core.scoring_service import ScoringService, ScoringWorkerPool
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Scoring service: HTTP job API over a persistent queue and a worker pool. "
+                    "Point the app at it with the SCORING_SERVICE_URL secret."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--workers", type=int, default=8, help="jobs run at once across all tenants")
+    parser.add_argument("--queue-db", default="score_queue.sqlite3", help="SQLite job queue path")
+    parser.add_argument("--max-queued-per-tenant", type=int, default=500,
+                        help="further submissions from a tenant get 429 while this many are waiting")
+    parser.add_argument("--lease", type=float, default=300,
+                        help="seconds before a job held by a dead worker is handed out again")
+    parser.add_argument("--groq-rpm", type=float, default=30,
+                        help="Groq requests/minute (raise for paid tiers)")
+    parser.add_argument("--groq-tpm", type=float, default=6000,
+                        help="Groq tokens/minute until the API reports its own limit")
+    parser.add_argument("--apify-base-url", default="https://api.apify.com/v2")
+    parser.add_argument("--llm-base-url", help="score against this OpenAI-compatible server instead of Groq")
+    parser.add_argument("--llm-model", help="model name sent to the LLM backend")
+    parser.add_argument("--llm-rps", type=float, default=1000,
+                        help="with --llm-base-url: client-side requests/sec ceiling")
+    parser.add_argument("--cache", default="lead_cache.sqlite3", help="SQLite profile/posts cache path")
+    parser.add_argument("--freshness-probe", action="store_true",
+                        help="re-use a stale cached profile while the lead's newest post is unchanged")
+    parser.add_argument("--profile-max-age-days", type=float, default=90,
+                        help="with --freshness-probe: always re-run the profile actor past this age")
+    parser.add_argument("--no-pre-score", action="store_true", help="send every lead to the LLM")
+    args = parser.parse_args(argv)
+
+    apify_key = os.environ.get("APIFY_API_KEY", "")
+    groq_key = os.environ.get("GROQ_API_KEY", "")
+    if not apify_key or not (groq_key or args.llm_base_url):
+        print("Missing API keys. Set APIFY_API_KEY and GROQ_API_KEY.", file=sys.stderr)
+        return 2
+
+    scheduler = get_default_scheduler()
+    scheduler.register(
+        "groq", requests_per_sec=args.groq_rpm / 60, burst=args.groq_rpm, tokens_per_min=args.groq_tpm
+    )
+    if args.llm_base_url:
+        scheduler.register("llm", requests_per_sec=args.llm_rps, burst=args.llm_rps)
+    backend = make_backend(groq_key, base_url=args.llm_base_url, model=args.llm_model, scheduler=scheduler)
+
+    queue = ScoreQueue(args.queue_db)
+    pool = ScoringWorkerPool(
+        queue,
+        LinkedInAPIExtractor(
+            apify_key,
+            cache=ProfileCache(args.cache, profile_max_age=int(args.profile_max_age_days * 86400)),
+            base_url=args.apify_base_url,
+            freshness_probe=args.freshness_probe,
+        ),
+        GroqLeadScorer(
+            groq_key,
+            cache=ScoreCache(),
+            pre_scorer=RulePreScorer(enabled=not args.no_pre_score),
+            backend=backend,
+        ),
+        workers=args.workers,
+        lease_s=args.lease,
+    )
+    service = ScoringService(
+        queue, pool, host=args.host, port=args.port, max_queued_per_tenant=args.max_queued_per_tenant,
+        scheduler=scheduler,
+    )
+    print(f"Scoring service listening on {service.url} with {args.workers} workers", file=sys.stderr, flush=True)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
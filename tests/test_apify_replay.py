@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from core.apify_replay import RecordingTransport, ReplayTransport, request_key
+from core.async_apify_extractor import AsyncLinkedInAPIExtractor
+from core.rate_limiter import RateLimitScheduler
+from loadtest.fake_apify_server import FakeApifyConfig, FakeApifyServer
+
+
+def scheduler():
+    s = RateLimitScheduler()
+    s.register("apify", requests_per_sec=1000, burst=1000)
+    s.register("apify_runs", requests_per_sec=1000, burst=1000, max_concurrency=25)
+    return s
+
+
+def fixture(path, entries):
+    path.write_text(json.dumps({"version": 1, "entries": entries}))
+    return str(path)
+
+
+def run_status(status):
+    return {"status": 200, "headers": {}, "body": json.dumps({"data": {"id": "r1", "status": status}}), "elapsed_s": 1.0}
+
+
+def test_request_key_ignores_volatile_params_and_hashes_the_body():
+    base = "https://api.apify.com/v2/actor-runs/r1"
+    first = httpx.Request("GET", base, params={"token": "a", "waitForFinish": 60, "desc": 1})
+    second = httpx.Request("GET", base, params={"desc": 1, "waitForFinish": 5, "token": "b"})
+    assert request_key(first) == request_key(second) == "GET /v2/actor-runs/r1?desc=1"
+
+    post = lambda body: httpx.Request("POST", "https://api.apify.com/v2/acts/x/runs", json=body)
+    assert request_key(post({"username": "ada"})).startswith("POST /v2/acts/x/runs #")
+    assert request_key(post({"username": "ada"})) == request_key(post({"username": "ada"}))
+    assert request_key(post({"username": "ada"})) != request_key(post({"username": "grace"}))
+
+
+def test_repeated_polls_replay_in_order_then_repeat_the_last(tmp_path):
+    key = "GET /v2/actor-runs/r1"
+    replay = ReplayTransport(
+        fixture(tmp_path / "f.json", {key: [run_status("READY"), run_status("RUNNING"), run_status("SUCCEEDED")]}),
+        latency=0,
+    )
+
+    async def go():
+        async with httpx.AsyncClient(transport=replay) as client:
+            statuses = []
+            for _ in range(4):
+                resp = await client.get("https://api.apify.com/v2/actor-runs/r1", params={"waitForFinish": 60})
+                statuses.append(resp.json()["data"]["status"])
+            missing = await client.get("https://api.apify.com/v2/actor-runs/r2")
+            return statuses, missing
+
+    statuses, missing = asyncio.run(go())
+    assert statuses == ["READY", "RUNNING", "SUCCEEDED", "SUCCEEDED"]
+    assert missing.status_code == 404
+    assert replay.stats == {"hits": 4, "misses": 1}
+
+
+def test_recording_keeps_same_key_responses_in_call_order(tmp_path):
+    statuses = iter(["RUNNING", "SUCCEEDED"])
+
+    def handler(request):
+        return httpx.Response(200, json={"data": {"status": next(statuses)}}, headers={"x-dropped": "1"})
+
+    path = tmp_path / "rec.json"
+    recorder = RecordingTransport(str(path), httpx.MockTransport(handler))
+
+    async def go():
+        async with httpx.AsyncClient(transport=recorder) as client:
+            for wait in (60, 30):
+                await client.get("https://api.apify.com/v2/actor-runs/r1", params={"waitForFinish": wait})
+
+    asyncio.run(go())
+    entries = json.loads(path.read_text())["entries"]["GET /v2/actor-runs/r1"]
+    assert [json.loads(e["body"])["data"]["status"] for e in entries] == ["RUNNING", "SUCCEEDED"]
+    assert all(e["headers"] == {"content-type": "application/json"} for e in entries)
+
+
+@pytest.mark.parametrize("bulk_wait_threshold", [8, 1])
+def test_record_against_the_fake_server_then_replay_offline(tmp_path, bulk_wait_threshold):
+    path = str(tmp_path / "apify.json")
+    urls = [f"https://www.linkedin.com/in/{u}/" for u in ("ada-l", "grace-h")]
+
+    async def extract(transport, base_url):
+        async with AsyncLinkedInAPIExtractor(
+            "test-token", transport=transport, base_url=base_url, scheduler=scheduler(),
+            wait_for_finish=1, bulk_wait_threshold=bulk_wait_threshold,
+        ) as ex:
+            posts = await ex.extract_recent_posts_bulk(urls)
+            profiles = [await ex.extract_profile(u, posts=[]) for u in urls]
+            return posts, profiles
+
+    server = FakeApifyServer(config=FakeApifyConfig(latency_ms=0, run_seconds=0.3, run_jitter=0, seed=7)).start()
+    try:
+        recorded = asyncio.run(extract(RecordingTransport(path), server.url))
+    finally:
+        server.stop()
+    assert all(p is not None for p in recorded[1])
+
+    # the server is gone; every call is answered from the fixture
+    replay = ReplayTransport(path, latency=0)
+    assert asyncio.run(extract(replay, server.url)) == recorded
+    assert replay.stats["misses"] == 0
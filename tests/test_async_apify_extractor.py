@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from core.apify_extractor import LinkedInAPIExtractor
+from core.async_apify_extractor import AsyncLinkedInAPIExtractor, extract_username
+from core.loop_runner import BackgroundLoop
+from core.profile_cache import ProfileCache
+from core.rate_limiter import RateLimitScheduler
+
+POSTS_PATH = "/v2/acts/apimaestro~linkedin-batch-profile-posts-scraper/run-sync-get-dataset-items"
+
+
+def scheduler():
+    s = RateLimitScheduler()
+    s.register("apify", requests_per_sec=1000, burst=1000)
+    s.register("apify_runs", requests_per_sec=1000, burst=1000, max_concurrency=25)
+    return s
+
+
+def extractor(handler, **kwargs):
+    return AsyncLinkedInAPIExtractor(
+        "test-token", transport=httpx.MockTransport(handler), scheduler=scheduler(), **kwargs
+    )
+
+
+def url(username):
+    return f"https://www.linkedin.com/in/{username}/"
+
+
+def post(text, ts, owner=None):
+    item = {"text": text, "posted_at": {"timestamp": ts}}
+    if owner:
+        item["author"] = {"username": owner}
+    return item
+
+
+def posts_handler(dataset):
+    """Answers posts-actor runs with dataset(usernames); records each run's usernames."""
+    runs = []
+
+    def handler(request):
+        if request.url.path != POSTS_PATH:
+            return httpx.Response(404)
+        usernames = json.loads(request.content)["usernames"]
+        runs.append(usernames)
+        return httpx.Response(201, json=dataset(usernames))
+
+    return handler, runs
+
+
+def test_bulk_posts_are_split_per_owner_and_cached(tmp_path):
+    handler, runs = posts_handler(lambda usernames: [post("a1", 1000, "a"), post("a2", 3000, "a")])
+    cache = ProfileCache(str(tmp_path / "cache.sqlite3"))
+
+    async def go():
+        async with extractor(handler, cache=cache) as ex:
+            return await ex.extract_recent_posts_bulk([url("a"), url("B")])
+
+    results = asyncio.run(go())
+    assert [p["text"] for p in results["a"]["recent_posts"]] == ["a2", "a1"]
+    # b was in the run and is attributable, so it really has no posts
+    assert results["b"]["recent_posts"] == []
+    assert cache.get_posts("b") == []
+    assert len(runs) == 1
+
+
+def test_unattributable_bulk_dataset_falls_back_to_per_user_runs(tmp_path):
+    def dataset(usernames):
+        if len(usernames) > 1:
+            # nothing says whose post this is
+            return [post("mystery", 5000)]
+        # a run for one profile needs no owner fields
+        return [post(usernames[0].rstrip("/").rsplit("/", 1)[-1], 4000)]
+
+    handler, runs = posts_handler(dataset)
+    cache = ProfileCache(str(tmp_path / "cache.sqlite3"))
+
+    async def go():
+        async with extractor(handler, cache=cache) as ex:
+            return await ex.extract_recent_posts_bulk([url("a"), url("b")])
+
+    results = asyncio.run(go())
+    assert len(runs) == 3
+    assert sorted(map(len, runs)) == [1, 1, 2]
+    assert [p["text"] for p in results["a"]["recent_posts"]] == ["a"]
+    assert cache.get_posts("a") == results["a"]["recent_posts"]
+    assert cache.get_posts("b") == results["b"]["recent_posts"]
+    assert "mystery" not in json.dumps(results)
+
+
+def test_bulk_runs_one_actor_run_per_chunk_and_skips_cached_users(tmp_path):
+    def dataset(usernames):
+        return [post("hi", 1000, u.rstrip("/").rsplit("/", 1)[-1]) for u in usernames]
+
+    handler, runs = posts_handler(dataset)
+    cache = ProfileCache(str(tmp_path / "cache.sqlite3"))
+    cache.set_posts("cached", [post("old", 10)])
+
+    async def go():
+        async with extractor(handler, cache=cache) as ex:
+            return await ex.extract_recent_posts_bulk([url(u) for u in "abcde"] + [url("cached")], batch_size=2)
+
+    results = asyncio.run(go())
+    assert sorted(map(len, runs)) == [1, 2, 2]
+    assert set(results) == set("abcde") | {"cached"}
+    assert results["cached"]["recent_posts"] == [post("old", 10)]
+
+
+def profile_handler(statuses, seen):
+    """A profile actor whose run reports `statuses` in turn, each held for half the long-poll wait."""
+    async def handler(request):
+        path = request.url.path
+        if path.endswith("/runs") and request.method == "POST":
+            return httpx.Response(201, json={"data": {"id": "run-1", "defaultDatasetId": "ds-1"}})
+        if path == "/v2/actor-runs/run-1":
+            wait = int(request.url.params.get("waitForFinish", 0))
+            seen.append(wait)
+            status = statuses.pop(0)
+            if status not in ("SUCCEEDED", "FAILED"):
+                await asyncio.sleep(wait / 2)
+            return httpx.Response(200, json={"data": {"id": "run-1", "status": status}})
+        if path == "/v2/datasets/ds-1/items":
+            return httpx.Response(200, json=[{"basic_info": {"fullname": "Ada"}}])
+        return httpx.Response(404)
+
+    return handler
+
+
+def test_profile_run_is_waited_for_with_long_polls():
+    seen = []
+    handler = profile_handler(["RUNNING", "SUCCEEDED"], seen)
+
+    async def go():
+        async with extractor(handler, wait_for_finish=1) as ex:
+            profile = await ex.extract_profile(url("ada"), posts=[])
+            return profile, dict(ex.poll_stats)
+
+    start = time.perf_counter()
+    profile, stats = asyncio.run(go())
+    assert profile["basic_info"]["fullname"] == "Ada"
+    # the server held the first poll, so the client re-polled without backing off
+    assert seen == [1, 1]
+    assert stats["status_requests"] == 2
+    assert time.perf_counter() - start < 1.0
+
+
+def test_failed_run_gives_no_profile():
+    handler = profile_handler(["FAILED"], [])
+
+    async def go():
+        async with extractor(handler, wait_for_finish=1) as ex:
+            return await ex.extract_profile(url("ada"), posts=[])
+
+    assert asyncio.run(go()) is None
+
+
+def test_sync_wrapper_shares_one_loop_across_threads():
+    def dataset(usernames):
+        return [post("hi", 1000)]
+
+    handler, runs = posts_handler(dataset)
+    loop = BackgroundLoop(name="test-loop")
+    ex = LinkedInAPIExtractor("test-token", loop=loop, transport=httpx.MockTransport(handler), scheduler=scheduler())
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda u: ex.extract_recent_posts(url(u)), "abcd"))
+        assert results == [[post("hi", 1000)]] * 4
+        assert len(runs) == 4
+
+        async def nested():
+            return ex.extract_recent_posts(url("a"))
+
+        # blocking calls from the loop's own thread would deadlock
+        with pytest.raises(RuntimeError):
+            loop.run(nested())
+    finally:
+        ex.close()
+
+
+@pytest.mark.parametrize("raw", [
+    "https://www.linkedin.com/in/Ada-L/",
+    "  HTTPS://LinkedIn.com/in/Ada-L?trk=feed#top ",
+    "linkedin.com/in/Ada-L/details/experience/",
+])
+def test_extract_username_keeps_case_but_drops_the_rest(raw):
+    assert extract_username(raw) == "Ada-L"
+
+
+@pytest.mark.parametrize("raw", [None, "", "https://example.com/in/ada", "https://linkedin.com/in/"])
+def test_extract_username_without_a_profile_path(raw):
+    assert extract_username(raw) is None
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+
+from core.batch_runner import BatchLeadRunner
+from core.lead_record import LeadRecord, latest_post_ts
+from core.lead_state import LeadStateStore, days_since
+
+
+class FakeExtractor:
+    def __init__(self):
+        self.bulk_calls = []
+        self.extracted = []
+        self.posts = [{"text": "hi"}]
+
+    def _extract_username(self, url):
+        return url.rsplit("/in/", 1)[-1]
+
+    def extract_recent_posts_bulk(self, urls, batch_size=50):
+        self.bulk_calls.append(list(urls))
+        return {self._extract_username(u): {"recent_posts": list(self.posts)} for u in urls}
+
+    def extract_lead_record(self, url, posts=None, spill_dir=None):
+        self.extracted.append(url)
+        if url.endswith("/broken"):
+            return None
+        return LeadRecord(
+            username=self._extract_username(url), activity_days=len(posts or []), latest_post_ts=latest_post_ts(posts)
+        )
+
+
+class FakeBuilder:
+    def build_payload(self, record, lead):
+        return {"url": lead["linkedin_url"]}
+
+
+class FakeScorer:
+    def __init__(self):
+        self.batches = []
+
+    def score(self, payload):
+        return {"priority": "WARM", "score": 50, "confidence": 80, "reasons": []}
+
+    def score_batch(self, payloads, batch_size=10):
+        self.batches.append(sorted(payloads))
+        return {pid: self.score(p) for pid, p in payloads.items()}
+
+
+def leads(*names):
+    return [(i, {"linkedin_url": f"https://linkedin.com/in/{name}"}) for i, name in enumerate(names)]
+
+
+def make_runner(**kwargs):
+    return BatchLeadRunner(FakeExtractor(), FakeScorer(), feature_builder=FakeBuilder(), **kwargs)
+
+
+def test_stream_scores_every_lead_with_prefetched_posts():
+    runner = make_runner(concurrency=2, posts_batch_size=3, score_batch_size=2)
+    results = sorted(runner.stream(leads("a", "b", "c", "d", "e")), key=lambda r: r["row"])
+
+    assert [r["status"] for r in results] == ["ok"] * 5
+    assert {r["priority"] for r in results} == {"WARM"}
+    assert all(r["activity_days"] == 1 for r in results)
+    # posts come from one bulk run per posts_batch_size leads, except a
+    # first chunk of `concurrency` leads so results start flowing early
+    assert [len(call) for call in runner.extractor.bulk_calls] == [2, 3]
+    assert all(len(batch) <= 2 for batch in runner.scorer.batches)
+
+
+def test_failed_extraction_is_reported_and_not_scored():
+    runner = make_runner(concurrency=2)
+    results = {r["username"]: r for r in runner.stream(leads("a", "broken"))}
+    assert results["broken"]["status"] == "failed"
+    assert results["broken"]["error"] == "extraction failed"
+    assert "priority" not in results["broken"]
+    assert results["a"]["status"] == "ok"
+
+
+def test_closing_the_stream_early_stops_cleanly():
+    stream = make_runner(concurrency=1).stream(leads(*"abcdefgh"))
+    first = next(stream)
+    stream.close()
+    assert first["status"] == "ok"
+
+
+def test_astream_yields_every_result():
+    async def source():
+        for pair in leads("a", "b", "c"):
+            yield pair
+
+    async def collect():
+        return [r async for r in make_runner(concurrency=2).astream(source())]
+
+    assert sorted(r["row"] for r in asyncio.run(collect())) == [0, 1, 2]
+
+
+def test_run_appends_jsonl_and_reports_stats(tmp_path):
+    out = tmp_path / "out.jsonl"
+    stats = make_runner().run(leads("a", "broken"), str(out))
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted(r["row"] for r in rows) == [0, 1]
+    assert (stats["rows"], stats["ok"], stats["failed"]) == (2, 1, 1)
+
+
+def test_stream_yields_results_while_waiting_for_slow_input():
+    first_result = threading.Event()
+    waited_for_consumer = []
+
+    def slow_leads():
+        # the first chunk is `concurrency` leads
+        yield from leads("a", "b")
+        # a slow source: the next lead only arrives after a result went out
+        waited_for_consumer.append(first_result.wait(5))
+        yield 2, {"linkedin_url": "https://linkedin.com/in/c"}
+
+    rows = []
+    for res in make_runner(concurrency=2, posts_batch_size=50).stream(slow_leads()):
+        rows.append(res["row"])
+        first_result.set()
+
+    assert sorted(rows) == [0, 1, 2]
+    assert waited_for_consumer == [True]
+
+
+class ActivityBuilder:
+    def build_payload(self, record, lead):
+        return {"url": lead["linkedin_url"], "prospect": {"activity_days": days_since(record.latest_post_ts)}}
+
+
+def test_state_store_carries_leads_unless_the_prefetched_posts_changed(tmp_path):
+    store = LeadStateStore(str(tmp_path / "state.sqlite3"))
+    runner = BatchLeadRunner(
+        FakeExtractor(), FakeScorer(), feature_builder=ActivityBuilder(), concurrency=2, state_store=store
+    )
+    now_ms = int(time.time() * 1000)
+    runner.extractor.posts = [{"text": "hi", "posted_at": {"timestamp": now_ms}}]
+    assert [r["status"] for r in runner.stream(leads("a", "b"))] == ["ok", "ok"]
+    assert len(runner.extractor.extracted) == 2
+
+    results = list(runner.stream(leads("a", "b")))
+    assert all(r["carried_forward"] for r in results)
+    assert len(runner.extractor.extracted) == 2
+
+    # a new post within the refresh window still sends the lead back through extraction
+    runner.extractor.posts.append({"text": "news", "posted_at": {"timestamp": now_ms + 1000}})
+    results = list(runner.stream(leads("a", "b")))
+    assert not any(r.get("carried_forward") for r in results)
+    assert len(runner.extractor.extracted) == 4
+    assert store.stats()["new_posts"] == 2
+    store.close()
@@ -0,0 +1,28 @@
+import pytest
+
+from loadtest.benchmark import percentile, summarize
+
+
+@pytest.mark.parametrize("n, pct, expected", [
+    (100, 50, 50),
+    (100, 95, 95),
+    (100, 99, 99),
+    (100, 100, 100),
+    (20, 95, 19),
+    (20, 50, 10),
+    (1, 99, 1),
+    (100, 7, 7),
+    (10, 0, 1),
+])
+def test_percentile_is_nearest_rank(n, pct, expected):
+    assert percentile([float(v) for v in range(1, n + 1)], pct) == expected
+
+
+def test_percentile_of_nothing_is_zero():
+    assert percentile([], 95) == 0.0
+
+
+def test_summarize_reports_milliseconds():
+    result = summarize("stage", [i / 1000 for i in range(1, 101)], elapsed_s=2.0)
+    assert result["ops"] == 100 and result["throughput_per_s"] == 50.0
+    assert (result["latency_ms"]["p50"], result["latency_ms"]["p95"], result["latency_ms"]["p99"]) == (50, 95, 99)
@@ -0,0 +1,54 @@
+import pytest
+
+from core.feature_builder import extract_features, parse_amount, seniority_level
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1.3 Billion", 1.3e9),
+    ("5,001-10,000 employees", 5001.0),
+    ("10k+", 10000.0),
+    ("250M", 250e6),
+    ("12 mio", 12e6),
+    (42, 42.0),
+    ("", None),
+    ("undisclosed", None),
+    (None, None),
+    (float("nan"), None),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize("title, level", [
+    ("Chief Executive Officer", 5),
+    ("Co-Founder & CTO", 5),
+    ("President", 5),
+    ("President & CEO", 5),
+    ("Business Owner", 5),
+    ("Co-Owner, Acme Bakery", 5),
+    ("Managing Partner", 5),
+    ("Vice President of Sales", 4),
+    ("Senior Vice-President, Marketing", 4),
+    ("General Partner", 4),
+    ("Head of Growth", 4),
+    ("Director of Engineering", 3),
+    ("Partner Account Manager", 2),
+    ("Senior Software Engineer", 2),
+    ("Product Owner", None),
+    ("Partner", None),
+    ("Data Analyst", 1),
+    ("Marketing Intern", 0),
+    ("", None),
+])
+def test_seniority_level(title, level):
+    assert seniority_level(title) == level
+
+
+def test_extract_features_reads_build_payload_output():
+    payload = {
+        "prospect": {"current_role": "VP Engineering", "headline": "", "activity_days": 3.4},
+        "company_manual": {"company_size": "1,001-5,000", "annual_revenue": "$2B"},
+    }
+    assert extract_features(payload) == {
+        "seniority": 4, "junior": False, "employees": 1001, "revenue_usd": 2e9, "activity_days": 3,
+    }
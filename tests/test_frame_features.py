@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from core.feature_builder import extract_features
+from core.frame_features import FrameFeatureBuilder
+from core.pre_scorer import RulePreScorer
+
+TITLES = [
+    "Product Owner", "Partner Account Manager", "Vice President", "Senior Vice-President, Sales",
+    "President", "Business Owner", "Managing Partner", "General Partner", "Partner", "CEO",
+    "Marketing Intern", "Assistant to the CEO", "Data Analyst", "",
+]
+
+
+def payloads():
+    out = []
+    for title in TITLES:
+        for size, revenue, activity in (("10,001+ employees", "", 5), ("11-50", "$2B", None), ("", "", 400)):
+            out.append({
+                "prospect": {"current_role": title, "headline": "", "activity_days": activity},
+                "company_manual": {"company_size": size, "annual_revenue": revenue},
+            })
+    return out
+
+
+def test_frame_features_match_extract_features():
+    rows = payloads()
+    frame = FrameFeatureBuilder().build_from_payloads(rows)
+    for i, payload in enumerate(rows):
+        expected = extract_features(payload)
+        got = frame.iloc[i]
+        for column, value in expected.items():
+            if value is None:
+                assert pd.isna(got[column]), (TITLES[i // 3], column)
+            else:
+                assert got[column] == value, (TITLES[i // 3], column)
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_classify_frame_agrees_with_classify(enabled):
+    scorer = RulePreScorer(enabled=enabled)
+    rows = payloads()
+    routed = scorer.classify_frame(FrameFeatureBuilder().build_from_payloads(rows))
+    for i, payload in enumerate(rows):
+        single = scorer.classify(payload)
+        expected = single["priority"] if single else None
+        got = None if pd.isna(routed.iloc[i]) else routed.iloc[i]
+        assert got == expected, TITLES[i // 3]
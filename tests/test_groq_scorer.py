@@ -0,0 +1,38 @@
+import json
+
+from core.groq_scorer import GroqLeadScorer
+from core.llm_backends import ScorerBackend
+
+SCORED = {"priority": "WARM", "score": 61, "confidence": 70, "reasons": ["VP at a mid-size SaaS"]}
+NO_SCORE = {"priority": "HOT", "confidence": 95, "reasons": ["missing the score"]}
+
+
+class ScriptedBackend(ScorerBackend):
+    name = "scripted"
+    model = "scripted-model"
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def complete(self, messages, timeout=60, cost_tokens=0):
+        self.prompts.append(messages[-1]["content"])
+        return self.answers.pop(0)
+
+
+def payload(name):
+    return {"prospect": {"name": name, "current_role": "VP Sales"}, "company_manual": {"company_name": "Acme"}}
+
+
+def test_score_skips_verdicts_without_a_score():
+    backend = ScriptedBackend(json.dumps(NO_SCORE) + "\n" + json.dumps(SCORED))
+    assert GroqLeadScorer(backend=backend).score(payload("a"), use_cache=False) == SCORED
+
+
+def test_batch_entries_without_a_score_are_rescored_alone():
+    batch = json.dumps([dict(SCORED, id="1"), dict(NO_SCORE, id="2")])
+    backend = ScriptedBackend(batch, json.dumps(SCORED))
+    results = GroqLeadScorer(backend=backend).score_batch({"1": payload("a"), "2": payload("b")}, use_cache=False)
+
+    assert results == {"1": SCORED, "2": SCORED}
+    assert len(backend.prompts) == 2
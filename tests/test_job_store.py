@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from core.job_store import JobStore, SCORED, FAILED
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = JobStore(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    yield s
+    s.close()
+
+
+def leads(n):
+    return [(i, {"linkedin_url": f"https://linkedin.com/in/u{i}"}) for i in range(n)]
+
+
+def test_create_job_is_idempotent(store):
+    assert store.create_job("job", leads(3)) == 3
+    store.mark_scored("job", 0, {"row": 0, "status": "ok"})
+    assert store.create_job("job", leads(4)) == 1
+    assert store.progress("job")[SCORED] == 1
+    assert store.progress("job")["total"] == 4
+
+
+def test_resume_skips_finished_and_keeps_earlier_stages(store):
+    store.create_job("job", leads(4))
+    store.mark_scored("job", 0, {"row": 0, "status": "ok"})
+    store.mark_posts_fetched("job", 1, [{"text": "hi"}])
+    store.mark_extracted("job", 2, {"prospect": {}}, {"row": 2, "username": "u2"})
+
+    items = {item["row"]: item for item in store.iter_unfinished("job", page_size=2)}
+    assert sorted(items) == [1, 2, 3]
+    assert items[1]["posts"] == [{"text": "hi"}] and items[1]["payload"] is None
+    assert items[2]["payload"] == {"prospect": {}} and items[2]["result"]["username"] == "u2"
+    assert items[3]["lead"] == {"linkedin_url": "https://linkedin.com/in/u3"}
+
+
+def test_posts_fetched_never_moves_a_lead_backwards(store):
+    store.create_job("job", leads(1))
+    store.mark_extracted("job", 0, {"prospect": {}}, {"row": 0})
+    store.mark_posts_fetched("job", 0, [])
+    assert store.progress("job")["extracted"] == 1
+
+
+def test_failed_leads_are_retried_until_max_attempts(store, tmp_path):
+    store.create_job("job", leads(2))
+    store.mark_scored("job", 0, {"row": 0, "status": "ok"})
+    store.mark_failed("job", 1, "extract", "boom")
+    assert [item["row"] for item in store.iter_unfinished("job")] == [1]
+    store.mark_failed("job", 1, "extract", "boom again")
+    assert list(store.iter_unfinished("job")) == []
+    assert store.progress("job")[FAILED] == 1
+
+    out = tmp_path / "export.jsonl"
+    assert store.export_results("job", str(out)) == 2
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert rows[0] == {"row": 0, "status": "ok"}
+    assert rows[1] == {"row": 1, "status": "failed", "error": "boom again"}
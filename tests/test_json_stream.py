@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from core.groq_scorer import valid_verdict
+from core.json_stream import JsonObjectStream, first_json_object, iter_json_objects, iter_sse_data
+
+VERDICT = {"priority": "HOT", "score": 82, "confidence": 90, "reasons": ["CTO", "a {brace} in \"quotes\""]}
+
+
+@pytest.mark.parametrize("size", [1, 3, 16, 10_000])
+def test_objects_survive_any_chunking(size):
+    text = "Sure! ```json\n" + json.dumps(VERDICT) + "\n``` hope that helps"
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    assert list(iter_json_objects(chunks)) == [VERDICT]
+
+
+def test_feed_returns_an_object_as_soon_as_it_closes():
+    parser = JsonObjectStream()
+    text = json.dumps(VERDICT)
+    assert parser.feed(text[:-1]) == []
+    assert parser.feed(text[-1] + ' {"priority": ') == [VERDICT]
+
+
+def test_array_items_come_out_one_by_one_but_nested_objects_do_not():
+    items = [{"id": "1", "meta": {"x": 1}}, {"id": "2", "meta": {"x": 2}}]
+    assert list(iter_json_objects([json.dumps(items)])) == items
+
+
+def test_a_broken_object_does_not_poison_the_rest():
+    text = '{"priority": HOT} {"priority": "WARM"}'
+    assert list(iter_json_objects([text])) == [{"priority": "WARM"}]
+
+
+def test_first_json_object_skips_rejected_objects():
+    text = '{"priority": "MAYBE", "confidence": 5, "reasons": []} ' + json.dumps(VERDICT)
+    assert first_json_object(text, valid_verdict) == VERDICT
+    assert first_json_object("no json here") is None
+
+
+def test_truncated_output_yields_nothing():
+    assert first_json_object(json.dumps(VERDICT)[:-5]) is None
+
+
+def test_iter_sse_data_stops_at_done():
+    lines = [b'data: {"n": 1}', b"", b": keep-alive", "data: not json", 'data: {"n": 2}', b"data: [DONE]",
+             b'data: {"n": 3}']
+    assert list(iter_sse_data(lines)) == [{"n": 1}, {"n": 2}]
+
+
+@pytest.mark.parametrize("result, require_score, ok", [
+    (VERDICT, True, True),
+    ({k: v for k, v in VERDICT.items() if k != "score"}, False, True),
+    ({k: v for k, v in VERDICT.items() if k != "score"}, True, False),
+    (dict(VERDICT, score=101), False, False),
+    (dict(VERDICT, priority="hot"), True, True),
+    (dict(VERDICT, reasons="CTO"), False, False),
+    (None, False, False),
+])
+def test_valid_verdict(result, require_score, ok):
+    assert valid_verdict(result, require_score=require_score) is ok
@@ -0,0 +1,42 @@
+import gzip
+import json
+import os
+
+from core.lead_record import LeadRecord
+
+
+def test_from_apify_keeps_the_scored_fields():
+    profile = {
+        "basic_info": {"fullname": "Ada L", "headline": "CTO at Acme", "public_identifier": "ada",
+                       "location": {"full": "London"}},
+        "experience": [{"title": "Engineer", "company": "Old"},
+                       {"title": "CTO", "company": "Acme", "is_current": True}],
+        "recent_posts": [{"text": "a", "posted_at": {"timestamp": 1000}},
+                         {"text": "b", "posted_at": {"timestamp": 3000}}],
+        "activity_days": 4,
+    }
+    record = LeadRecord.from_apify(profile)
+    assert (record.username, record.current_role, record.current_company) == ("ada", "CTO", "Acme")
+    assert record.location == "London"
+    assert record.activity_days == 4
+    assert record.latest_post_ts == 3000
+
+
+def test_to_dict_round_trips():
+    record = LeadRecord.from_apify(
+        {"basic_info": {"headline": "VP Sales"}}, posts=[{"text": "hi", "posted_at": {"timestamp": 5}}], username="u"
+    )
+    assert LeadRecord.from_dict(record.to_dict()) == record
+
+
+def test_missing_data_gives_an_empty_record():
+    assert LeadRecord.from_dict(None) == LeadRecord.from_apify(None)
+    assert LeadRecord.from_dict({}).recent_posts == ()
+
+
+def test_spill_dir_keeps_the_raw_blob(tmp_path):
+    profile = {"basic_info": {"public_identifier": "Ada/L"}}
+    record = LeadRecord.from_apify(profile, posts=[{"text": "hi"}], spill_dir=str(tmp_path))
+    with gzip.open(record.raw_path, "rt", encoding="utf-8") as f:
+        assert json.load(f) == {"profile": profile, "posts": [{"text": "hi"}]}
+    assert os.path.dirname(record.raw_path) == str(tmp_path)
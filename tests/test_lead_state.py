@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from core.lead_state import CARRY, RESCORE, LeadStateStore, activity_bucket, days_since
+
+DAY = 86400
+LEAD = {"linkedin_url": "https://linkedin.com/in/ada", "company_name": "Acme", "industry": "SaaS"}
+RESULT = {"priority": "HOT", "score": 88, "confidence": 90, "reasons": ["CTO"], "source": "llm",
+          "name": "Ada", "activity_days": 3, "row": 7, "_timings": {"score": 1.2}}
+
+
+def payload(activity_days=3, role="CTO"):
+    return {"prospect": {"name": "Ada", "role": role, "activity_days": activity_days}, "company": {"name": "Acme"}}
+
+
+@pytest.fixture
+def scored(tmp_path):
+    """A store holding one lead scored just now, whose last post was 3 days ago."""
+    store = LeadStateStore(str(tmp_path / "state.sqlite3"), refresh_after_s=30 * DAY)
+    now = time.time()
+    latest_post_ts = int((now - 3 * DAY) * 1000)
+    store.save("Ada", LEAD, payload(), latest_post_ts, RESULT)
+    yield store, now, latest_post_ts
+    store.close()
+
+
+def test_activity_bucket_and_days_since():
+    assert [activity_bucket(d) for d in (None, 0, 7, 8, 365, 366)] == [-1, 0, 0, 1, 4, 5]
+    assert days_since(None) is None
+    assert days_since(int((1000 * DAY - 2.5 * DAY) * 1000), now=1000 * DAY) == 2
+
+
+def test_save_drops_private_keys_and_row(scored):
+    store, now, latest_post_ts = scored
+    action, _, result, _ = store.plan("ada", LEAD, now=now)
+    assert action == CARRY
+    assert "row" not in result and "_timings" not in result
+    assert result["priority"] == "HOT"
+
+
+def test_plan_carries_an_unchanged_lead(scored):
+    store, now, latest_post_ts = scored
+    stored = {k: v for k, v in RESULT.items() if k not in ("row", "_timings")}
+    assert store.plan("ADA", dict(LEAD), now=now + DAY) == (
+        CARRY, payload(), dict(stored, activity_days=4), latest_post_ts
+    )
+
+
+def test_plan_rescores_when_the_activity_bucket_moves(scored):
+    store, now, latest_post_ts = scored
+    action, new_payload, base, ts = store.plan("ada", LEAD, now=now + 10 * DAY)
+    assert (action, ts) == (RESCORE, latest_post_ts)
+    assert new_payload["prospect"]["activity_days"] == 13
+    assert base == {"name": "Ada", "activity_days": 13}
+
+
+@pytest.mark.parametrize("lead, later", [
+    (dict(LEAD, company_name="Acme Corp"), 0),
+    (LEAD, 31 * DAY),
+])
+def test_plan_extracts_again_on_new_input_or_after_the_refresh_age(scored, lead, later):
+    store, now, _ = scored
+    assert store.plan("ada", lead, now=now + later) is None
+
+
+def test_plan_extracts_again_when_the_prefetched_posts_have_a_new_one(scored):
+    store, now, latest_post_ts = scored
+    same = [{"text": "old", "posted_at": {"timestamp": latest_post_ts}}]
+    assert store.plan("ada", LEAD, now=now, posts=same)[0] == CARRY
+    assert store.plan("ada", LEAD, now=now + 10 * DAY, posts=same)[0] == RESCORE
+
+    newer = same + [{"text": "new", "posted_at": {"timestamp": latest_post_ts + 1000}}]
+    assert store.plan("ada", LEAD, now=now, posts=newer) is None
+    # a lead that had posts and now shows none changed too
+    assert store.plan("ada", LEAD, now=now, posts=[]) is None
+    assert store.stats()["new_posts"] == 2
+
+
+def test_default_refresh_window_is_a_week(tmp_path):
+    store = LeadStateStore(str(tmp_path / "state.sqlite3"))
+    now = time.time()
+    store.save("ada", LEAD, payload(activity_days=None), None, RESULT)
+    assert store.plan("ada", LEAD, now=now + 6 * DAY)[0] == CARRY
+    assert store.plan("ada", LEAD, now=now + 8 * DAY) is None
+    store.close()
+
+
+def test_plan_needs_a_known_username(scored):
+    store, now, _ = scored
+    assert store.plan(None, LEAD, now=now) is None
+    assert store.plan("grace", LEAD, now=now) is None
+
+
+def test_unchanged_payload_keeps_the_stored_result(scored):
+    store, _, latest_post_ts = scored
+    # activity_days itself is not part of the fingerprint, only its bucket
+    kept = store.unchanged("ada", payload(activity_days=5), latest_post_ts, 5)
+    assert kept["priority"] == "HOT" and kept["activity_days"] == 5
+
+    assert store.unchanged("ada", payload(role="CEO"), latest_post_ts, 3) is None
+    assert store.unchanged("ada", payload(), latest_post_ts + 1, 3) is None
+    assert store.unchanged("ada", payload(activity_days=40), latest_post_ts, 40) is None
+    assert store.unchanged("grace", payload(), latest_post_ts, 3) is None
+
+    stats = store.stats()
+    assert (stats["unchanged_payload"], stats["changed"], stats["new"], stats["entries"]) == (1, 3, 1, 1)
@@ -0,0 +1,167 @@
+import json
+import threading
+
+import pytest
+
+from core.llm_backends import GroqBackend, OpenAICompatibleBackend, ScorerBackend, make_backend
+from core.metrics import MetricsRegistry
+from core.rate_limiter import RateLimitScheduler
+from loadtest.mock_llm_server import MockConfig, MockLLMServer
+
+MESSAGES = [{"role": "user", "content": 'Score this prospect:\n{"name": "Ada"}'}]
+
+
+@pytest.fixture
+def server():
+    s = MockLLMServer(config=MockConfig(latency_ms=0, jitter_ms=0, seed=1)).start()
+    yield s
+    s.stop()
+
+
+def backend(url, max_retries=5, **kwargs):
+    scheduler = RateLimitScheduler()
+    scheduler.register("llm", requests_per_sec=1000, burst=1000, max_retries=max_retries)
+    return make_backend(base_url=url, scheduler=scheduler, metrics=MetricsRegistry(), **kwargs)
+
+
+def test_make_backend_defaults_to_groq():
+    b = make_backend("gsk-test", scheduler=RateLimitScheduler())
+    assert isinstance(b, GroqBackend)
+    assert (b.provider, b.model, b.url) == ("groq", GroqBackend.DEFAULT_MODEL, GroqBackend.BASE_URL + "/chat/completions")
+    with pytest.raises(ValueError):
+        make_backend("")
+
+
+def test_make_backend_with_a_base_url_registers_the_llm_provider():
+    scheduler = RateLimitScheduler()
+    b = make_backend(base_url="http://127.0.0.1:9/v1/", model="m1", scheduler=scheduler)
+    assert type(b) is OpenAICompatibleBackend
+    assert (b.provider, b.model, b.url) == ("llm", "m1", "http://127.0.0.1:9/v1/chat/completions")
+    assert scheduler.provider("llm") is not None
+
+    # an existing registration is left alone
+    scheduler = RateLimitScheduler()
+    scheduler.register("llm", requests_per_sec=1, burst=1)
+    limits = scheduler.provider("llm")
+    make_backend(base_url="http://127.0.0.1:9/v1", scheduler=scheduler)
+    assert scheduler.provider("llm") is limits
+
+
+def test_base_complete_json_picks_the_first_accepted_object():
+    class Canned(ScorerBackend):
+        def complete(self, messages, timeout=60, cost_tokens=0):
+            return 'Sure! ```json\n{"a": 1}\n``` and {"a": 2, "score": 5}'
+
+    assert Canned().complete_json(MESSAGES) == {"a": 1}
+    assert Canned().complete_json(MESSAGES, accept=lambda o: "score" in o) == {"a": 2, "score": 5}
+    with pytest.raises(RuntimeError):
+        Canned().complete_json(MESSAGES, accept=lambda o: False)
+
+
+def test_complete_against_the_mock_server_records_usage(server):
+    b = backend(server.url)
+    text = b.complete(MESSAGES)
+    assert '"priority"' in text
+    tokens = b.metrics.snapshot()["counters"]
+    assert any(k.startswith("llm_tokens_total") for k in tokens)
+    b.close()
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_complete_json_against_the_mock_server(server, stream):
+    b = backend(server.url, stream=stream)
+    verdict = b.complete_json(MESSAGES, accept=lambda o: "score" in o)
+    assert verdict["priority"] in ("HOT", "WARM", "COOL", "COLD")
+    assert server.stats()["streamed"] == int(stream)
+    b.close()
+
+
+def test_api_errors_raise(server):
+    server.config.error_rate = 1.0
+    b = backend(server.url, max_retries=0)
+    with pytest.raises(RuntimeError, match="500"):
+        b.complete(MESSAGES)
+    b.close()
+
+
+def test_close_closes_every_threads_session(server):
+    b = backend(server.url)
+    closed = []
+
+    def work():
+        b.complete(MESSAGES)
+        session = b._session()
+        original = session.close
+        session.close = lambda: (closed.append(session), original())
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    work()
+
+    b.close()
+    assert len(closed) == 4 and len(set(map(id, closed))) == 4
+    # the backend is still usable afterwards, on a fresh session
+    assert b._session() not in closed
+    b.close()
+
+
+class FakeStream:
+    """A streamed 200 whose SSE lines are handed out one at a time; counts how many were read."""
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.read = 0
+        self.closed = False
+        self.request = type("Request", (), {"body": b"{}"})()
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+def sse(*pieces, done=True):
+    lines = []
+    for piece in pieces:
+        lines += [b'data: {"choices": [{"delta": {"content": %s}}]}' % json.dumps(piece).encode(), b""]
+    if done:
+        lines += [b"data: [DONE]", b""]
+    return lines
+
+
+def streaming_backend(response):
+    b = backend("http://127.0.0.1:9/v1")
+    b._session = lambda: type("Session", (), {"post": lambda self, *a, **kw: response})()
+    return b
+
+
+def test_stream_stops_at_the_first_accepted_object():
+    lines = sse('{"priority": "HOT"}', ' then {"priority": "WARM", ', '"score": 70}', "\nRationale: " + "x" * 40, "more")
+    response = FakeStream(lines)
+    b = streaming_backend(response)
+
+    assert b.complete_json(MESSAGES, accept=lambda o: "score" in o) == {"priority": "WARM", "score": 70}
+    # the chatter after the verdict was never read and the connection was dropped
+    assert response.read == 5 and response.closed
+    counters = b.metrics.snapshot()["counters"]
+    assert counters["llm_stream_early_stop_total{provider=llm}"] == 1
+    assert counters["http_requests_total{provider=llm,status=200}"] == 1
+
+
+def test_stream_without_an_accepted_object_raises():
+    # cut off mid-object: the only complete object is not acceptable
+    response = FakeStream(sse('{"priority": "COLD"} {"priority": "HOT", "sco', done=False))
+    b = streaming_backend(response)
+    with pytest.raises(RuntimeError, match="no valid JSON object"):
+        b.complete_json(MESSAGES, accept=lambda o: "score" in o)
+    assert response.read == len(response.lines) and response.closed
+    assert "llm_stream_early_stop_total{provider=llm}" not in b.metrics.snapshot()["counters"]
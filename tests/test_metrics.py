@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import threading
+
+from core.metrics import BUCKETS, MetricsRegistry, current_trace, trace_lead
+
+
+def test_counters_are_exported_per_label_set():
+    m = MetricsRegistry(prefix="t")
+    m.incr("jobs_total", status="ok")
+    m.incr("jobs_total", 2, status="ok")
+    m.incr("jobs_total", status="failed")
+    m.incr("restarts_total")
+
+    text = m.to_prometheus()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert lines[:3] == [
+        "# TYPE t_jobs_total counter",
+        't_jobs_total{status="failed"} 1',
+        't_jobs_total{status="ok"} 3',
+    ]
+    assert lines[3:5] == ["# TYPE t_restarts_total counter", "t_restarts_total 1"]
+    assert m.snapshot()["counters"] == {"jobs_total{status=ok}": 3, "jobs_total{status=failed}": 1, "restarts_total": 1}
+
+
+def test_label_values_are_escaped():
+    m = MetricsRegistry(prefix="t")
+    m.incr("errors_total", reason='bad "quote"\\path\nnext')
+    assert 't_errors_total{reason="bad \\"quote\\"\\\\path\\nnext"} 1' in m.to_prometheus().splitlines()
+
+
+def test_histogram_buckets_are_cumulative():
+    m = MetricsRegistry(prefix="t")
+    for seconds in (0.001, 0.01, 0.2, 0.2, 500.0):
+        m.observe("score", seconds)
+
+    lines = m.to_prometheus().splitlines()
+    assert lines[0] == "# TYPE t_stage_seconds histogram"
+    buckets = {}
+    for line in lines[1:]:
+        if line.startswith("t_stage_seconds_bucket"):
+            le = line.split('le="')[1].split('"')[0]
+            buckets[le] = int(line.rsplit(" ", 1)[1])
+    assert list(buckets) == [f"{b:g}" for b in BUCKETS] + ["+Inf"]
+    # le is inclusive: 0.01 lands in the 0.01 bucket
+    assert (buckets["0.005"], buckets["0.01"], buckets["0.1"], buckets["0.25"], buckets["120"]) == (1, 2, 2, 4, 4)
+    assert buckets["+Inf"] == 5
+    assert 't_stage_seconds_count{stage="score"} 5' in lines
+    assert 't_stage_seconds_sum{stage="score"} 500.411000' in lines
+
+
+def test_trace_collects_observations_only_inside_the_block():
+    m = MetricsRegistry()
+    m.incr("before_total")
+    with trace_lead() as trace:
+        assert current_trace() is trace
+        m.incr("http_requests_total", provider="apify", status=200)
+        m.observe("extract", 0.5)
+        m.observe("extract", 0.25)
+    m.incr("after_total")
+    assert current_trace() is None
+
+    data = trace.to_dict()
+    assert data["stages"] == {"extract": {"seconds": 0.75, "calls": 2}}
+    assert data["counters"] == {"http_requests_total{provider=apify,status=200}": 1}
+
+
+def test_trace_follows_copied_contexts_into_threads_and_tasks():
+    m = MetricsRegistry()
+
+    async def fetch():
+        m.incr("task_total")
+
+    async def gather():
+        await asyncio.gather(fetch(), fetch())
+
+    with trace_lead() as trace:
+        # a thread sees the trace only when started with a copy of the context
+        ctx = contextvars.copy_context()
+        with_copy = threading.Thread(target=ctx.run, args=(m.incr, "thread_total"))
+        without = threading.Thread(target=m.incr, args=("lost_total",))
+        for t in (with_copy, without):
+            t.start()
+            t.join()
+        # tasks copy the context when created
+        asyncio.run(gather())
+
+    assert trace.to_dict()["counters"] == {"thread_total": 1, "task_total": 2}
+    assert m.snapshot()["counters"]["lost_total"] == 1
+
+
+def test_nested_traces_restore_the_outer_one():
+    with trace_lead() as outer:
+        with trace_lead() as inner:
+            assert current_trace() is inner
+        assert current_trace() is outer
@@ -0,0 +1,39 @@
+import pytest
+
+from core.pre_scorer import RulePreScorer
+
+
+def payload(title, size="10,001+ employees", revenue="", activity_days=5):
+    return {
+        "prospect": {"current_role": title, "headline": "", "activity_days": activity_days},
+        "company_manual": {"company_size": size, "annual_revenue": revenue},
+    }
+
+
+@pytest.mark.parametrize("title", ["Product Owner", "Partner Account Manager", "Partner", "Senior Engineer"])
+def test_non_executive_titles_go_to_the_llm(title):
+    assert RulePreScorer().classify(payload(title)) is None
+
+
+@pytest.mark.parametrize("title", ["CEO", "Vice President, Sales", "Business Owner", "Managing Partner"])
+def test_senior_title_at_a_big_company_is_hot(title):
+    result = RulePreScorer().classify(payload(title))
+    assert result["priority"] == "HOT" and result["source"] == "rules"
+
+
+def test_hot_needs_a_big_company_and_recent_activity():
+    scorer = RulePreScorer()
+    assert scorer.classify(payload("CEO", size="11-50 employees")) is None
+    assert scorer.classify(payload("CEO", size="", revenue="$500M"))["priority"] == "HOT"
+    assert scorer.classify(payload("CEO", activity_days=200)) is None
+    assert scorer.classify(payload("CEO", activity_days=None))["priority"] == "HOT"
+
+
+def test_junior_titles_are_cold_unless_mixed():
+    scorer = RulePreScorer()
+    assert scorer.classify(payload("Marketing Intern"))["priority"] == "COLD"
+    assert scorer.classify(payload("Assistant to the CEO")) is None
+
+
+def test_disabled_scorer_decides_nothing():
+    assert RulePreScorer(enabled=False).classify(payload("CEO")) is None
@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+
+from core import profile_cache
+from core.profile_cache import ProfileCache
+
+DAY = 86400
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profile_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    c = ProfileCache(str(tmp_path / "cache.sqlite3"), profile_ttl=7 * DAY, posts_ttl=DAY, profile_max_age=30 * DAY)
+    yield c
+    c.close()
+
+
+def test_entries_expire_after_their_ttl(cache, clock):
+    cache.set_profile("Ada", {"name": "Ada"})
+    cache.set_posts("ada", [{"text": "hi"}])
+
+    clock.now += DAY + 1
+    assert cache.get_posts("ada") is None
+    assert cache.get_profile(" ADA ") == {"name": "Ada"}
+
+    clock.now += 6 * DAY
+    assert cache.get_profile("ada") is None
+
+
+def test_hit_and_miss_counters(cache):
+    cache.set_posts("ada", [])
+    assert cache.get_posts("ada") == []
+    assert cache.get_posts("grace") is None
+    assert cache.get_profile("ada") is None
+    stats = cache.stats()
+    assert (stats["posts_hits"], stats["posts_misses"], stats["profile_misses"]) == (1, 1, 1)
+    assert (stats["posts_entries"], stats["profiles_entries"]) == (1, 0)
+
+
+def test_eviction_drops_expired_rows_then_least_recently_used(tmp_path, clock):
+    cache = ProfileCache(str(tmp_path / "cache.sqlite3"), posts_ttl=DAY, max_entries=40)
+    cache.set_posts("old", [])
+    clock.now += 2 * DAY
+    for i in range(62):
+        cache.set_posts(f"user-{i}", [])
+        clock.now += 1
+    assert cache.get_posts("user-0") == []  # touched, so user-1 is now the least recently used
+
+    cache.set_posts("user-62", [])  # 64th write runs the eviction check
+    stats = cache.stats()
+    assert stats["expired"] == 1
+    assert stats["evictions"] == 63 - 40
+    assert stats["posts_entries"] == 40
+    assert cache.get_posts("user-0") == []
+    assert cache.get_posts("user-1") is None
+    cache.close()
+
+
+def test_purge_expired_keeps_revalidatable_profiles(cache, clock):
+    cache.set_profile("ada", {"name": "Ada"})
+    cache.set_posts("ada", [])
+    clock.now += 10 * DAY
+    assert cache.purge_expired() == 1
+    assert cache.stats()["profiles_entries"] == 1
+
+    clock.now += 30 * DAY
+    assert cache.purge_expired() == 1
+    assert cache.stats()["profiles_entries"] == 0
+
+
+def test_stale_profile_is_revalidated_by_matching_validator(cache, clock):
+    cache.set_profile("ada", {"name": "Ada"})
+    cache.set_profile_validator("ada", "1000")
+    cache.set_profile_validator("ada", "2000")  # only fills in a missing validator
+    clock.now += 8 * DAY
+
+    assert cache.get_profile("ada") is None
+    assert cache.stale_profile_validator("ada") == "1000"
+    assert cache.revalidate_profile("ada", "2000") is None
+    assert cache.revalidate_profile("ada", "1000") == {"name": "Ada"}
+    # the TTL restarted
+    assert cache.get_profile("ada") == {"name": "Ada"}
+    assert cache.stale_profile_validator("ada") is None
+
+
+def test_old_cache_files_gain_the_validator_column(tmp_path, clock):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE profiles (username TEXT PRIMARY KEY, data TEXT NOT NULL, "
+        "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO profiles VALUES ('ada', '{\"name\": \"Ada\"}', ?, ?)", (clock.now, clock.now))
+    conn.commit()
+    conn.close()
+
+    cache = ProfileCache(path)
+    assert cache.get_profile("ada") == {"name": "Ada"}
+    cache.set_profile("grace", {"name": "Grace"}, validator="42")
+    clock.now += 8 * DAY
+    assert cache.stale_profile_validator("grace") == "42"
+    cache.close()
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from core.prompt_builder import PromptBuilder
+
+TEMPLATE = 'Rules: answer {"priority": "..."}\nData:\n{payload}\nJSON only: {"ok": true}'
+
+
+def payload(post_chars=2000, posts=3, **prospect):
+    recent = [{"text": f"post {i} " + "x" * post_chars, "posted_at": 1000 - i} for i in range(posts)]
+    return {"prospect": dict({"name": "Ada", "recent_posts": recent}, **prospect), "company_manual": {"name": "Acme"}}
+
+
+def body_of(builder, prompt):
+    assert prompt.startswith(builder.prefix) and prompt.endswith(builder.suffix)
+    return prompt[len(builder.prefix):len(prompt) - len(builder.suffix)]
+
+
+@pytest.mark.parametrize("template", ["no marker", "{payload} and {payload}"])
+def test_template_needs_exactly_one_marker(template):
+    with pytest.raises(ValueError):
+        PromptBuilder(template)
+
+
+def test_template_is_split_once_and_keeps_literal_braces():
+    builder = PromptBuilder(TEMPLATE)
+    assert builder.prefix == 'Rules: answer {"priority": "..."}\nData:\n'
+    assert builder.suffix == '\nJSON only: {"ok": true}'
+    prompt, _ = builder.build({"a": 1})
+    assert prompt == TEMPLATE.replace("{payload}", '{"a":1}')
+
+
+def test_small_payloads_are_left_alone():
+    builder = PromptBuilder(TEMPLATE, token_budget=600)
+    small = payload(post_chars=10)
+    text, tokens, truncated = builder.fit_payload(small)
+    assert not truncated
+    assert json.loads(text) == small
+    assert tokens == builder.estimate_tokens(text)
+
+
+def test_long_posts_are_shortened_before_any_is_dropped():
+    builder = PromptBuilder(TEMPLATE, token_budget=200)
+    original = payload()
+    text, tokens, truncated = builder.fit_payload(original)
+    fitted = json.loads(text)
+
+    assert truncated and tokens <= 200
+    posts = fitted["prospect"]["recent_posts"]
+    assert len(posts) == 3
+    assert all(p["text"].endswith("…") and len(p["text"]) < 200 for p in posts)
+    # the caller's payload is untouched
+    assert len(original["prospect"]["recent_posts"][0]["text"]) > 2000
+
+
+def test_oldest_posts_are_dropped_when_shortening_is_not_enough():
+    builder = PromptBuilder(TEMPLATE, token_budget=80, min_post_chars=80)
+    text, tokens, _ = builder.fit_payload(payload(posts=5))
+    posts = json.loads(text)["prospect"]["recent_posts"]
+    assert tokens <= 80
+    assert 0 < len(posts) < 5
+    assert [p["posted_at"] for p in posts] == [1000 - i for i in range(len(posts))]
+
+
+@pytest.mark.parametrize("budget", [120, 300, 600])
+def test_build_stays_within_the_budget(budget):
+    builder = PromptBuilder(TEMPLATE, token_budget=budget)
+    prompt, est = builder.build(payload(post_chars=5000, posts=10))
+    body = body_of(builder, prompt)
+    assert builder.estimate_tokens(body) <= budget
+    assert est == builder.static_tokens + builder.estimate_tokens(body)
+
+
+def test_build_many_budgets_each_payload_separately():
+    builder = PromptBuilder(TEMPLATE, token_budget=150)
+    payloads = {"1": payload(), "2": payload(post_chars=10, posts=1), 3: payload(posts=6)}
+    prompt, est = builder.build_many(payloads)
+    body = json.loads(body_of(builder, prompt))
+
+    assert list(body) == ["1", "2", "3"]
+    for pid in body:
+        assert builder.estimate_tokens(json.dumps(body[pid], separators=(",", ":"), ensure_ascii=False)) <= 150
+    assert body["2"] == payloads["2"]
+    assert est == builder.static_tokens + builder.estimate_tokens(body_of(builder, prompt))
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core import rate_limiter
+from core.rate_limiter import ProviderLimiter, TokenBucket, parse_duration
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("7", 7.0),
+    ("0.5", 0.5),
+    (3, 3.0),
+    ("-2", 0.0),
+    ("7.66s", 7.66),
+    ("120ms", 0.12),
+    ("2m59.56s", 179.56),
+    ("1h2m", 3720.0),
+])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "", "   ", "soon"])
+def test_parse_duration_unparseable(value):
+    assert parse_duration(value) is None
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_token_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=4)
+    assert [bucket.reserve() for _ in range(4)] == [0.0] * 4
+    # a fifth token is half a second away, and the caller now owes it
+    assert bucket.reserve() == pytest.approx(0.5)
+    clock.now += 1.0
+    assert bucket.available() == pytest.approx(1.0)
+    clock.now += 60
+    assert bucket.available() == 4.0
+
+    bucket.configure(rate=1, capacity=2)
+    assert bucket.available() == 2.0
+    assert bucket.reserve(3) == pytest.approx(1.0)
+
+
+def test_429_without_retry_after_halves_the_rate_and_success_recovers_it(clock):
+    limiter = ProviderLimiter("p", requests_per_sec=10, recovery_step=0.1)
+    assert limiter.on_response(429, {}) is None
+    assert limiter.requests.rate == 5
+    limiter.on_response(200, {})
+    assert limiter.requests.rate == 6
+    for _ in range(10):
+        limiter.on_response(200, {})
+    assert limiter.requests.rate == 10
+    assert limiter.metrics()["throttled"] == 1
+
+
+def test_retry_after_pauses_instead_of_slowing_down(clock):
+    limiter = ProviderLimiter("p", requests_per_sec=10)
+    assert limiter.on_response(429, {"retry-after": "3"}) == 3.0
+    assert limiter.requests.rate == 10
+    assert limiter._reserve(0) == pytest.approx(3.0)
+
+
+def test_rate_limit_headers_set_the_token_budget_and_pause_when_exhausted(clock):
+    limiter = ProviderLimiter("groq", requests_per_sec=1, burst=30)
+    limiter.on_response(200, {"x-ratelimit-limit-tokens": "12000"})
+    assert limiter.tokens.capacity == 12000 and limiter.tokens.rate == 200
+
+    limiter.on_response(200, {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "7.5s"})
+    assert limiter.metrics()["paused_s"] == 7.5
+    assert limiter._reserve(100) == pytest.approx(7.5)
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    limiter = ProviderLimiter("p", requests_per_sec=1, backoff_base=1.0, backoff_cap=8.0)
+    assert [limiter.backoff(a) for a in range(5)] == [1, 2, 4, 8, 8]
+    assert limiter.backoff(0, retry_after=5) == 6.0
+
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: low)
+    assert limiter.backoff(3) == 0
+    assert limiter.backoff(0, retry_after=5) == 5.0
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_call_retries_retryable_statuses_then_returns(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: 0.0)
+    answers = [Response(503), Response(429, {"retry-after": "2"}), Response(200)]
+    limiter = ProviderLimiter("p", requests_per_sec=1000, max_retries=3)
+    assert limiter.call(lambda: answers.pop(0)).status_code == 200
+    # the Retry-After pause is served once, by the backoff sleep
+    assert clock.slept == [0.0, 2.0]
+    assert limiter.metrics()["retries"] == 2
+
+    limiter = ProviderLimiter("p", requests_per_sec=1000, max_retries=1)
+    assert limiter.call(lambda: Response(500)).status_code == 500
+
+
+def test_aslot_waits_for_a_release_from_any_thread():
+    limiter = ProviderLimiter("runs", requests_per_sec=1000, max_concurrency=1)
+    order = []
+
+    async def worker(name, hold):
+        async with limiter.aslot():
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def main():
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with limiter.slot():
+                held.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait(5)
+        tasks = [asyncio.ensure_future(worker(n, 0.01)) for n in "ab"]
+        await asyncio.sleep(0.3)
+        assert order == [] and limiter.metrics()["queue_depth"] == 2
+
+        start = time.perf_counter()
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        thread.join()
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    assert sorted(order) == ["a", "b"]
+    assert limiter.metrics()["slots_in_use"] == 0
+    # woken by the releases, not by a polling interval
+    assert elapsed < 0.1
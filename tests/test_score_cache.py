@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import batch_score
+from core import score_cache
+from core.groq_scorer import GroqLeadScorer
+from core.llm_backends import ScorerBackend
+from core.score_cache import ScoreCache, payload_fingerprint
+
+PAYLOAD = {"prospect": {"name": "Ada", "current_role": "CTO"}, "company_manual": {"company_name": "Acme"}}
+VERDICT = {"priority": "HOT", "score": 90, "confidence": 80, "reasons": ["CTO"]}
+
+
+class CountingBackend(ScorerBackend):
+    name = "counting"
+    model = "m1"
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, timeout=60, cost_tokens=0):
+        self.calls += 1
+        return json.dumps(VERDICT)
+
+
+def test_fingerprint_ignores_key_order_but_not_model_or_prompt_version():
+    key = payload_fingerprint(PAYLOAD, "m1", "v3")
+    reordered = {"company_manual": {"company_name": "Acme"}, "prospect": {"current_role": "CTO", "name": "Ada"}}
+    assert payload_fingerprint(reordered, "m1", "v3") == key
+    assert payload_fingerprint(PAYLOAD, "m2", "v3") != key
+    assert payload_fingerprint(PAYLOAD, "m1", "v4") != key
+    assert payload_fingerprint(dict(PAYLOAD, extra=1), "m1", "v3") != key
+
+
+def test_round_trip_copies_values():
+    cache = ScoreCache()
+    value = {"priority": "HOT", "reasons": ["CTO"]}
+    cache.set("k", value)
+    value["reasons"].append("mutated after set")
+
+    got = cache.get("k")
+    assert got == {"priority": "HOT", "reasons": ["CTO"]}
+    got["reasons"].append("mutated after get")
+    assert cache.get("k") == {"priority": "HOT", "reasons": ["CTO"]}
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 0, "entries": 1}
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(score_cache.time, "time", lambda: now[0])
+    cache = ScoreCache(max_entries=2, ttl=60)
+    cache.set("a", {})
+    cache.set("b", {})
+    cache.get("a")
+    cache.set("c", {})
+    assert cache.get("b") is None and cache.get("a") == {}
+
+    now[0] += 61
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_scorer_serves_repeats_from_the_cache_unless_use_cache_is_false():
+    backend = CountingBackend()
+    scorer = GroqLeadScorer(backend=backend, cache=ScoreCache())
+    assert scorer.score(PAYLOAD) == VERDICT
+    assert scorer.score(PAYLOAD) == VERDICT
+    assert backend.calls == 1
+
+    assert scorer.score(PAYLOAD, use_cache=False) == VERDICT
+    assert scorer.score_batch({"1": PAYLOAD}, use_cache=False) == {"1": VERDICT}
+    assert backend.calls == 3
+    # the bypass neither read nor wrote the cache
+    assert scorer.cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1}
+
+
+@pytest.mark.parametrize("flag, cached", [([], True), (["--no-score-cache"], False)])
+def test_no_score_cache_flag_builds_an_uncached_scorer(flag, cached):
+    args = batch_score.build_parser().parse_args(
+        ["in.csv", "out.jsonl", "--no-cache", "--llm-base-url", "http://127.0.0.1:9/v1", *flag]
+    )
+    runner = batch_score.build_runner(args)
+    assert (runner.scorer.cache is not None) is cached
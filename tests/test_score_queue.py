@@ -0,0 +1,102 @@
+import pytest
+
+from core.score_queue import ScoreQueue, LeaseLost, DONE, FAILED, QUEUED, RUNNING
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = ScoreQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    yield q
+    q.close()
+
+
+def test_claim_leases_a_job_once(queue):
+    job_id = queue.submit("score", {"payload": {"name": "Ada"}}, tenant="t1")
+    job = queue.claim("w1")
+    assert job == {"job_id": job_id, "tenant": "t1", "kind": "score", "request": {"payload": {"name": "Ada"}},
+                   "attempts": 1}
+    assert queue.claim("w2") is None
+    assert queue.get(job_id)["status"] == RUNNING
+
+    queue.complete(job_id, {"priority": "HOT"})
+    done = queue.get(job_id)
+    assert (done["status"], done["result"], done["error"]) == (DONE, {"priority": "HOT"}, None)
+
+
+def test_expired_lease_is_handed_out_again_then_failed(queue):
+    job_id = queue.submit("extract", {"linkedin_url": "u"})
+    assert queue.claim("dead-worker", lease_s=-1)["attempts"] == 1
+
+    again = queue.claim("w2", lease_s=-1)
+    assert (again["job_id"], again["attempts"]) == (job_id, 2)
+
+    # max_attempts used up: the next expiry fails the job instead of requeueing it
+    assert queue.claim("w3") is None
+    failed = queue.get(job_id)
+    assert (failed["status"], failed["error"]) == (FAILED, "worker lease expired")
+
+
+def test_live_lease_is_not_taken_over(queue):
+    queue.submit("score", {})
+    queue.claim("w1", lease_s=300)
+    assert queue.claim("w2") is None
+
+
+def test_heartbeat_keeps_the_lease_alive(queue):
+    job_id = queue.submit("score", {})
+    queue.claim("w1", lease_s=-1)
+    assert queue.heartbeat(job_id, "w1", lease_s=300)
+    assert not queue.heartbeat(job_id, "w2")
+    assert queue.claim("w2") is None
+
+
+def test_worker_whose_lease_was_reclaimed_cannot_report(queue):
+    job_id = queue.submit("score", {})
+    queue.claim("w1", lease_s=-1)
+    queue.claim("w2")
+    assert not queue.heartbeat(job_id, "w1")
+
+    with pytest.raises(LeaseLost):
+        queue.complete(job_id, {"stale": True}, worker="w1")
+    with pytest.raises(LeaseLost):
+        queue.fail(job_id, "late failure", retry=True, worker="w1")
+    assert (queue.get(job_id)["status"], queue.get(job_id)["error"]) == (RUNNING, None)
+
+    queue.complete(job_id, {"fresh": True}, worker="w2")
+    assert queue.get(job_id)["result"] == {"fresh": True}
+    with pytest.raises(LeaseLost):
+        queue.complete(job_id, {}, worker="w2")
+
+
+def test_claims_are_fair_across_tenants(queue):
+    big = [queue.submit("score", {"n": i}, tenant="big") for i in range(3)]
+    small = queue.submit("score", {}, tenant="small")
+
+    order = [queue.claim(f"w{i}")["job_id"] for i in range(4)]
+    # the small tenant goes second, not behind the rest of the big submission
+    assert order == [big[0], small, big[1], big[2]]
+
+
+def test_fail_with_retry_requeues_until_attempts_run_out(queue):
+    job_id = queue.submit("score", {})
+    queue.claim("w1")
+    assert queue.fail(job_id, "429 from provider", retry=True) is True
+    assert queue.get(job_id)["status"] == QUEUED
+
+    queue.claim("w1")
+    assert queue.fail(job_id, "429 from provider", retry=True) is False
+    failed = queue.get(job_id)
+    assert (failed["status"], failed["error"], failed["attempts"]) == (FAILED, "429 from provider", 2)
+
+
+def test_counts_and_purge(queue):
+    a = queue.submit("score", {}, tenant="a")
+    queue.submit("score", {}, tenant="b")
+    queue.claim("w1")
+    queue.complete(a, {})
+    assert queue.counts() == {QUEUED: 1, RUNNING: 0, DONE: 1, FAILED: 0}
+    assert queue.counts("a")[DONE] == 1
+
+    assert queue.purge(older_than_s=3600) == 0
+    assert queue.purge(older_than_s=-1) == 1
+    assert queue.get(a) is None
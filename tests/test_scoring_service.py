@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from core.metrics import MetricsRegistry
+from core.rate_limiter import RateLimitScheduler
+from core.score_queue import ScoreQueue, DONE, RUNNING
+from core.scoring_service import ScoringService, ScoringServiceClient, ScoringWorkerPool
+
+
+class FakeScorer:
+    """Answers with the payload's name; waits on `gate` first if one is set."""
+
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def score(self, payload, use_cache=True, pre_score=True):
+        with self._lock:
+            self.calls.append(payload["name"])
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        return {"priority": "WARM", "score": 50, "name": payload["name"]}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = ScoreQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    yield q
+    q.close()
+
+
+def make_service(queue, scorer, workers=2, lease_s=300, max_queued_per_tenant=500):
+    metrics = MetricsRegistry()
+    pool = ScoringWorkerPool(
+        queue, extractor=None, scorer=scorer, workers=workers, poll_interval=0.01, lease_s=lease_s, metrics=metrics
+    )
+    return ScoringService(
+        queue, pool, port=0, max_queued_per_tenant=max_queued_per_tenant, scheduler=RateLimitScheduler(),
+        metrics=metrics,
+    )
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_submit_and_poll_over_http(queue):
+    service = make_service(queue, FakeScorer()).start()
+    client = ScoringServiceClient(service.url, tenant="ana")
+    try:
+        result = client.run("score", payload={"name": "Ada"}, timeout=5, poll_interval=0.01)
+        assert (result["priority"], result["name"]) == ("WARM", "Ada")
+        assert "stages" in result["timings"]
+
+        bad = requests.post(f"{service.url}/v1/jobs", json={"kind": "score"}, timeout=5)
+        assert bad.status_code == 400
+        assert requests.get(f"{service.url}/v1/jobs/nope", timeout=5).status_code == 404
+
+        stats = requests.get(f"{service.url}/v1/stats", timeout=5).json()
+        assert stats["queue"][DONE] == 1 and stats["workers"] == 2
+        metrics = requests.get(f"{service.url}/metrics", timeout=5).text
+        assert 'leadscore_service_jobs_total{kind="score",status="done"} 1' in metrics
+    finally:
+        client.close()
+        service.stop()
+
+
+def test_full_tenant_queue_is_rejected(queue):
+    service = make_service(queue, FakeScorer(), max_queued_per_tenant=1)
+    # the pool is not started, so submissions stay queued
+    assert service.submit({"kind": "score", "payload": {"name": "a"}}, "ana")[0] == 202
+    assert service.submit({"kind": "score", "payload": {"name": "b"}}, "ana")[0] == 429
+    assert service.submit({"kind": "score", "payload": {"name": "c"}}, "bob")[0] == 202
+
+
+def test_a_small_tenant_is_not_stuck_behind_a_big_submission(queue):
+    gate = threading.Event()
+    scorer = FakeScorer(gate=gate)
+    service = make_service(queue, scorer, workers=2)
+    for i in range(3):
+        service.submit({"kind": "score", "payload": {"name": f"big-{i}"}}, "big")
+    service.submit({"kind": "score", "payload": {"name": "small"}}, "small")
+
+    service.start()
+    try:
+        wait_for(lambda: len(scorer.calls) == 2)
+        # the second worker took the small tenant's job, not big-1
+        assert sorted(scorer.calls) == ["big-0", "small"]
+        gate.set()
+        wait_for(lambda: queue.counts()[DONE] == 4)
+        assert scorer.calls[2:] == ["big-1", "big-2"]
+    finally:
+        gate.set()
+        service.stop()
+
+
+def test_heartbeat_keeps_a_slow_job_from_being_reclaimed(queue):
+    service = make_service(queue, FakeScorer(delay=0.6), workers=1, lease_s=0.2).start()
+    try:
+        job_id = service.submit({"kind": "score", "payload": {"name": "slow"}}, "ana")[1]["job_id"]
+        wait_for(lambda: queue.get(job_id)["status"] == RUNNING)
+        time.sleep(0.4)
+        assert queue.claim("intruder") is None
+        wait_for(lambda: queue.get(job_id)["status"] == DONE)
+        assert queue.get(job_id)["attempts"] == 1
+    finally:
+        service.stop()
+
+
+def test_dead_workers_job_is_reclaimed_and_its_late_result_dropped(queue):
+    service = make_service(queue, FakeScorer(), workers=1)
+    job_id = service.submit({"kind": "score", "payload": {"name": "Ada"}}, "ana")[1]["job_id"]
+    stale = queue.claim("dead-worker", lease_s=-1)
+
+    service.start()
+    try:
+        wait_for(lambda: queue.get(job_id)["status"] == DONE)
+    finally:
+        service.stop()
+    done = queue.get(job_id)
+    assert (done["attempts"], done["result"]["name"]) == (2, "Ada")
+
+    # the first worker comes back: its outcome is not recorded over the new one
+    service.pool.run_job(stale, "dead-worker")
+    assert queue.get(job_id)["result"] == done["result"]
+    counters = service.metrics.snapshot()["counters"]
+    assert counters["service_jobs_total{kind=score,status=lease_lost}"] == 1
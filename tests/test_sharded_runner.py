@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.sharded_runner import ShardedBatchRunner, shard_key, shard_of
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.linkedin.com/in/Ada-L/",
+    "linkedin.com/in/ada-l",
+    "  https://linkedin.com/in/ADA-L?trk=feed#top ",
+    "https://www.linkedin.com/in/ada-l/details/experience/",
+])
+def test_shard_key_is_the_lowercased_username(url):
+    assert shard_key(url) == "ada-l"
+
+
+def test_shard_key_falls_back_to_the_url():
+    assert shard_key(" https://example.com/Ada ") == "https://example.com/ada"
+    assert shard_key(None) == ""
+
+
+def test_shard_of_is_pinned():
+    # changing the hash would move every lead to another shard's checkpoint
+    urls = [f"https://www.linkedin.com/in/user-{i}/" for i in range(8)]
+    assert [shard_of(u, 8) for u in urls] == [1, 0, 0, 5, 5, 1, 4, 1]
+
+
+def test_shard_of_does_not_depend_on_the_hash_seed():
+    code = "from core.sharded_runner import shard_of; print([shard_of(f'u{i}', 7) for i in range(50)])"
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+            env=dict(os.environ, PYTHONHASHSEED=seed),
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert outputs == {str([shard_of(f"u{i}", 7) for i in range(50)]) + "\n"}
+
+
+def test_partition_keeps_the_same_lead_on_one_shard(tmp_path):
+    leads = [(0, {"linkedin_url": "https://linkedin.com/in/ada"}),
+             (1, {"linkedin_url": "https://www.linkedin.com/in/ADA/"}),
+             (2, {"linkedin_url": "https://linkedin.com/in/grace"})]
+    runner = ShardedBatchRunner(runner_factory=None, processes=3)
+    counts = runner.partition(leads, str(tmp_path))
+    assert sum(counts) == 3
+
+    shard = shard_of("ada", 3)
+    with open(runner.shard_paths(str(tmp_path), shard)[0], encoding="utf-8") as f:
+        rows = [json.loads(line)[0] for line in f]
+    assert {0, 1} <= set(rows)
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+from core.single_flight import SingleFlight, AsyncSingleFlight
+
+
+def test_single_flight_shares_one_call_and_copies_results():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"profile": {"name": "a"}}
+
+    results = [None, None]
+
+    def leader():
+        results[0] = flights.do("alice", fetch)
+
+    t = threading.Thread(target=leader)
+    t.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.__setitem__(1, flights.do("alice", fetch)))
+    follower.start()
+    while flights.stats()["shared"] < 1:
+        pass
+    release.set()
+    t.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert results[0] == results[1] == {"profile": {"name": "a"}}
+    results[0]["timings"] = {}
+    results[0]["profile"]["name"] = "changed"
+    assert results[1] == {"profile": {"name": "a"}}
+
+
+def test_async_single_flight_copies_for_leader_and_followers():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"posts": [1]}
+
+    async def main():
+        return await asyncio.gather(*(flights.do("alice", fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    results[0]["posts"].append(2)
+    assert results[1] == results[2] == {"posts": [1]}